@@ -1,5 +1,6 @@
-from flask import Flask, jsonify
-from flask_bcrypt import Bcrypt
+import click
+from flask import Flask, current_app, jsonify, request
+from flask.cli import with_appcontext
 from flask_jwt_extended import JWTManager, get_jwt_identity, jwt_required
 from flask_cors import CORS
 
@@ -7,20 +8,30 @@ from flask_cors import CORS
 
 from backend.core.database import db
 from backend.core.config import Config
+from backend.core.engine import init_engine
+from backend.core.replicas import init_replicas
 from backend.core.models import (User, 
                          Patient,
                          Doctor, Department, DoctorUnavailability, DoctorWorkingHours,
                          Appointment, Notification, MedicalRecord, PrescriptionItem, TokenBlacklist)
 from backend.core.mail import init_mail, mail 
+from backend.core.revocation import is_token_revoked
+from backend.core.auth import init_account_versions, is_account_current
+from backend.core.passwords import hash_password
+from backend.core.metrics import init_metrics
+from backend.core.slow_queries import init_slow_query_log
+from backend.core.profiling import init_profiling
 
 from backend.auth.routes import auth_bp
 from backend.services.admin.routes import admin_bp
 from backend.services.doctors.routes import doctor_bp
 from backend.services.patients.routes import patient_bp
 from backend.services.appointments.routes import appointment_bp
+from backend.services.patients.search import init_patient_search
+from backend.services.medical_records.search import init_record_search
+from backend.services.appointments.archive import init_archive
 
 
-bcrypt = Bcrypt()
 jwt = JWTManager()
 
 @jwt.token_verification_failed_loader
@@ -31,6 +42,16 @@ def verification_failed_callback(jwt_header, jwt_payload):
         'message': 'Token verification failed'
     }), 422
 
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    # jwt_required and the role decorators both verify, so check once per request
+    checked = request.environ.get('chikitsa.token_revoked')
+    if checked and checked[0] == jwt_payload['jti']:
+        return checked[1]
+    revoked = is_token_revoked(jwt_payload) or not is_account_current(jwt_payload)
+    request.environ['chikitsa.token_revoked'] = (jwt_payload['jti'], revoked)
+    return revoked
+
 @jwt.revoked_token_loader
 def revoked_token_callback(jwt_header, jwt_payload):
     return jsonify({
@@ -60,11 +81,42 @@ def missing_token_callback(error):
         'message': 'Missing Authorization header'
     }), 401
 
+def init_db():
+    """Create the tables and the bootstrap admin user; safe to run repeatedly"""
+    # primary only, replicas get the schema through replication
+    db.create_all(bind_key=None)
+    init_account_versions()
+    init_archive()
+    init_patient_search()
+    init_record_search()
+
+    admin_user = User.query.filter_by(role='admin').first()
+    if not admin_user:
+        admin = User(
+            username = current_app.config['ADMIN_USERNAME'],
+            email = "admin.chikitsa@admin.com",
+            password_hash = hash_password(current_app.config['ADMIN_PASSWORD']),
+            role = 'admin',
+            is_active = True
+        )
+        db.session.add(admin)
+        db.session.commit()
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create database tables and the admin user."""
+    init_db()
+    click.echo('Database initialised.')
+
+
 # functin to create root instance of the application
+# kept free of db work so web workers, celery tasks and scripts start fast;
+# run `flask --app backend.app init-db` once to set up the schema
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
-    bcrypt.init_app(app)
     jwt.init_app(app)
     init_mail(app)
 
@@ -76,6 +128,11 @@ def create_app():
 
 
     db.init_app(app)
+    init_engine(app)
+    init_replicas(app)
+    init_metrics(app)
+    init_slow_query_log()
+    init_profiling(app)
 
     # blueprints
     app.register_blueprint(auth_bp)
@@ -84,24 +141,20 @@ def create_app():
     app.register_blueprint(patient_bp)
     app.register_blueprint(appointment_bp)
 
-
-    with app.app_context():
-        db.create_all()
-
-        admin_user = User.query.filter_by(role='admin').first()
-        if not admin_user:
-            admin = User(
-                username = app.config['ADMIN_USERNAME'],
-                email = "admin.chikitsa@admin.com",
-                password_hash = bcrypt.generate_password_hash(app.config['ADMIN_PASSWORD']).decode('utf-8'),
-                role = 'admin',
-                is_active = True
-            )
-            db.session.add(admin)
-            db.session.commit()
+    app.cli.add_command(init_db_command)
     return app
 
-app = create_app()
+
+_app = None
+
+def get_app():
+    """Process-wide app instance, shared by the web server and celery tasks"""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+app = get_app()
 
 @app.route('/')
 def root():
@@ -122,4 +175,6 @@ def admin_route():
 
 # run the application
 if __name__ == '__main__':
+    with app.app_context():
+        init_db()
     app.run(debug=app.config['DEBUG'])
\ No newline at end of file
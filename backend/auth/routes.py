@@ -2,8 +2,9 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt, jwt_required 
 from pydantic import ValidationError
 
-from ..core.auth import authenticate_user, get_current_user, refresh_access_token, update_last_login
+from ..core.auth import authenticate_user, get_current_user, refresh_access_token
 from ..core.models import User
+from ..core.passwords import PasswordPoolBusy
 from .schema import LoginSchema, RegisterPatient, TokenResponse
 from .service import AuthService
 
@@ -28,9 +29,6 @@ def login():
                 'status': 'error',
                 'message': f'You are not authorised to login as {intended_role.upper()} '
             }), 403
-        
-        # update last login for user id
-        update_last_login(user.id)
 
         return jsonify({
             'status': 'success',
@@ -44,6 +42,12 @@ def login():
             'message': 'Validation error',
             'errors': e.errors()
         }), 400
+
+    except PasswordPoolBusy:
+        return jsonify({
+            'status': 'error',
+            'message': 'Server busy, please retry'
+        }), 503, {'Retry-After': '1'}
     
 
 @auth_bp.route('/register/patient', methods=['POST'])
@@ -73,6 +77,12 @@ def register():
             'status': 'error',
             'message': str(ve)
         }), 400
+
+    except PasswordPoolBusy:
+        return jsonify({
+            'status': 'error',
+            'message': 'Server busy, please retry'
+        }), 503, {'Retry-After': '1'}
     
     except Exception as e:
         return jsonify({
@@ -90,8 +100,7 @@ def logout():
     # print("JWT Data:", jwt_data)  
     # print("Authorization Header:", request.headers.get('Authorization'))
     try:
-        jti = get_jwt()["jti"]
-        AuthService.logout(jti)
+        AuthService.logout(jwt_data["jti"], jwt_data.get("exp"))
         return jsonify({
             'status': 'success',
             'message': 'Successfully logged out'
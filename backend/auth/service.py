@@ -1,15 +1,15 @@
 from datetime import datetime
 from http.client import HTTPException 
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import get_jwt
 
 
 from ..core.database import db
-from ..core.models import Doctor, User, Patient, TokenBlacklist
-from ..core.auth import generate_tokens, update_last_login, get_current_user
+from ..core.models import Doctor, User, Patient
+from ..core.revocation import revoke_token
+from ..core.auth import generate_tokens, get_current_user
+from ..core.passwords import hash_password
 from .schema import LoginSchema, RegisterPatient
 
-bcrypt = Bcrypt()
 
 class AuthService:
     """Service class for authentication related operations"""
@@ -29,7 +29,7 @@ class AuthService:
             user = User(
                 username = data.username,
                 email = data.email,
-                password_hash = bcrypt.generate_password_hash(data.password).decode('utf-8'),
+                password_hash = hash_password(data.password),
                 role = 'patient',
                 is_active = True
             )
@@ -67,12 +67,10 @@ class AuthService:
 
 
     @staticmethod
-    def logout(jti: str):
+    def logout(jti: str, expires_at: float = None):
         """Invalidate user token when logout"""
         try:
-            blacklisted_token = TokenBlacklist(jti = jti)
-            db.session.add(blacklisted_token)
-            db.session.commit()
+            revoke_token(jti, expires_at)
             # print("Token added to blacklist")
 
             return True
@@ -0,0 +1,343 @@
+"""
+Benchmark for the critical API endpoints against the synthetic dataset.
+
+Each endpoint is called repeatedly, either in process through the Flask
+test client or over HTTP against a local WSGI server. The script reports
+latency percentiles and SQL statements per request, saves the results as
+JSON, and compares them with a stored baseline.
+
+Runs against a scratch database (sqlite by default), never the configured one.
+
+    python -m backend.benchmarks.bench_endpoints --scale small --output before.json
+    python -m backend.benchmarks.bench_endpoints --reuse --baseline before.json --output after.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+POOL_SIZE = 20  # distinct doctors and patients the requests rotate through
+
+
+def _configure(database_url: str) -> None:
+    # must be set before the app and its config are imported
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+    os.environ.setdefault('ADMIN_USERNAME', 'admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'admin')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('SLOW_QUERY_LOG', 'false')
+
+
+class QueryCounter:
+    """Counts statements on every engine in this process, both transports included"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _after_cursor_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def take(self) -> int:
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+
+class ClientTransport:
+    name = 'client'
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, headers: dict, body=None) -> int:
+        return self.client.open(path, method=method, headers=headers, json=body).status_code
+
+    def close(self):
+        pass
+
+
+class WSGITransport:
+    """Local threaded werkzeug server, a fresh connection per request"""
+    name = 'wsgi'
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def request(self, method: str, path: str, headers: dict, body=None) -> int:
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            payload = None
+            headers = dict(headers)
+            if body is not None:
+                payload = json.dumps(body)
+                headers['Content-Type'] = 'application/json'
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            conn.close()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _tokens(app) -> dict:
+    """Access tokens for the admin and a pool of dataset doctors and patients"""
+    from ..core.auth import generate_tokens
+    from ..core.models import Doctor, Patient, User
+
+    with app.app_context():
+        admin = User.query.filter_by(role='admin').first()
+        doctors = Doctor.query.filter_by(is_available=True).order_by(Doctor.id).limit(POOL_SIZE).all()
+        patients = Patient.query.order_by(Patient.id).limit(POOL_SIZE).all()
+        return {
+            'admin': generate_tokens(admin)['access_token'],
+            'doctors': [(d.id, generate_tokens(d.user)['access_token']) for d in doctors],
+            'patients': [(p.id, generate_tokens(p.user)['access_token']) for p in patients]
+        }
+
+
+def _free_slots(app, doctor_ids: list, patient_ids: list, count: int) -> list:
+    """Bookable (patient_id, doctor_id, date, time) picks that do not clash with each other"""
+    from ..services.appointments.service import AppointmentService
+
+    picks = []
+    taken = set()
+    with app.app_context():
+        for offset in range(1, AppointmentService.MAX_ADVANCE_DAYS + 1):
+            day = date.today() + timedelta(days=offset)
+            for doctor_id in doctor_ids:
+                for slot in AppointmentService.get_available_slots(doctor_id, day):
+                    if not slot['is_available']:
+                        continue
+                    patient_id = patient_ids[len(picks) % len(patient_ids)]
+                    if (patient_id, day, slot['time']) in taken:
+                        continue
+                    taken.add((patient_id, day, slot['time']))
+                    picks.append((patient_id, doctor_id, day.isoformat(), slot['time']))
+                    if len(picks) >= count:
+                        return picks
+    return picks
+
+
+def build_scenarios(app, requests: int, warmup: int) -> list:
+    """(name, method, callable(i) -> (path, token, body)) for every benchmarked endpoint"""
+    tokens = _tokens(app)
+    doctors, patients = tokens['doctors'], tokens['patients']
+    if not doctors or not patients:
+        raise SystemExit("The database has no doctors or patients, generate a dataset first")
+
+    patient_tokens = dict(patients)
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+
+    def next_weekday(i):
+        day = today + timedelta(days=1 + i % 14)
+        return day + timedelta(days=2) if day.weekday() == 6 else day
+
+    bookings = _free_slots(app, [d for d, _ in doctors], [p for p, _ in patients], requests + warmup)
+
+    def book(i):
+        patient_id, doctor_id, day, slot = bookings[i % len(bookings)]
+        return ('/patient/appointments', patient_tokens[patient_id],
+                {'doctor_id': doctor_id, 'appointment_date': day, 'appointment_time': slot})
+
+    def doctor(i):
+        return doctors[i % len(doctors)]
+
+    def patient(i):
+        return patients[i % len(patients)]
+
+    return [
+        ('appointment_slots', 'GET', lambda i: (
+            f"/appointments/slots/{doctor(i)[0]}?date={next_weekday(i).isoformat()}", patient(i)[1], None)),
+        ('doctor_dashboard_stats', 'GET', lambda i: ('/doctor/dashboard/stats', doctor(i)[1], None)),
+        ('doctor_calendar', 'GET', lambda i: (
+            f"/doctor/calendar?start_date={week_start.isoformat()}&end_date={week_end.isoformat()}",
+            doctor(i)[1], None)),
+        ('doctor_patients', 'GET', lambda i: ('/doctor/patients', doctor(i)[1], None)),
+        ('admin_dashboard_stats', 'GET', lambda i: ('/admin/dashboard/stats', tokens['admin'], None)),
+        ('admin_appointments', 'GET', lambda i: (
+            f"/admin/appointments?start_date={week_start.isoformat()}&end_date={week_end.isoformat()}",
+            tokens['admin'], None)),
+        ('patient_export_records', 'POST', lambda i: ('/patient/export-records', patient(i)[1], {})),
+        ('admin_export_records', 'POST', lambda i: (
+            f"/admin/{patient(i)[0]}/export-records", tokens['admin'], {})),
+        # last, it adds appointments the other endpoints would then see
+        ('book_appointment', 'POST', book) if bookings else None,
+    ]
+
+
+def _percentile(values: list, pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_scenario(transport, counter: QueryCounter, method: str, build, requests: int, warmup: int) -> dict:
+    for i in range(warmup):
+        path, token, body = build(i)
+        transport.request(method, path, {'Authorization': f"Bearer {token}"}, body)
+
+    latencies, queries, errors = [], [], 0
+    for i in range(warmup, warmup + requests):
+        path, token, body = build(i)
+        counter.take()
+        started = time.perf_counter()
+        status = transport.request(method, path, {'Authorization': f"Bearer {token}"}, body)
+        latencies.append(time.perf_counter() - started)
+        queries.append(counter.take())
+        if status >= 400:
+            errors += 1
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p90_ms': round(_percentile(latencies, 0.90) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'queries_mean': round(statistics.mean(queries), 2),
+        'queries_max': max(queries)
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print deltas against a baseline; returns the regressions beyond threshold percent"""
+    regressions = []
+    print(f"\n{'endpoint':<32} {'p50 ms':>25} {'p99 ms':>25} {'queries':>16}")
+    for transport, endpoints in results['endpoints'].items():
+        for name, current in endpoints.items():
+            previous = baseline.get('endpoints', {}).get(transport, {}).get(name)
+            if previous is None:
+                print(f"{transport + '/' + name:<32} (not in baseline)")
+                continue
+
+            def delta(key):
+                before, after = previous[key], current[key]
+                change = (after - before) / before * 100 if before else 0.0
+                return change, f"{before:>9.2f} -> {after:<9.2f}{change:+5.0f}%"
+
+            p50, p50_text = delta('p50_ms')
+            _, p99_text = delta('p99_ms')
+            print(f"{transport + '/' + name:<32} {p50_text} {p99_text} "
+                  f"{previous['queries_mean']:>6} -> {current['queries_mean']:<6}")
+            if p50 > threshold or current['queries_mean'] > previous['queries_mean']:
+                regressions.append(f"{transport}/{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'chikitsa_bench_endpoints.db'))
+    parser.add_argument('--scale', default='small', help='dataset scale, see dataset.SCALES')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reuse', action='store_true', help='benchmark the existing data instead of regenerating it')
+    parser.add_argument('--transport', choices=('client', 'wsgi', 'both'), default='client')
+    parser.add_argument('--requests', type=int, default=100, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', action='append', help='run just these endpoints (repeatable)')
+    parser.add_argument('--output', help='write results as JSON here')
+    parser.add_argument('--baseline', help='compare against a previous --output file')
+    parser.add_argument('--threshold', type=float, default=10.0, help='p50 regression percent that fails --baseline')
+    args = parser.parse_args()
+
+    _configure(args.database)
+
+    from ..app import app
+    from ..core import cache
+    from ..core.database import db
+    from .dataset import SCALES, build_dataset
+
+    if not args.reuse:
+        build_dataset(app, scale=args.scale, seed=args.seed, log=lambda message: None)
+
+    # exports build the csv and the mail but never talk to an smtp server
+    app.extensions['mail'].suppress = True
+
+    counter = QueryCounter()
+    counter.install()
+
+    transports = [ClientTransport, WSGITransport] if args.transport == 'both' else \
+        [ClientTransport if args.transport == 'client' else WSGITransport]
+
+    with app.app_context():
+        database = db.engine.dialect.name
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'database': database,
+            'scale': None if args.reuse else args.scale,
+            'sizes': None if args.reuse else SCALES.get(args.scale),
+            'requests': args.requests,
+            'redis': cache.redis_available(),
+            'python': platform.python_version()
+        },
+        'endpoints': {}
+    }
+
+    for transport_cls in transports:
+        transport = transport_cls(app)
+        endpoints = results['endpoints'].setdefault(transport.name, {})
+        # rebuilt per transport, the booking picks are used up by each run
+        scenarios = [s for s in build_scenarios(app, args.requests, args.warmup) if s]
+        if args.only:
+            scenarios = [s for s in scenarios if s[0] in args.only]
+        try:
+            for name, method, build in scenarios:
+                endpoints[name] = run_scenario(transport, counter, method, build, args.requests, args.warmup)
+                print(f"{transport.name}/{name}: {endpoints[name]}")
+        finally:
+            transport.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nregressions: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Import-time check using `python -X importtime`.
+
+Reports the cumulative import cost of each module and its slowest
+dependencies, and exits non-zero if any module is over --budget-ms.
+Point --redis-url at an unreachable host to confirm imports never wait
+on redis.
+
+    python -m backend.benchmarks.bench_import --budget-ms 1500
+    python -m backend.benchmarks.bench_import --redis-url redis://10.255.255.1:6379/0
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_MODULES = ['backend.core.cache', 'backend.app']
+
+
+def import_times(module: str, env: dict) -> dict:
+    """{imported module: cumulative microseconds} for a fresh `import module`"""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{out.stderr[-2000:]}")
+
+    times = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--budget-ms', type=float, default=None, help='fail if a module takes longer')
+    parser.add_argument('--top', type=int, default=8, help='slowest project imports to list')
+    parser.add_argument('--redis-url', default=None, help='override REDIS_URL for the run')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.redis_url:
+        env['REDIS_URL'] = args.redis_url
+
+    over_budget = False
+    for module in args.modules:
+        times = import_times(module, env)
+        total_ms = times.get(module, 0) / 1000
+        status = ''
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            status = f'  OVER BUDGET ({args.budget_ms} ms)'
+            over_budget = True
+        print(f"{module}: {total_ms:.1f} ms{status}")
+
+        project = sorted(
+            ((name, us) for name, us in times.items() if name.startswith('backend.') and name != module),
+            key=lambda item: item[1], reverse=True
+        )
+        for name, us in project[:args.top]:
+            print(f"    {name}: {us / 1000:.1f} ms")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Benchmark for the heavy Celery jobs: daily reminders and monthly reports.
+
+Runs the real tasks eagerly against the synthetic dataset with an in-memory
+mail transport. Time is split into phases:
+- query: SQL statements
+- render: the email templates
+- send: handing messages to the transport
+- other: everything else, ORM hydration included
+
+Query counts, messages and bytes sent and peak memory are reported per job.
+
+Runs against a scratch database (sqlite by default), never the configured one.
+
+    python -m backend.benchmarks.bench_jobs --scale small
+    python -m backend.benchmarks.bench_jobs --reuse --job reports --send-latency-ms 20 --profile
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def _configure(database_url: str) -> None:
+    # must be set before the app and its config are imported
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+    os.environ.setdefault('ADMIN_USERNAME', 'admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'admin')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('SLOW_QUERY_LOG', 'false')
+
+
+class PhaseTimer:
+    """Accumulates wall time and call counts per phase"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[phase] += seconds
+            self.calls[phase] += 1
+
+    def wrap(self, phase: str, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - started)
+        return timed
+
+
+class QueryTimer:
+    """Times every statement into the 'query' phase"""
+
+    def __init__(self, timer: PhaseTimer):
+        self.timer = timer
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('bench_query_start', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('bench_query_start')
+        if starts:
+            self.timer.add('query', time.perf_counter() - starts.pop())
+
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, 'before_cursor_execute', self._before)
+        event.listen(Engine, 'after_cursor_execute', self._after)
+
+    def remove(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.remove(Engine, 'before_cursor_execute', self._before)
+        event.remove(Engine, 'after_cursor_execute', self._after)
+
+
+class FakeMailTransport:
+    """
+    Keeps Flask-Mail from opening SMTP connections and records what would
+    have been sent. An optional per-message delay stands in for the SMTP
+    round trip.
+    """
+
+    def __init__(self, app, latency_ms: float = 0.0):
+        self.app = app
+        self.latency = latency_ms / 1000
+        self.messages = 0
+        self.bytes = 0
+
+    def _dispatched(self, sender, message, **kwargs):
+        self.messages += 1
+        self.bytes += len(message.as_bytes())
+        if self.latency:
+            time.sleep(self.latency)
+
+    @contextmanager
+    def installed(self):
+        from flask_mail import email_dispatched
+
+        state = self.app.extensions['mail']
+        suppress = state.suppress
+        state.suppress = True
+        email_dispatched.connect(self._dispatched)
+        try:
+            yield self
+        finally:
+            email_dispatched.disconnect(self._dispatched)
+            state.suppress = suppress
+
+
+@contextmanager
+def _patched(module, timer: PhaseTimer, names: dict):
+    """Wrap module attributes in phase timers for the duration of the block"""
+    originals = {name: getattr(module, name) for name in names}
+    for name, phase in names.items():
+        setattr(module, name, timer.wrap(phase, originals[name]))
+    try:
+        yield
+    finally:
+        for name, original in originals.items():
+            setattr(module, name, original)
+
+
+JOBS = {
+    'reminders': 'send_daily_reminders_task',
+    'reports': 'send_monthly_reports_task',
+}
+
+
+def run_job(app, job: str, latency_ms: float, memory: bool, profile_path: str = None) -> dict:
+    """Run one task eagerly and return its phase breakdown"""
+    from ..utils import driver, tasks
+
+    task = getattr(tasks, JOBS[job])
+    timer = PhaseTimer()
+    queries = QueryTimer(timer)
+    transport = FakeMailTransport(app, latency_ms)
+    renders = {
+        'generate_appointment_reminder_html': 'render',
+        'generate_monthly_report_html': 'render',
+        'send_email': 'send',
+    }
+
+    profiler = cProfile.Profile() if profile_path else None
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if memory:
+        tracemalloc.start()
+
+    with app.app_context(), transport.installed(), _patched(driver, timer, renders):
+        queries.install()
+        try:
+            started = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            result = task.apply(throw=True).get()
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+        finally:
+            queries.remove()
+
+    peak = None
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    if profiler:
+        profiler.dump_stats(profile_path)
+
+    phases = {phase: round(seconds * 1000, 2) for phase, seconds in timer.seconds.items()}
+    # send wraps the transport, render and send never issue sql
+    phases['other'] = round(elapsed * 1000 - sum(phases.values()), 2)
+    return {
+        'job': job,
+        'total_ms': round(elapsed * 1000, 2),
+        'phases_ms': phases,
+        'queries': timer.calls['query'],
+        'renders': timer.calls['render'],
+        'messages': transport.messages,
+        'mail_bytes': transport.bytes,
+        'peak_python_mb': round(peak / 2 ** 20, 2) if peak is not None else None,
+        # ru_maxrss is kilobytes on linux and only ever grows, so this is the increase in the process peak
+        'peak_rss_growth_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 2),
+        'result': {key: value for key, value in (result or {}).items() if not isinstance(value, list)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'chikitsa_bench_jobs.db'))
+    parser.add_argument('--scale', default='small', help='dataset scale, see dataset.SCALES')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reuse', action='store_true', help='run on the existing data instead of regenerating it')
+    parser.add_argument('--job', choices=('all', *JOBS), default='all')
+    parser.add_argument('--runs', type=int, default=1, help='timed runs per job, the fastest is reported')
+    parser.add_argument('--send-latency-ms', type=float, default=0.0, help='simulated smtp time per message')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run for peak memory')
+    parser.add_argument('--profile', action='store_true', help='also write a cProfile dump per job')
+    parser.add_argument('--output', help='write results as JSON here')
+    args = parser.parse_args()
+
+    _configure(args.database)
+
+    from ..app import app
+    from .dataset import build_dataset
+
+    if not args.reuse:
+        build_dataset(app, scale=args.scale, seed=args.seed, log=lambda message: None)
+
+    results = {}
+    for job in (JOBS if args.job == 'all' else [args.job]):
+        runs = [run_job(app, job, args.send_latency_ms, memory=False) for _ in range(args.runs)]
+        best = min(runs, key=lambda run: run['total_ms'])
+
+        if not args.no_memory:
+            # separate run, tracemalloc slows allocation heavy code down
+            best['peak_python_mb'] = run_job(app, job, args.send_latency_ms, memory=True)['peak_python_mb']
+
+        if args.profile:
+            path = os.path.join(tempfile.gettempdir(), f"chikitsa_{job}.prof")
+            run_job(app, job, args.send_latency_ms, memory=False, profile_path=path)
+            best['profile'] = path
+            print(f"\n{job} profile written to {path}, top functions by cumulative time:")
+            pstats.Stats(path).sort_stats('cumulative').print_stats(15)
+
+        results[job] = best
+        print(f"{job}: {json.dumps(best)}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
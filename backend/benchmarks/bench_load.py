@@ -0,0 +1,495 @@
+"""
+Load generator replaying a mixed traffic profile against a multi-worker server.
+
+Virtual users loop over weighted scenarios:
+- patients look up slots and book
+- doctors poll their calendar and stats
+- admins list appointments
+
+Tokens are minted with core.auth.generate_tokens for dataset users. The
+report gives throughput, error rate and p50/p95/p99 per endpoint, plus
+server DB time from Server-Timing. It also samples Redis and (on Postgres)
+database connections to show saturation. Everything runs locally.
+
+By default a prefork server is started on a scratch database (sqlite unless
+--database says otherwise); pass --url to load an already running server.
+
+    python -m backend.benchmarks.bench_load --scale small --workers 4 --users 32 --duration 30
+    python -m backend.benchmarks.bench_load --reuse --redis-url redis://localhost:6379/0 --output load.json
+    python -m backend.benchmarks.bench_load --url http://127.0.0.1:5000 --reuse
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+# scenario -> weight, the share of virtual user iterations
+DEFAULT_MIX = {
+    'patient_browse_slots': 35,
+    'patient_book': 10,
+    'doctor_calendar': 25,
+    'doctor_stats': 15,
+    'admin_appointments': 10,
+    'admin_stats': 5,
+}
+USER_POOL = 200  # dataset doctors and patients that get tokens
+
+_SERVER_TIMING = {
+    'app': re.compile(r'app;dur=([\d.]+)'),
+    'db': re.compile(r'db;dur=([\d.]+)'),
+    'queries': re.compile(r'desc="(\d+) queries"'),
+}
+
+
+def _configure(database_url: str, redis_url: str = None) -> None:
+    # must be set before the app and its config are imported
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url
+    if redis_url:
+        os.environ['REDIS_URL'] = redis_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+    os.environ.setdefault('ADMIN_USERNAME', 'admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'admin')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+###### SERVER ######
+
+def serve(port: int, workers: int, threaded: bool) -> None:
+    """Bind once and fork `workers` werkzeug servers on the shared socket, like a prefork server"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from ..app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            server = make_server('127.0.0.1', port, app, threaded=threaded, request_handler=QuietHandler,
+                                 fd=sock.fileno())
+            server.serve_forever()
+            os._exit(0)
+        children.append(pid)
+
+    def stop(*_):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+def start_server(port: int, workers: int, threaded: bool) -> subprocess.Popen:
+    command = [sys.executable, '-m', 'backend.benchmarks.bench_load', '--serve', '--port', str(port),
+               '--workers', str(workers)]
+    if threaded:
+        command.append('--threaded')
+    process = subprocess.Popen(command, env=os.environ.copy())
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise SystemExit("Server exited during startup")
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Server did not start listening")
+
+
+###### TRAFFIC ######
+
+class Session:
+    """One virtual user's keep-alive connection, reopened whenever the server closes it"""
+
+    def __init__(self, base_url: str, recorder):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.recorder = recorder
+        self.conn = None
+
+    def request(self, name: str, method: str, path: str, token: str, body=None):
+        headers = {'Authorization': f"Bearer {token}"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            elapsed = time.perf_counter() - started
+            self.recorder.record(name, response.status, elapsed, response.getheader('Server-Timing'))
+            if response.getheader('Connection', '').lower() == 'close':
+                self.close()
+            return response.status, data
+        except (OSError, http.client.HTTPException):
+            self.recorder.record(name, None, time.perf_counter() - started, None)
+            self.close()
+            return None, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)  # name -> [(status, seconds, app_ms, db_ms, queries)]
+
+    def record(self, name: str, status, seconds: float, server_timing) -> None:
+        timing = {}
+        for key, pattern in _SERVER_TIMING.items():
+            match = pattern.search(server_timing or '')
+            timing[key] = float(match.group(1)) if match else None
+        with self.lock:
+            self.samples[name].append((status, seconds, timing['app'], timing['db'], timing['queries']))
+
+
+def _tokens() -> dict:
+    from ..app import app
+    from ..core.auth import generate_tokens
+    from ..core.models import Doctor, Patient, User
+
+    with app.app_context():
+        admin = User.query.filter_by(role='admin').first()
+        doctors = Doctor.query.filter_by(is_available=True).order_by(Doctor.id).limit(USER_POOL).all()
+        patients = Patient.query.order_by(Patient.id).limit(USER_POOL).all()
+        if not doctors or not patients:
+            raise SystemExit("The database has no doctors or patients, generate a dataset first")
+        return {
+            'admin': generate_tokens(admin)['access_token'],
+            'doctors': [(d.id, generate_tokens(d.user)['access_token']) for d in doctors],
+            'patients': [generate_tokens(p.user)['access_token'] for p in patients]
+        }
+
+
+def _upcoming_day(rng) -> str:
+    return (date.today() + timedelta(days=rng.randrange(1, 21))).isoformat()
+
+
+def patient_browse_slots(session, rng, tokens):
+    doctor_id, _ = rng.choice(tokens['doctors'])
+    session.request('slots', 'GET', f"/appointments/slots/{doctor_id}?date={_upcoming_day(rng)}",
+                    rng.choice(tokens['patients']))
+
+
+def patient_book(session, rng, tokens):
+    token = rng.choice(tokens['patients'])
+    doctor_id, _ = rng.choice(tokens['doctors'])
+    day = _upcoming_day(rng)
+    status, data = session.request('slots', 'GET', f"/appointments/slots/{doctor_id}?date={day}", token)
+    if status != 200:
+        return
+    free = [slot['time'] for slot in json.loads(data)['data']['slots'] if slot['is_available']]
+    if free:
+        session.request('book', 'POST', '/patient/appointments', token,
+                        {'doctor_id': doctor_id, 'appointment_date': day, 'appointment_time': rng.choice(free)})
+
+
+def doctor_calendar(session, rng, tokens):
+    _, token = rng.choice(tokens['doctors'])
+    start = date.today() - timedelta(days=date.today().weekday())
+    session.request('doctor_calendar', 'GET',
+                    f"/doctor/calendar?start_date={start.isoformat()}&end_date={(start + timedelta(days=6)).isoformat()}",
+                    token)
+
+
+def doctor_stats(session, rng, tokens):
+    _, token = rng.choice(tokens['doctors'])
+    session.request('doctor_stats', 'GET', '/doctor/dashboard/stats', token)
+
+
+def admin_appointments(session, rng, tokens):
+    day = date.today() + timedelta(days=rng.randrange(-7, 7))
+    session.request('admin_appointments', 'GET',
+                    f"/admin/appointments?start_date={day.isoformat()}&end_date={day.isoformat()}", tokens['admin'])
+
+
+def admin_stats(session, rng, tokens):
+    session.request('admin_stats', 'GET', '/admin/dashboard/stats', tokens['admin'])
+
+
+SCENARIOS = {
+    'patient_browse_slots': patient_browse_slots,
+    'patient_book': patient_book,
+    'doctor_calendar': doctor_calendar,
+    'doctor_stats': doctor_stats,
+    'admin_appointments': admin_appointments,
+    'admin_stats': admin_stats,
+}
+
+
+def run_load(base_url: str, tokens: dict, mix: dict, users: int, duration: float, think: float,
+             seed: int) -> tuple:
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    stop_at = [None]
+    start_gate = threading.Event()
+
+    def user(index):
+        rng = random.Random(seed * 1000 + index)
+        session = Session(base_url, recorder)
+        start_gate.wait()
+        while time.perf_counter() < stop_at[0]:
+            SCENARIOS[rng.choices(names, weights)[0]](session, rng, tokens)
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+        session.close()
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    stop_at[0] = started + duration
+    start_gate.set()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+
+###### SATURATION ######
+
+class SaturationSampler:
+    """Polls Redis INFO and Postgres pg_stat_activity once a second while the load runs"""
+
+    def __init__(self, redis_url: str = None, engine=None, interval: float = 1.0):
+        self.interval = interval
+        self.redis = None
+        if redis_url:
+            import redis
+            self.redis = redis.from_url(redis_url, socket_connect_timeout=1, socket_timeout=2)
+        self.engine = engine if engine is not None and engine.dialect.name == 'postgresql' else None
+        self.samples = defaultdict(list)
+        self.first_info = self.last_info = None
+        self.redis_errors = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        if self.redis is not None:
+            try:
+                info = self.redis.info()
+                self.first_info = self.first_info or info
+                self.last_info = info
+                self.samples['redis_ops_per_sec'].append(info.get('instantaneous_ops_per_sec', 0))
+                self.samples['redis_connected_clients'].append(info.get('connected_clients', 0))
+                self.samples['redis_blocked_clients'].append(info.get('blocked_clients', 0))
+            except Exception:
+                self.redis_errors += 1
+        if self.engine is not None:
+            from sqlalchemy import text
+            with self.engine.connect() as conn:
+                row = conn.execute(text(
+                    "SELECT count(*), "
+                    "count(*) FILTER (WHERE state = 'active'), "
+                    "count(*) FILTER (WHERE state = 'idle in transaction'), "
+                    "count(*) FILTER (WHERE wait_event_type = 'Lock') "
+                    "FROM pg_stat_activity WHERE datname = current_database()"
+                )).one()
+            for key, value in zip(('db_connections', 'db_active', 'db_idle_in_transaction', 'db_lock_waits'), row):
+                self.samples[key].append(value)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self.redis is not None or self.engine is not None:
+            self._thread.start()
+
+    def stop(self, elapsed: float) -> dict:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+        report = {}
+        for key, values in self.samples.items():
+            report[key] = {'mean': round(statistics.mean(values), 2), 'max': max(values)}
+        if self.redis_errors:
+            report['redis_failed_samples'] = self.redis_errors
+        if self.first_info and self.last_info:
+            first, last = self.first_info, self.last_info
+            commands = last['total_commands_processed'] - first['total_commands_processed']
+            hits = last['keyspace_hits'] - first['keyspace_hits']
+            misses = last['keyspace_misses'] - first['keyspace_misses']
+            report['redis_commands_per_sec'] = round(commands / elapsed, 1) if elapsed else None
+            report['redis_hit_rate'] = round(hits / (hits + misses), 3) if hits + misses else None
+            report['redis_used_memory_mb'] = round(last['used_memory'] / 2 ** 20, 2)
+        return report
+
+
+###### REPORT ######
+
+def _percentile(values: list, pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    total = failed = 0
+    for name, samples in sorted(recorder.samples.items()):
+        latencies = sorted(seconds for _, seconds, *_ in samples)
+        errors = sum(1 for status, *_ in samples if status is None or status >= 500)
+        rejected = sum(1 for status, *_ in samples if status is not None and 400 <= status < 500)
+        app_ms = [s[2] for s in samples if s[2] is not None]
+        db_ms = [s[3] for s in samples if s[3] is not None]
+        queries = [s[4] for s in samples if s[4] is not None]
+        total += len(samples)
+        failed += errors
+        endpoints[name] = {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'errors': errors,
+            'rejected_4xx': rejected,
+            'error_rate': round(errors / len(samples), 4),
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2),
+            'server_db_ms_mean': round(statistics.mean(db_ms), 2) if db_ms else None,
+            # share of server time spent in sql, rising under load means the db is the bottleneck
+            'server_db_share': round(sum(db_ms) / sum(app_ms), 3) if app_ms and sum(app_ms) else None,
+            'queries_mean': round(statistics.mean(queries), 2) if queries else None
+        }
+    return {
+        'seconds': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 1) if elapsed else None,
+        'error_rate': round(failed / total, 4) if total else None,
+        'endpoints': endpoints
+    }
+
+
+def _parse_mix(value: str) -> dict:
+    mix = dict(DEFAULT_MIX)
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, _, weight = item.partition('=')
+            if name.strip() not in SCENARIOS:
+                raise SystemExit(f"Unknown scenario {name.strip()}, expected one of {', '.join(SCENARIOS)}")
+            mix[name.strip()] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'chikitsa_bench_load.db'))
+    parser.add_argument('--redis-url', help='local redis for the server cache and for saturation sampling')
+    parser.add_argument('--scale', default='small', help='dataset scale, see dataset.SCALES')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reuse', action='store_true', help='load the existing data instead of regenerating it')
+    parser.add_argument('--url', help='target an already running server instead of starting one')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='server processes')
+    parser.add_argument('--threaded', action='store_true', help='threads inside each server process')
+    parser.add_argument('--users', type=int, default=32, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--think', type=float, default=0.0, help='mean think time between scenarios, seconds')
+    parser.add_argument('--mix', help='override scenario weights, e.g. patient_book=20,admin_stats=0')
+    parser.add_argument('--output', help='write the report as JSON here')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.workers, args.threaded)
+        return
+
+    _configure(args.database, args.redis_url)
+
+    from ..app import app
+    from ..core.database import db
+    from .dataset import build_dataset
+
+    if not args.reuse and not args.url:
+        build_dataset(app, scale=args.scale, seed=args.seed, log=lambda message: None)
+
+    mix = _parse_mix(args.mix)
+    tokens = _tokens()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = _free_port()
+        server = start_server(port, args.workers, args.threaded)
+        base_url = f"http://127.0.0.1:{port}"
+
+    with app.app_context():
+        engine = db.engine
+    sampler = SaturationSampler(args.redis_url, engine)
+    print(f"{args.users} users for {args.duration}s against {base_url}, mix {mix}")
+    try:
+        sampler.start()
+        recorder, elapsed = run_load(base_url, tokens, mix, args.users, args.duration, args.think, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = summarize(recorder, elapsed)
+    report['saturation'] = sampler.stop(elapsed)
+    report['config'] = {
+        'url': base_url, 'database': engine.dialect.name, 'workers': None if args.url else args.workers,
+        'threaded': args.threaded, 'users': args.users, 'duration': args.duration, 'think': args.think, 'mix': mix
+    }
+
+    print(f"\n{'endpoint':<20} {'req':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'db ms':>7} {'db%':>5}")
+    for name, stats in report['endpoints'].items():
+        share = stats['server_db_share']
+        print(f"{name:<20} {stats['requests']:>7} {stats['throughput_rps']:>8} {stats['error_rate'] * 100:>6.2f} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} "
+              f"{stats['server_db_ms_mean'] if stats['server_db_ms_mean'] is not None else '-':>7} "
+              f"{round(share * 100) if share is not None else '-':>5}")
+    print(f"total {report['requests']} requests, {report['throughput_rps']} rps, "
+          f"error rate {report['error_rate']}, saturation {report['saturation']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
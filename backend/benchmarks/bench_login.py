@@ -0,0 +1,129 @@
+"""
+Benchmark for login latency with last_login written inline vs behind.
+
+Runs against a scratch database (sqlite by default), never the configured one.
+
+    python -m backend.benchmarks.bench_login --logins 2000 --concurrency 1000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+BENCH_PASSWORD = 'bench-password'
+
+
+def _configure(database_url: str, rounds: int, concurrency: int) -> None:
+    # must be set before the app and its config are imported
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url
+    os.environ['BCRYPT_LOG_ROUNDS'] = str(rounds)
+    # admit every client so the queue limit does not hide the write cost
+    os.environ['PASSWORD_POOL_MAX_QUEUE'] = str(concurrency)
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+    os.environ.setdefault('ADMIN_USERNAME', 'admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'admin')
+
+
+def seed_users(app, count: int) -> list:
+    """Create `count` patient accounts sharing one password hash"""
+    from sqlalchemy import insert
+    from ..core.database import db
+    from ..core.models import User
+    from ..core.passwords import hash_password
+
+    from ..app import init_db
+
+    password_hash = hash_password(BENCH_PASSWORD)
+    usernames = [f"bench_user_{i}" for i in range(count)]
+    with app.app_context():
+        init_db()
+        db.session.query(User).filter(User.username.like('bench_user_%')).delete(synchronize_session=False)
+        db.session.execute(insert(User), [
+            {'username': name, 'email': f"{name}@bench.local", 'password_hash': password_hash,
+             'role': 'patient', 'is_active': True}
+            for name in usernames
+        ])
+        db.session.commit()
+    return usernames
+
+
+def run_logins(app, usernames: list, logins: int, concurrency: int) -> dict:
+    """Fire `logins` POST /auth/login requests from `concurrency` threads"""
+    latencies = []
+    errors = [0]
+    counter = [0]
+    lock = threading.Lock()
+    start_gate = threading.Event()
+
+    def client():
+        test_client = app.test_client()
+        start_gate.wait()
+        while True:
+            with lock:
+                if counter[0] >= logins:
+                    return
+                i = counter[0]
+                counter[0] += 1
+            payload = {'username': usernames[i % len(usernames)], 'password': BENCH_PASSWORD, 'role': 'patient'}
+            started = time.perf_counter()
+            response = test_client.post('/auth/login', json=payload)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    start_gate.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'logins': len(latencies),
+        'errors': errors[0],
+        'seconds': round(wall, 3),
+        'logins_per_second': round(len(latencies) / wall, 1) if wall else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'chikitsa_bench_login.db'))
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--logins', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=4, help='bcrypt cost, low so the db write dominates')
+    args = parser.parse_args()
+
+    _configure(args.database, args.rounds, args.concurrency)
+
+    from ..app import app
+    from ..core import auth
+
+    usernames = seed_users(app, args.users)
+    print(f"{args.logins} logins over {args.users} users, {args.concurrency} concurrent, {args.database}")
+
+    auth.LAST_LOGIN_WRITE_BEHIND = False
+    print(f"inline write:  {run_logins(app, usernames, args.logins, args.concurrency)}")
+
+    auth.LAST_LOGIN_WRITE_BEHIND = True
+    print(f"write-behind:  {run_logins(app, usernames, args.logins, args.concurrency)}")
+
+    with app.app_context():
+        started = time.perf_counter()
+        flushed = auth.flush_last_logins()
+        print(f"flush:         {flushed['flushed']} users in {round((time.perf_counter() - started) * 1000, 2)} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark for the medicine autocomplete catalog.
+
+The generated dataset only knows a few dozen medicines, so this builds the
+catalog straight from synthetic history instead: --names distinct names with
+Zipf-like usage counts spread over --doctors doctors. It then times lookups
+for random prefixes of one to five characters. Incremental adds are mixed in
+at --write-ratio, so cached prefix lists are kept up to date during the run.
+The script reports build time, catalog memory and lookup percentiles in
+microseconds for each prefix length.
+
+Needs no database.
+
+    python -m backend.benchmarks.bench_medicines --names 300000
+    python -m backend.benchmarks.bench_medicines --names 50000 --lookups 50000 --write-ratio 0.1
+"""
+import argparse
+import json
+import os
+import random
+import string
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+
+def _configure() -> None:
+    # the catalog module pulls in the models, which read the app config
+    os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+SYLLABLES = ['ac', 'al', 'am', 'ar', 'ba', 'ce', 'cl', 'co', 'da', 'de', 'di', 'do', 'fa', 'fe', 'flu', 'ga',
+             'hy', 'in', 'ke', 'la', 'le', 'lo', 'ma', 'me', 'mi', 'mo', 'na', 'ne', 'ni', 'no', 'ol', 'pa',
+             'pe', 'pi', 'pra', 'pre', 'ra', 're', 'ri', 'ro', 'sa', 'se', 'si', 'so', 'ta', 'te', 'ti', 'to',
+             'tra', 'va', 've', 'xa', 'zo']
+SUFFIXES = ['mol', 'cin', 'pril', 'sartan', 'statin', 'zole', 'mab', 'nib', 'pam', 'lol', 'dine', 'fen',
+            'cillin', 'mycin', 'tide', 'xone', 'phine', 'vir', 'ine', 'ide']
+FORMS = ['', '', '', ' 5mg', ' 10mg', ' 250mg', ' 500mg', ' syrup', ' cream', ' drops', ' injection']
+
+
+def synthetic_names(count: int, rng: random.Random) -> list:
+    names = set()
+    while len(names) < count:
+        stem = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) + rng.choice(SUFFIXES)
+        names.add(stem.capitalize() + rng.choice(FORMS))
+    return sorted(names)
+
+
+def history_rows(names: list, doctors: int, rng: random.Random, now: datetime) -> list:
+    """(name, doctor_id, uses, last_used) rows as build_catalog would read them"""
+    rows = []
+    for rank, name in enumerate(rng.sample(names, len(names)), start=1):
+        uses = max(1, int(50_000 / rank ** 1.1))
+        for doctor_id in rng.sample(range(1, doctors + 1), min(doctors, rng.randint(1, 4))):
+            rows.append((name, doctor_id, max(1, uses // 4), now - timedelta(days=rng.uniform(0, 720))))
+    return rows
+
+
+def _percentile(values: list, pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--names', type=int, default=300_000, help='distinct medicine names')
+    parser.add_argument('--doctors', type=int, default=2_000)
+    parser.add_argument('--lookups', type=int, default=20_000)
+    parser.add_argument('--limit', type=int, default=10, help='suggestions per lookup')
+    parser.add_argument('--write-ratio', type=float, default=0.02, help='share of operations that add a prescription')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON here')
+    args = parser.parse_args()
+
+    _configure()
+
+    from ..services.medical_records.medicines import MedicineCatalog
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    names = synthetic_names(args.names, rng)
+    rows = history_rows(names, args.doctors, rng, now)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    catalog = MedicineCatalog()
+    catalog.load(rows)
+    catalog.warm()
+    build_ms = (time.perf_counter() - started) * 1000
+    catalog_mb = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+
+    timings = defaultdict(list)
+    writes = 0
+    letters = string.ascii_lowercase
+    for _ in range(args.lookups):
+        if rng.random() < args.write_ratio:
+            catalog.add(rng.choice(names), rng.randint(1, args.doctors), now)
+            writes += 1
+            continue
+        length = rng.randint(1, 5)
+        # mostly real prefixes, some that match nothing
+        source = rng.choice(names) if rng.random() < 0.9 else ''.join(rng.choice(letters) for _ in range(5))
+        prefix = source[:length]
+        started = time.perf_counter()
+        catalog.suggest(prefix, doctor_id=rng.randint(1, args.doctors), limit=args.limit, now=now)
+        timings[length].append(time.perf_counter() - started)
+
+    per_length = {}
+    for length in sorted(timings):
+        values = sorted(timings[length])
+        per_length[length] = {
+            'lookups': len(values),
+            'p50_us': round(_percentile(values, 0.50) * 1e6, 1),
+            'p95_us': round(_percentile(values, 0.95) * 1e6, 1),
+            'p99_us': round(_percentile(values, 0.99) * 1e6, 1),
+        }
+    report = {
+        'names': len(catalog),
+        'history_rows': len(rows),
+        'build_ms': round(build_ms, 1),
+        'catalog_mb': round(catalog_mb, 1),
+        'writes': writes,
+        'prefix_length': per_length,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for password verification throughput (logins per second).
+
+    python -m backend.benchmarks.bench_passwords --count 200 --clients 16
+"""
+import argparse
+import os
+import threading
+import time
+
+from flask_bcrypt import Bcrypt
+
+from ..core.passwords import BCRYPT_LOG_ROUNDS, PasswordPool, PasswordPoolBusy
+
+
+def bench_inline(password_hash: str, password: str, count: int) -> dict:
+    """Verify on the calling thread, as the login route used to"""
+    bcrypt = Bcrypt()
+    started = time.perf_counter()
+    for _ in range(count):
+        bcrypt.check_password_hash(password_hash, password)
+    elapsed = time.perf_counter() - started
+    return _result(count, 0, elapsed)
+
+
+def bench_pool(password_hash: str, password: str, count: int, clients: int, workers: int, max_queue: int) -> dict:
+    """Verify through the bounded pool from `clients` concurrent request threads"""
+    pool = PasswordPool(workers=workers, max_queue=max_queue)
+    bcrypt = Bcrypt()
+    remaining = [count]
+    done = [0, 0]  # verified, rejected
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            try:
+                pool.run(bcrypt.check_password_hash, password_hash, password)
+                with lock:
+                    done[0] += 1
+            except PasswordPoolBusy:
+                with lock:
+                    done[1] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+
+    return _result(done[0], done[1], elapsed)
+
+
+def _result(verified: int, rejected: int, elapsed: float) -> dict:
+    per_second = verified / elapsed if elapsed else 0
+    return {
+        'verified': verified,
+        'rejected': rejected,
+        'seconds': round(elapsed, 3),
+        'logins_per_second': round(per_second, 1),
+        'logins_per_second_per_core': round(per_second / (os.cpu_count() or 1), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200, help='verifications per run')
+    parser.add_argument('--rounds', type=int, default=BCRYPT_LOG_ROUNDS, help='bcrypt cost')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent request threads')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='pool threads')
+    parser.add_argument('--max-queue', type=int, default=None, help='pool queue depth (default workers * 8)')
+    args = parser.parse_args()
+
+    password = 'correct horse battery staple'
+    password_hash = Bcrypt().generate_password_hash(password, args.rounds).decode('utf-8')
+    max_queue = args.max_queue if args.max_queue is not None else args.workers * 8
+
+    print(f"bcrypt cost {args.rounds}, {os.cpu_count()} cores, {args.count} verifications")
+    print(f"inline: {bench_inline(password_hash, password, args.count)}")
+    print(f"pool ({args.workers} workers, queue {max_queue}, {args.clients} clients): "
+          f"{bench_pool(password_hash, password, args.count, args.clients, args.workers, max_queue)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Benchmark for the database connection pool under concurrent load.
+
+Worker threads check a connection out, run a slot-style lookup on
+appointments, hold the connection for a while to stand in for the rest of a
+request, and give it back. This runs once for every pool configuration in
+the matrix. The script reports throughput, how long threads waited for a
+connection, checkout timeouts, and how many physical connections were opened.
+Each configuration starts from the options core/engine.py would give the
+chosen process type.
+
+Runs against a scratch database (sqlite by default), never the configured one.
+Point --database at a Postgres copy to size a production pool.
+
+    python -m backend.benchmarks.bench_pool --scale tiny --threads 32 --pool-sizes 2,5,10,20
+    python -m backend.benchmarks.bench_pool --reuse --process worker --threads 4 --hold-ms 50
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+
+def _configure(database_url: str) -> None:
+    # must be set before the app and its config are imported
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+    os.environ.setdefault('ADMIN_USERNAME', 'admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'admin')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('SLOW_QUERY_LOG', 'false')
+
+
+SLOT_QUERY = (
+    "SELECT appointment_time FROM appointments "
+    "WHERE doctor_id = :doctor_id AND appointment_date = :day AND status != 'cancelled'"
+)
+
+
+class PoolStats:
+    """Counts physical connections and tracks the most connections checked out at once"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.connects = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'connect', self._connect)
+        event.listen(engine, 'checkout', self._checkout)
+        event.listen(engine, 'checkin', self._checkin)
+
+    def _connect(self, dbapi_connection, record):
+        with self._lock:
+            self.connects += 1
+
+    def _checkout(self, dbapi_connection, record, proxy):
+        with self._lock:
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def _checkin(self, dbapi_connection, record):
+        with self._lock:
+            self.checked_out -= 1
+
+
+def _percentile(values: list, pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def run_config(database_url: str, options: dict, doctor_ids: list, threads: int, duration: float,
+               hold_ms: float, seed: int) -> dict:
+    """Hammer one engine built with `options` from `threads` threads for `duration` seconds"""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+    from ..core.engine import configure_engine
+
+    engine = create_engine(database_url, **options)
+    configure_engine(engine)
+    stats = PoolStats(engine)
+    query = text(SLOT_QUERY)
+    today = date.today()
+    waits, totals = [], []
+    errors = {'timeouts': 0, 'failed': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local_waits, local_totals = [], []
+        timeouts = failed = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    checked_out = time.perf_counter()
+                    conn.execute(query, {
+                        'doctor_id': rng.choice(doctor_ids),
+                        'day': today + timedelta(days=rng.randint(0, 30))
+                    }).fetchall()
+                    if hold_ms:
+                        time.sleep(hold_ms / 1000)
+            except PoolTimeout:
+                timeouts += 1
+                continue
+            except Exception:
+                failed += 1
+                continue
+            local_waits.append(checked_out - started)
+            local_totals.append(time.perf_counter() - started)
+        with lock:
+            waits.extend(local_waits)
+            totals.extend(local_totals)
+            errors['timeouts'] += timeouts
+            errors['failed'] += failed
+
+    started = time.perf_counter()
+    pool_threads = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool_threads:
+        thread.start()
+    for thread in pool_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    waits.sort()
+    totals.sort()
+    return {
+        'pool_size': options.get('pool_size'),
+        'max_overflow': options.get('max_overflow'),
+        'pool_pre_ping': options.get('pool_pre_ping'),
+        'operations': len(totals),
+        'throughput_ops': round(len(totals) / elapsed, 1),
+        'checkout_wait_p50_ms': round(_percentile(waits, 0.50) * 1000, 2),
+        'checkout_wait_p95_ms': round(_percentile(waits, 0.95) * 1000, 2),
+        'checkout_wait_p99_ms': round(_percentile(waits, 0.99) * 1000, 2),
+        'total_p95_ms': round(_percentile(totals, 0.95) * 1000, 2),
+        'timeouts': errors['timeouts'],
+        'failed': errors['failed'],
+        'connections_opened': stats.connects,
+        'max_checked_out': stats.max_checked_out
+    }
+
+
+def _int_list(value: str) -> list:
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'chikitsa_bench_pool.db'))
+    parser.add_argument('--scale', default='tiny', help='dataset scale, see dataset.SCALES')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reuse', action='store_true', help='run on the existing data instead of regenerating it')
+    parser.add_argument('--process', choices=('web', 'worker'), default='web', help='engine defaults to start from')
+    parser.add_argument('--threads', type=int, default=32, help='concurrent threads competing for connections')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per configuration')
+    parser.add_argument('--hold-ms', type=float, default=5.0, help='time a connection is held after the query')
+    parser.add_argument('--pool-sizes', type=_int_list, help='pool_size values to try, defaults to the configured one')
+    parser.add_argument('--overflow', type=_int_list, help='max_overflow values to try, defaults to the configured one')
+    parser.add_argument('--pool-timeout', type=float, help='override pool_timeout in seconds')
+    parser.add_argument('--pre-ping', choices=('on', 'off', 'both'), help='override pool_pre_ping')
+    parser.add_argument('--output', help='write results as JSON here')
+    args = parser.parse_args()
+
+    _configure(args.database)
+
+    from ..app import app
+    from ..core.database import db
+    from ..core.engine import engine_options
+    from ..core.models import Doctor
+    from .dataset import build_dataset
+
+    if not args.reuse:
+        build_dataset(app, scale=args.scale, seed=args.seed, log=lambda message: None)
+    with app.app_context():
+        doctor_ids = [doctor_id for (doctor_id,) in db.session.query(Doctor.id)]
+    if not doctor_ids:
+        parser.error('the database has no doctors, run without --reuse first')
+
+    base = engine_options(args.database, args.process)
+    if 'pool_size' not in base:
+        parser.error('in-memory sqlite has a single static connection, use a file or server database')
+    if args.pool_timeout is not None:
+        base['pool_timeout'] = args.pool_timeout
+    pre_pings = {'on': [True], 'off': [False], 'both': [True, False]}.get(args.pre_ping, [base['pool_pre_ping']])
+
+    results = []
+    for pool_size in args.pool_sizes or [base['pool_size']]:
+        for overflow in args.overflow or [base['max_overflow']]:
+            for pre_ping in pre_pings:
+                options = dict(base, pool_size=pool_size, max_overflow=overflow, pool_pre_ping=pre_ping)
+                result = run_config(args.database, options, doctor_ids, args.threads, args.duration,
+                                    args.hold_ms, args.seed)
+                results.append(result)
+                print(json.dumps(result))
+
+    report = {
+        'database': args.database.split('://')[0],
+        'process': args.process,
+        'threads': args.threads,
+        'duration': args.duration,
+        'hold_ms': args.hold_ms,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark for patient and medical record search, through the search indexes
+and through the ILIKE scan.
+
+Search terms are drawn from the generated data:
+- patients: name prefixes, full names, email fragments and phone suffixes
+- records: diagnosis words and prefixes, symptom words and medicine names
+
+Each term runs through PatientService.search_patients or
+MedicalRecordService.search twice, once on the index and once with the
+index switched off. The script reports latency percentiles and hit counts
+for each target and mode.
+
+Runs against a scratch database (sqlite by default), never the configured one.
+
+    python -m backend.benchmarks.bench_search --scale small
+    python -m backend.benchmarks.bench_search --reuse --target records --queries 500 --no-scan
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+
+def _configure(database_url: str) -> None:
+    # must be set before the app and its config are imported
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+    os.environ.setdefault('ADMIN_USERNAME', 'admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'admin')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('SLOW_QUERY_LOG', 'false')
+
+
+def _percentile(values: list, pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def patient_terms(count: int, seed: int) -> list:
+    """Search box entries a receptionist would type, drawn from real patients"""
+    from ..core.database import db
+    from ..core.models import Patient, User
+
+    rng = random.Random(seed)
+    max_id = db.session.query(db.func.max(Patient.id)).scalar() or 0
+    terms = []
+    while len(terms) < count and max_id:
+        row = db.session.query(Patient, User).join(User, Patient.user_id == User.id).filter(
+            Patient.id == rng.randint(1, max_id)
+        ).first()
+        if not row:
+            continue
+        patient, user = row
+        terms.append(rng.choice([
+            patient.first_name[:rng.randint(3, len(patient.first_name))],
+            f"{patient.first_name} {patient.last_name}",
+            user.email.split('@')[0][-6:],
+            patient.phone[-5:],
+        ]))
+    return terms
+
+
+def record_terms(count: int, seed: int) -> list:
+    """What a doctor looking for similar cases would type, drawn from real records"""
+    from ..core.database import db
+    from ..core.models import MedicalRecord, PrescriptionItem
+
+    rng = random.Random(seed)
+    max_id = db.session.query(db.func.max(MedicalRecord.id)).scalar() or 0
+    terms = []
+    while len(terms) < count and max_id:
+        record = db.session.get(MedicalRecord, rng.randint(1, max_id))
+        if not record:
+            continue
+        diagnosis = rng.choice(record.diagnosis.split())
+        item = db.session.query(PrescriptionItem).filter_by(medical_record_id=record.id).first()
+        terms.append(rng.choice([
+            diagnosis,
+            diagnosis[:4],
+            f"{diagnosis} {rng.choice(record.symptoms.split())}",
+            item.medicine_name.split()[0] if item else record.diagnosis,
+        ]))
+    return terms
+
+
+def _search_patients(term: str, per_page: int) -> int:
+    from ..services.patients.service import PatientService
+    return PatientService.search_patients(term, True, 1, per_page)[1]
+
+
+def _search_records(term: str, per_page: int) -> int:
+    from ..services.medical_records.service import MedicalRecordService
+    return MedicalRecordService.search(term, page=1, per_page=per_page)[1]
+
+
+# target -> (index name, term sampler, search returning the total)
+TARGETS = {
+    'patients': ('patient_search', patient_terms, _search_patients),
+    'records': ('record_search', record_terms, _search_records),
+}
+
+
+def run_mode(target: str, terms: list, indexed: bool, per_page: int) -> dict:
+    """Time every term through the target's search with its index on or off"""
+    from ..core import search
+
+    index, _, run = TARGETS[target]
+    ready = search._ready.get(index)
+    search._ready[index] = indexed and bool(ready)
+    timings, hits = [], []
+    try:
+        for term in terms:
+            started = time.perf_counter()
+            hits.append(run(term, per_page))
+            timings.append(time.perf_counter() - started)
+    finally:
+        search._ready[index] = ready
+
+    timings.sort()
+    return {
+        'target': target,
+        'mode': 'index' if indexed else 'scan',
+        'queries': len(terms),
+        'p50_ms': round(_percentile(timings, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(timings, 0.95) * 1000, 2),
+        'p99_ms': round(_percentile(timings, 0.99) * 1000, 2),
+        'mean_hits': round(sum(hits) / len(hits), 1) if hits else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'chikitsa_bench_search.db'))
+    parser.add_argument('--scale', default='small', help='dataset scale, see dataset.SCALES')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reuse', action='store_true', help='run on the existing data instead of regenerating it')
+    parser.add_argument('--target', choices=('all', *TARGETS), default='all')
+    parser.add_argument('--queries', type=int, default=200, help='search terms per mode')
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--no-scan', action='store_true', help='skip the ILIKE scan, slow on the large scales')
+    parser.add_argument('--output', help='write results as JSON here')
+    args = parser.parse_args()
+
+    _configure(args.database)
+
+    from ..app import app, init_db
+    from ..core.search import index_ready
+    from ..services.medical_records import search as record_search
+    from ..services.patients import search as patient_search
+    from .dataset import build_dataset
+
+    checks = {module.INDEX: module.READY_CHECKS for module in (patient_search, record_search)}
+
+    if not args.reuse:
+        build_dataset(app, scale=args.scale, seed=args.seed, log=lambda message: None)
+
+    results = []
+    with app.app_context():
+        if args.reuse:
+            # databases built before the index existed get it here
+            init_db()
+        for target in (TARGETS if args.target == 'all' else [args.target]):
+            index, sample, _ = TARGETS[target]
+            if not index_ready(index, checks[index]):
+                parser.error(f"this database has no {index} index, see the init-db warning")
+            terms = sample(args.queries, args.seed)
+            for indexed in (True, False):
+                if not indexed and args.no_scan:
+                    continue
+                # one untimed pass so both modes start from a warm page cache
+                run_mode(target, terms[:10], indexed, args.per_page)
+                result = run_mode(target, terms, indexed, args.per_page)
+                results.append(result)
+                print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'database': args.database.split('://')[0], 'results': results}, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
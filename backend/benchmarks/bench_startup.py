@@ -0,0 +1,78 @@
+"""
+Benchmark for process start and per-task app overhead.
+
+    python -m backend.benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+COLD_START = (
+    "import time; started = time.perf_counter(); "
+    "from backend.app import app; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def bench_cold_start(runs: int) -> dict:
+    """Import backend.app (which builds the app) in fresh interpreters"""
+    imports = []
+    walls = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', COLD_START], capture_output=True, text=True, check=True)
+        walls.append(time.perf_counter() - started)
+        imports.append(float(out.stdout.strip().splitlines()[-1]))
+    return {
+        'runs': runs,
+        'import_and_create_ms': round(min(imports) * 1000, 2),
+        'process_wall_ms': round(min(walls) * 1000, 2)
+    }
+
+
+def bench_per_task(count: int) -> dict:
+    """App setup a celery task pays: building an app vs reusing the singleton"""
+    from ..app import create_app, get_app, init_db
+
+    started = time.perf_counter()
+    for _ in range(count):
+        with create_app().app_context():
+            pass
+    create_ms = (time.perf_counter() - started) * 1000 / count
+
+    started = time.perf_counter()
+    for _ in range(count):
+        with get_app().app_context():
+            pass
+    singleton_ms = (time.perf_counter() - started) * 1000 / count
+
+    # what every create_app call used to run before init-db was split out
+    app = get_app()
+    started = time.perf_counter()
+    for _ in range(count):
+        with app.app_context():
+            init_db()
+    init_db_ms = (time.perf_counter() - started) * 1000 / count
+
+    return {
+        'tasks': count,
+        'create_app_ms': round(create_ms, 3),
+        'singleton_ms': round(singleton_ms, 3),
+        'init_db_ms': round(init_db_ms, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreter starts')
+    parser.add_argument('--tasks', type=int, default=200, help='simulated task invocations')
+    args = parser.parse_args()
+
+    print(f"cold start: {json.dumps(bench_cold_start(args.runs))}")
+    print(f"per task:   {json.dumps(bench_per_task(args.tasks))}")
+
+
+if __name__ == '__main__':
+    main()
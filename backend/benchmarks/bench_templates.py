@@ -0,0 +1,83 @@
+"""
+Benchmark for email/report template rendering.
+
+    python -m backend.benchmarks.bench_templates --count 10000
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from ..utils.email_templates import generate_appointment_reminder_html
+from ..utils.report_templates import generate_monthly_report_html
+
+
+def bench_reminders(count: int) -> dict:
+    """Render `count` reminders with distinct recipient fields"""
+    start_date = date.today()
+
+    started = time.perf_counter()
+    total_bytes = 0
+    for i in range(count):
+        html = generate_appointment_reminder_html(
+            patient_name=f"Patient {i}",
+            appointment_date=start_date + timedelta(days=i % 30),
+            appointment_time=f"{9 + i % 8:02d}:{(i % 2) * 30:02d}",
+            doctor_name=f"Doctor {i % 50}",
+            department=f"Department {i % 10}",
+            hospital_phone='+91-XXXXXXXXXX'
+        )
+        total_bytes += len(html)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'rendered': count,
+        'seconds': round(elapsed, 4),
+        'per_second': round(count / elapsed, 1) if elapsed else None,
+        'avg_bytes': total_bytes // count if count else 0
+    }
+
+
+def bench_reports(count: int) -> dict:
+    """Render `count` monthly reports with full diagnosis and consultation tables"""
+    diagnoses = [{'diagnosis': f"diagnosis {i}", 'count': 10 - i} for i in range(5)]
+    consultations = [
+        {'date': '01 Jan', 'patient': f"Patient {i}", 'diagnosis': f"diagnosis {i % 5}", 'rx_count': i % 4}
+        for i in range(15)
+    ]
+
+    started = time.perf_counter()
+    for i in range(count):
+        generate_monthly_report_html(
+            doctor_name=f"Doctor {i}",
+            department='Cardiology',
+            month_name='January 2025',
+            total_appointments=120,
+            completed=100,
+            cancelled=12,
+            no_show=8,
+            top_diagnoeses=diagnoses,
+            consultations=consultations,
+            total_prescriptions=80,
+            total_followups=30
+        )
+    elapsed = time.perf_counter() - started
+
+    return {
+        'rendered': count,
+        'seconds': round(elapsed, 4),
+        'per_second': round(count / elapsed, 1) if elapsed else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Template rendering benchmark')
+    parser.add_argument('--count', type=int, default=10000, help='number of reminders to render')
+    parser.add_argument('--reports', type=int, default=1000, help='number of monthly reports to render')
+    args = parser.parse_args()
+
+    print(f"reminders: {bench_reminders(args.count)}")
+    print(f"reports:   {bench_reports(args.reports)}")
+
+
+if __name__ == '__main__':
+    main()
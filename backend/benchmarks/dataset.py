@@ -0,0 +1,513 @@
+"""
+Synthetic hospital dataset for scale testing.
+
+Generates departments, doctors with working hours and leave, patients,
+appointments with a realistic status mix, and medical records with
+prescription items, straight from the core.models schema. Rows are
+bulk-inserted in batches (executemany, COPY on Postgres) with explicit
+ids, and the output depends only on the arguments and --seed.
+
+Runs against a scratch database (sqlite by default), never the configured one.
+
+    python -m backend.benchmarks.dataset --scale small --reset
+    python -m backend.benchmarks.dataset --scale large --database postgresql://... --reset
+
+Other benchmarks load it with build_dataset(app, scale='small').
+All generated accounts share the password DATASET_PASSWORD.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+DATASET_PASSWORD = 'dataset-password'
+
+SCALES = {
+    'tiny': {'departments': 5, 'doctors': 20, 'patients': 500, 'appointments': 5_000},
+    'small': {'departments': 10, 'doctors': 100, 'patients': 10_000, 'appointments': 100_000},
+    'medium': {'departments': 20, 'doctors': 500, 'patients': 200_000, 'appointments': 1_000_000},
+    'large': {'departments': 30, 'doctors': 2_000, 'patients': 1_000_000, 'appointments': 10_000_000},
+}
+
+TABLE_ORDER = (
+    'departments', 'users', 'doctors', 'doctor_working_hours', 'doctor_unavailability',
+    'patients', 'appointments', 'medical_records', 'prescription_items'
+)
+
+COLUMNS = {
+    'departments': ('id', 'name', 'description', 'is_active', 'created_at', 'updated_at'),
+    'users': ('id', 'username', 'email', 'password_hash', 'role', 'is_active', 'created_at'),
+    'doctors': ('id', 'user_id', 'department_id', 'first_name', 'last_name', 'specialization',
+                'qualification', 'experience_years', 'phone', 'consultation_fee', 'is_available',
+                'created_at', 'updated_at'),
+    'doctor_working_hours': ('id', 'doctor_id', 'day_of_week', 'start_time', 'end_time'),
+    'doctor_unavailability': ('id', 'doctor_id', 'start_datetime', 'end_datetime', 'unavailability_type',
+                              'reason', 'created_at'),
+    'patients': ('id', 'user_id', 'first_name', 'last_name', 'dob', 'gender', 'blood_group', 'phone',
+                 'address', 'emergency_contact_name', 'emergency_contact_phone', 'medical_history',
+                 'created_at', 'updated_at'),
+    'appointments': ('id', 'patient_id', 'doctor_id', 'appointment_date', 'appointment_time', 'status',
+                     'booking_notes', 'created_at', 'updated_at'),
+    'medical_records': ('id', 'appointment_id', 'patient_id', 'doctor_id', 'symptoms', 'diagnosis',
+                        'prescription', 'treatment_notes', 'followup_date', 'doctor_notes',
+                        'created_at', 'updated_at'),
+    'prescription_items': ('id', 'medical_record_id', 'medicine_name', 'dosage', 'frequency', 'duration',
+                           'instructions'),
+}
+
+DEPARTMENTS = [
+    ('Cardiology', 'Cardiologist'), ('Neurology', 'Neurologist'), ('Orthopedics', 'Orthopedic Surgeon'),
+    ('Pediatrics', 'Pediatrician'), ('Dermatology', 'Dermatologist'), ('General Medicine', 'General Physician'),
+    ('ENT', 'ENT Specialist'), ('Ophthalmology', 'Ophthalmologist'), ('Gynecology', 'Gynecologist'),
+    ('Psychiatry', 'Psychiatrist'), ('Oncology', 'Oncologist'), ('Nephrology', 'Nephrologist'),
+    ('Gastroenterology', 'Gastroenterologist'), ('Pulmonology', 'Pulmonologist'), ('Urology', 'Urologist'),
+    ('Endocrinology', 'Endocrinologist'), ('Rheumatology', 'Rheumatologist'), ('Radiology', 'Radiologist'),
+    ('Dentistry', 'Dentist'), ('Physiotherapy', 'Physiotherapist'), ('Anesthesiology', 'Anesthesiologist'),
+    ('Hematology', 'Hematologist'), ('Infectious Diseases', 'Infectious Disease Specialist'),
+    ('Geriatrics', 'Geriatrician'), ('Emergency Medicine', 'Emergency Physician'),
+    ('Plastic Surgery', 'Plastic Surgeon'), ('Neurosurgery', 'Neurosurgeon'), ('Pathology', 'Pathologist'),
+    ('Allergy and Immunology', 'Immunologist'), ('Sports Medicine', 'Sports Medicine Specialist'),
+]
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan',
+    'Ananya', 'Diya', 'Aadhya', 'Saanvi', 'Pari', 'Anika', 'Navya', 'Myra', 'Kavya', 'Priya',
+    'Rahul', 'Amit', 'Sneha', 'Pooja', 'Vikram', 'Neha', 'Suresh', 'Lakshmi', 'Meera', 'Karan',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Patel', 'Reddy', 'Nair', 'Iyer', 'Gupta', 'Singh', 'Kumar', 'Das',
+    'Mehta', 'Joshi', 'Rao', 'Pillai', 'Menon', 'Chatterjee', 'Banerjee', 'Kulkarni', 'Desai', 'Shah',
+]
+CITIES = ['Mumbai', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Kochi', 'Jaipur', 'Lucknow']
+STREETS = ['MG Road', 'Park Street', 'Station Road', 'Lake View', 'Temple Street', 'Gandhi Nagar', 'Nehru Marg']
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+GENDERS = ['male', 'female', 'other']
+QUALIFICATIONS = ['MBBS', 'MBBS, MD', 'MBBS, MS', 'MBBS, DNB', 'MBBS, MD, DM', 'MBBS, MS, MCh']
+HISTORIES = ['Hypertension', 'Type 2 diabetes', 'Asthma', 'Hypothyroidism', 'Migraine', 'Penicillin allergy']
+BOOKING_NOTES = ['Follow-up visit', 'First consultation', 'Review test results', 'Recurring pain',
+                 'Prescription refill', 'Referred by GP']
+LEAVE_REASONS = [('leave', 'Annual leave'), ('conference', 'Medical conference'), ('sick', 'Sick leave'),
+                 ('training', 'Training')]
+
+# (symptoms, diagnosis, medicines)
+CONDITIONS = [
+    ('Fever, sore throat, body ache', 'Viral pharyngitis', ['Paracetamol', 'Cetirizine']),
+    ('Persistent cough, mild fever', 'Acute bronchitis', ['Azithromycin', 'Ambroxol', 'Paracetamol']),
+    ('Headache, sensitivity to light', 'Migraine', ['Sumatriptan', 'Naproxen']),
+    ('Chest discomfort on exertion', 'Stable angina', ['Aspirin', 'Atorvastatin', 'Metoprolol']),
+    ('Frequent urination, thirst', 'Type 2 diabetes mellitus', ['Metformin', 'Glimepiride']),
+    ('Lower back pain', 'Lumbar strain', ['Ibuprofen', 'Thiocolchicoside']),
+    ('Itchy rash on forearms', 'Contact dermatitis', ['Hydrocortisone cream', 'Cetirizine']),
+    ('Wheezing, shortness of breath', 'Asthma exacerbation', ['Salbutamol inhaler', 'Budesonide inhaler']),
+    ('Burning stomach pain after meals', 'Gastritis', ['Pantoprazole', 'Domperidone']),
+    ('Fatigue, weight gain', 'Hypothyroidism', ['Levothyroxine']),
+    ('Knee pain and swelling', 'Osteoarthritis', ['Diclofenac', 'Glucosamine']),
+    ('Elevated blood pressure on review', 'Essential hypertension', ['Amlodipine', 'Telmisartan']),
+]
+DOSAGES = ['250mg', '500mg', '5mg', '10mg', '20mg', '40mg', '1 puff', 'Apply thin layer']
+FREQUENCIES = ['Once daily', 'Twice daily', 'Three times daily', 'As needed', 'At bedtime']
+DURATIONS = ['3 days', '5 days', '7 days', '14 days', '1 month', '3 months']
+INSTRUCTIONS = ['After food', 'Before food', 'With water', 'Avoid alcohol', None]
+
+# (status, weight) mix for past and upcoming appointments
+PAST_STATUSES = [('completed', 0.72), ('cancelled', 0.15), ('no_show', 0.08), ('scheduled', 0.05)]
+FUTURE_STATUSES = [('scheduled', 0.9), ('cancelled', 0.1)]
+
+SLOT_MINUTES = 30
+
+
+def _configure(database_url: str) -> None:
+    # must be set before the app and its config are imported
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'dataset-secret-key-with-enough-length')
+    os.environ.setdefault('ADMIN_USERNAME', 'admin')
+    os.environ.setdefault('ADMIN_PASSWORD', 'admin')
+
+
+def _pick(rng, weighted):
+    roll = rng.random()
+    for value, weight in weighted:
+        roll -= weight
+        if roll < 0:
+            return value
+    return weighted[-1][0]
+
+
+def _password_hash(rng) -> str:
+    """bcrypt hash with a salt drawn from the seed, so reruns match"""
+    import bcrypt
+    from ..core.passwords import BCRYPT_LOG_ROUNDS
+
+    alphabet = './ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+    salt = f"$2b${BCRYPT_LOG_ROUNDS:02d}$" + ''.join(rng.choice(alphabet) for _ in range(21)) + '.'
+    return bcrypt.hashpw(DATASET_PASSWORD.encode(), salt.encode()).decode()
+
+
+class BulkWriter:
+    """
+    Buffers rows per table and writes them in foreign key order once any
+    buffer reaches batch_size, one transaction per batch. Values go through
+    the column types' bind processors so stored formats match the ORM.
+    """
+
+    def __init__(self, conn, tables: dict, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.counts = Counter()
+        self.buffers = {name: [] for name in TABLE_ORDER}
+        dialect = conn.dialect
+        self.dialect = dialect.name
+        quote = dialect.identifier_preparer.quote
+
+        self.converters = {}
+        self.statements = {}
+        placeholder = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}.get(dialect.paramstyle)
+        for name in TABLE_ORDER:
+            table = tables[name]
+            converters = []
+            for i, column in enumerate(COLUMNS[name]):
+                process = table.c[column].type.dialect_impl(dialect).bind_processor(dialect)
+                if process is not None:
+                    converters.append((i, lru_cache(maxsize=8192)(process)))
+            self.converters[name] = converters
+            self.statements[name] = (
+                f"INSERT INTO {quote(name)} ({', '.join(quote(c) for c in COLUMNS[name])}) "
+                f"VALUES ({', '.join([placeholder] * len(COLUMNS[name]))})"
+            ) if placeholder else None
+        self.tables = tables
+
+        self.copy = False
+        if self.dialect == 'postgresql':
+            cursor = conn.connection.dbapi_connection.cursor()
+            self.copy = hasattr(cursor, 'copy_expert')
+            cursor.close()
+
+    def add(self, table: str, row: tuple) -> None:
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def _convert(self, table: str, rows: list) -> list:
+        converters = self.converters[table]
+        if not converters:
+            return rows
+        converted = []
+        for row in rows:
+            row = list(row)
+            for i, process in converters:
+                if row[i] is not None:
+                    row[i] = process(row[i])
+            converted.append(row)
+        return converted
+
+    def _copy(self, table: str, rows: list) -> None:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = self.conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+    def flush(self) -> None:
+        for table in TABLE_ORDER:
+            rows = self.buffers[table]
+            if not rows:
+                continue
+            rows = self._convert(table, rows)
+            if self.copy:
+                self._copy(table, rows)
+            elif self.statements[table]:
+                self.conn.exec_driver_sql(self.statements[table], [tuple(row) for row in rows])
+            else:
+                self.conn.execute(self.tables[table].insert(), [dict(zip(COLUMNS[table], row)) for row in rows])
+            self.counts[table] += len(rows)
+            self.buffers[table] = []
+        self.conn.commit()
+
+
+def _working_hours(rng):
+    """Weekday -> (start, end) for one doctor, Monday is 0 as in schedule.py"""
+    start_hour = rng.choice((8, 9, 9, 9, 10))
+    hours = {day: (dt_time(start_hour), dt_time(start_hour + 8)) for day in range(5)}
+    if rng.random() < 0.3:
+        hours[5] = (dt_time(9), dt_time(13))
+    return hours
+
+
+def _slot_times(start: dt_time, end: dt_time) -> list:
+    slots = []
+    current = datetime.combine(date.min, start)
+    last = datetime.combine(date.min, end) - timedelta(minutes=SLOT_MINUTES)
+    while current <= last:
+        slots.append(current.time())
+        current += timedelta(minutes=SLOT_MINUTES)
+    return slots
+
+
+def generate(conn, tables: dict, sizes: dict, seed: int = 42, anchor: date = None, days_back: int = 365,
+             days_ahead: int = 60, record_rate: float = 0.9, batch_size: int = 10_000, id_offset: dict = None,
+             log=print) -> dict:
+    """Write the dataset through `conn`; returns row counts per table and timings"""
+    rng = random.Random(seed)
+    anchor = anchor or date.today()
+    offset = Counter(id_offset or {})
+    writer = BulkWriter(conn, tables, batch_size)
+    timings = {}
+    started = time.perf_counter()
+
+    def phase(name):
+        writer.flush()
+        now = time.perf_counter()
+        timings[name] = round(now - phase.mark, 2)
+        log(f"{name}: {timings[name]}s {dict(writer.counts)}")
+        phase.mark = now
+    phase.mark = started
+
+    epoch = datetime.combine(anchor - timedelta(days=days_back + 365), dt_time(9))
+    password_hash = _password_hash(rng)
+    user_id = offset['users']
+
+    # departments
+    department_count = min(sizes['departments'], len(DEPARTMENTS))
+    departments = []
+    for i in range(department_count):
+        department_id = offset['departments'] + i + 1
+        name, specialization = DEPARTMENTS[i]
+        departments.append((department_id, specialization))
+        writer.add('departments', (department_id, name, f"Department of {name}", True, epoch, epoch))
+    phase('departments')
+
+    # doctors with their working hours and leave
+    first_day = anchor - timedelta(days=days_back)
+    last_day = anchor + timedelta(days=days_ahead)
+    total_days = (last_day - first_day).days + 1
+    doctors = []
+    hours_id = offset['doctor_working_hours']
+    leave_id = offset['doctor_unavailability']
+    for i in range(sizes['doctors']):
+        doctor_id = offset['doctors'] + i + 1
+        user_id += 1
+        department_id, specialization = departments[i % department_count]
+        created = epoch + timedelta(days=rng.randrange(365))
+        writer.add('users', (user_id, f"doctor{doctor_id}", f"doctor{doctor_id}@dataset.local", password_hash,
+                             'doctor', True, created))
+        writer.add('doctors', (
+            doctor_id, user_id, department_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), specialization,
+            rng.choice(QUALIFICATIONS), rng.randrange(1, 35), f"9{rng.randrange(10 ** 9):09d}",
+            Decimal(rng.randrange(300, 2000, 50)), rng.random() > 0.02, created, created
+        ))
+
+        hours = _working_hours(rng)
+        for day_of_week, (start, end) in sorted(hours.items()):
+            hours_id += 1
+            writer.add('doctor_working_hours', (hours_id, doctor_id, day_of_week, start, end))
+
+        leave_days = set()
+        for _ in range(max(total_days // 120, 1)):
+            start_day = first_day + timedelta(days=rng.randrange(total_days))
+            length = rng.randrange(1, 6)
+            leave_type, reason = rng.choice(LEAVE_REASONS)
+            leave_id += 1
+            writer.add('doctor_unavailability', (
+                leave_id, doctor_id, datetime.combine(start_day, dt_time(0)),
+                datetime.combine(start_day + timedelta(days=length - 1), dt_time(23, 59, 59)),
+                leave_type, reason, datetime.combine(start_day - timedelta(days=14), dt_time(10))
+            ))
+            leave_days.update(start_day + timedelta(days=d) for d in range(length))
+
+        slots = {day_of_week: _slot_times(start, end) for day_of_week, (start, end) in hours.items()}
+        doctors.append((doctor_id, slots, leave_days))
+    phase('doctors')
+
+    # patients
+    patient_first = offset['patients'] + 1
+    for i in range(sizes['patients']):
+        patient_id = patient_first + i
+        user_id += 1
+        created = epoch + timedelta(days=rng.randrange(days_back + 365), seconds=rng.randrange(86400))
+        writer.add('users', (user_id, f"patient{patient_id}", f"patient{patient_id}@dataset.local", password_hash,
+                             'patient', rng.random() > 0.01, created))
+        writer.add('patients', (
+            patient_id, user_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+            date(1940, 1, 1) + timedelta(days=rng.randrange(80 * 365)), rng.choice(GENDERS),
+            rng.choice(BLOOD_GROUPS), f"9{rng.randrange(10 ** 9):09d}",
+            f"{rng.randrange(1, 400)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+            rng.choice(FIRST_NAMES), f"8{rng.randrange(10 ** 9):09d}",
+            rng.choice(HISTORIES) if rng.random() < 0.3 else None, created, created
+        ))
+    phase('patients')
+
+    # appointments: every working slot is booked with the same probability,
+    # so there are never two bookings for one doctor and slot
+    def working_slots(doctor):
+        _, slots, leave_days = doctor
+        count = 0
+        day = first_day
+        for _ in range(total_days):
+            if day not in leave_days:
+                count += len(slots.get(day.weekday(), ()))
+            day += timedelta(days=1)
+        return count
+
+    capacity = sum(working_slots(doctor) for doctor in doctors)
+    fill = sizes['appointments'] / capacity if capacity else 0
+    if fill > 1:
+        log(f"only {capacity} slots for {sizes['appointments']} appointments, booking every slot")
+        fill = 1.0
+
+    appointment_id = offset['appointments']
+    record_id = offset['medical_records']
+    item_id = offset['prescription_items']
+    patient_count = sizes['patients']
+    random_ = rng.random
+    add = writer.add
+    for doctor_id, slots, leave_days in doctors:
+        day = first_day
+        for _ in range(total_days):
+            day_slots = slots.get(day.weekday())
+            if day_slots and day not in leave_days:
+                past = day < anchor
+                created = datetime.combine(day - timedelta(days=7), dt_time(12))
+                for slot in day_slots:
+                    if random_() >= fill:
+                        continue
+                    appointment_id += 1
+                    patient_id = patient_first + int(random_() * patient_count)
+                    status = _pick(rng, PAST_STATUSES if past else FUTURE_STATUSES)
+                    note = rng.choice(BOOKING_NOTES) if random_() < 0.2 else None
+                    add('appointments', (appointment_id, patient_id, doctor_id, day, slot, status, note,
+                                         created, created))
+
+                    if status != 'completed' or random_() >= record_rate:
+                        continue
+                    record_id += 1
+                    symptoms, diagnosis, medicines = rng.choice(CONDITIONS)
+                    visit = datetime.combine(day, slot)
+                    add('medical_records', (
+                        record_id, appointment_id, patient_id, doctor_id, symptoms, diagnosis,
+                        ', '.join(medicines), 'Advised rest and fluids' if random_() < 0.5 else None,
+                        day + timedelta(days=14) if random_() < 0.3 else None,
+                        'Review in two weeks' if random_() < 0.2 else None, visit, visit
+                    ))
+                    for medicine in medicines:
+                        item_id += 1
+                        add('prescription_items', (
+                            item_id, record_id, medicine, rng.choice(DOSAGES), rng.choice(FREQUENCIES),
+                            rng.choice(DURATIONS), rng.choice(INSTRUCTIONS)
+                        ))
+            day += timedelta(days=1)
+    phase('appointments')
+
+    return {
+        'seed': seed,
+        'anchor_date': anchor.isoformat(),
+        'rows': dict(writer.counts),
+        'seconds': round(time.perf_counter() - started, 2),
+        'phases': timings
+    }
+
+
+def _reset_sequences(conn, tables: dict) -> None:
+    """Explicit ids leave Postgres sequences behind, move them past the max"""
+    if conn.dialect.name != 'postgresql':
+        return
+    for name in TABLE_ORDER:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE((SELECT MAX(id) FROM {name}), 1))"
+        )
+    conn.commit()
+
+
+def build_dataset(app, scale: str = 'small', seed: int = 42, reset: bool = True, log=print, **options) -> dict:
+    """
+    Fill the app's database with a generated dataset. `scale` picks one of
+    SCALES and any of its keys can be overridden through `options`; the
+    remaining options are passed to generate().
+    """
+    from sqlalchemy import func
+
+    from ..app import init_db
+    from ..core.database import db
+    from ..core.models import (Appointment, Department, Doctor, DoctorUnavailability, DoctorWorkingHours,
+                               MedicalRecord, Patient, PrescriptionItem, User)
+
+    models = (Department, User, Doctor, DoctorWorkingHours, DoctorUnavailability, Patient, Appointment,
+              MedicalRecord, PrescriptionItem)
+    sizes = dict(SCALES[scale])
+    for key in list(options):
+        if key in sizes:
+            value = options.pop(key)
+            if value is not None:
+                sizes[key] = value
+
+    with app.app_context():
+        if reset:
+            db.drop_all(bind_key=None)
+        init_db()
+
+        if Doctor.query.count() or Patient.query.count():
+            raise ValueError("Database already has doctors or patients, pass reset=True (--reset)")
+
+        id_offset = {
+            model.__tablename__: db.session.query(func.coalesce(func.max(model.id), 0)).scalar()
+            for model in models
+        }
+        tables = {model.__tablename__: model.__table__ for model in models}
+        db.session.remove()
+
+        with db.engine.connect() as conn:
+            if conn.dialect.name == 'sqlite':
+                conn.exec_driver_sql('PRAGMA synchronous = OFF')
+            result = generate(conn, tables, sizes, seed=seed, id_offset=id_offset, log=log, **options)
+            _reset_sequences(conn, tables)
+
+    result['scale'] = scale
+    result['sizes'] = sizes
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='sqlite:///' + os.path.join(tempfile.gettempdir(), 'chikitsa_dataset.db'))
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--departments', type=int)
+    parser.add_argument('--doctors', type=int)
+    parser.add_argument('--patients', type=int)
+    parser.add_argument('--appointments', type=int, help='target count, the generated total is close to it')
+    parser.add_argument('--days-back', type=int, default=365)
+    parser.add_argument('--days-ahead', type=int, default=60)
+    parser.add_argument('--anchor-date', type=date.fromisoformat, default=None,
+                        help='date treated as today, fix it for identical reruns (default today)')
+    parser.add_argument('--record-rate', type=float, default=0.9, help='share of completed visits with a record')
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args()
+
+    _configure(args.database)
+
+    from ..app import app
+
+    print(f"generating {args.scale} dataset into {args.database}")
+    result = build_dataset(
+        app, scale=args.scale, seed=args.seed, reset=args.reset,
+        departments=args.departments, doctors=args.doctors, patients=args.patients,
+        appointments=args.appointments, anchor=args.anchor_date, days_back=args.days_back,
+        days_ahead=args.days_ahead, record_rate=args.record_rate, batch_size=args.batch_size
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,13 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.app import create_app
+# sizes the database pool for a worker, must be set before the app is imported
+os.environ.setdefault('PROCESS_TYPE', 'worker')
+
+from backend.app import get_app
 from backend.core.celery_config import make_celery
 
-flask_app = create_app()
+flask_app = get_app()
 
 celery = make_celery(flask_app)
 
@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# before any core module is imported, most of them read their settings at import time
+load_dotenv()
@@ -1,6 +1,12 @@
+import os
+import threading
+import time as _time
+import uuid
 from functools import wraps
 from datetime import datetime
+import redis
 from flask import jsonify, request
+from sqlalchemy import bindparam, inspect, text, update
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -8,17 +14,160 @@ from flask_jwt_extended import (
     get_jwt,
     verify_jwt_in_request
 )
+from ..core import cache
 from ..core.database import db
+from ..core.logger import logger
 from ..core.models import User
+from ..core.passwords import hash_password, verify_password, needs_rehash, PasswordPoolBusy
 
-def generate_tokens(user):
-    """Generate access and refresh tokens for a user"""
+# users.token_version is the source of truth, redis only caches it. The ttl
+# bounds how long a cached version can outlive a change made while redis was down
+ACCOUNT_VERSION_KEY = "chikitsa:account_version:{}"
+ACCOUNT_VERSION_TTL = int(os.getenv('ACCOUNT_VERSION_TTL', 300))  # secs
+
+# minimum version for inactive or deleted accounts, above any issued token
+INACTIVE_VERSION = 2 ** 31
+
+# without redis, account status is read from the db and kept this long per process
+ACCOUNT_STATUS_LOCAL_TTL = int(os.getenv('ACCOUNT_STATUS_LOCAL_TTL', 30))  # secs
+_local_status = {}
+# accounts changed while redis was unreachable, their cached versions are dropped on reconnect
+_stale_versions = set()
+_stale_lock = threading.Lock()
+
+# last_login is written behind: logins are buffered and flushed in bulk
+LAST_LOGIN_KEY = "chikitsa:last_login"
+LAST_LOGIN_WRITE_BEHIND = os.getenv('LAST_LOGIN_WRITE_BEHIND', 'true').lower() in ('1', 'true', 'yes')
+LAST_LOGIN_FLUSH_SECONDS = int(os.getenv('LAST_LOGIN_FLUSH_SECONDS', 60))
+LAST_LOGIN_LOCAL_MAX = int(os.getenv('LAST_LOGIN_LOCAL_MAX', 500))
+_pending_logins = {}
+_pending_since = None
+_pending_lock = threading.Lock()
+
+
+def init_account_versions() -> None:
+    """Add users.token_version to databases created before it existed, run by init-db"""
+    if 'token_version' in {column['name'] for column in inspect(db.engine).get_columns('users')}:
+        return
+    db.session.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+    db.session.commit()
+    logger.info("Added users.token_version")
+
+
+def _db_account_version(user_id) -> int:
+    """Minimum accepted token version as the users table has it"""
+    user = db.session.query(User.is_active, User.token_version).filter(User.id == user_id).first()
+    if not user or not user.is_active:
+        return INACTIVE_VERSION
+    return user.token_version or 0
+
+
+def _drop_stale_versions() -> None:
+    if not _stale_versions:
+        return
+    with _stale_lock:
+        user_ids = list(_stale_versions)
+        _stale_versions.difference_update(user_ids)
+    try:
+        cache.redis_client.delete(*[ACCOUNT_VERSION_KEY.format(user_id) for user_id in user_ids])
+    except Exception:
+        with _stale_lock:
+            _stale_versions.update(user_ids)
+        raise
+
+
+def _redis_account_version(user_id) -> int:
+    """Minimum accepted token version, cached from the db for ACCOUNT_VERSION_TTL"""
+    _drop_stale_versions()
+    key = ACCOUNT_VERSION_KEY.format(user_id)
+    value = cache.redis_client.get(key)
+    if value is not None:
+        return int(value)
+
+    version = _db_account_version(user_id)
+    cache.redis_client.set(key, version, ex=ACCOUNT_VERSION_TTL)
+    return version
+
+
+def bump_account_version(user) -> None:
+    """
+    Invalidate every token issued to the account so far. Call before
+    committing a deactivation or reactivation, then forget_account_version
+    once committed. Deleted accounts only need forget_account_version.
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+
+def forget_account_version(user_id) -> None:
+    """
+    Drop the cached account version after committing a change to it. When
+    redis can't be reached the drop is retried once it can, and the cache
+    ttl bounds the window if this process dies first.
+    """
+    _local_status.pop(str(user_id), None)
+    try:
+        if cache.redis_available():
+            cache.redis_client.delete(ACCOUNT_VERSION_KEY.format(user_id))
+            return
+    except Exception as e:
+        logger.error(f"Account version cache drop failed: {e}")
+    with _stale_lock:
+        _stale_versions.add(str(user_id))
+
+
+def is_account_current(jwt_payload: dict) -> bool:
+    """
+    Check a decoded token's account version without loading the user.
+    Falls back to a locally cached db read when redis is down.
+    """
+    user_id = str(jwt_payload.get('sub'))
+    token_version = jwt_payload.get('account_version', 0)
+
+    if cache.redis_available():
+        try:
+            return token_version >= _redis_account_version(user_id)
+        except Exception as e:
+            logger.error(f"Account version check failed: {e}")
+
+    entry = _local_status.get(user_id)
+    if entry and _time.monotonic() - entry[1] < ACCOUNT_STATUS_LOCAL_TTL:
+        return token_version >= entry[0]
+
+    version = _db_account_version(user_id)
+    _local_status[user_id] = (version, _time.monotonic())
+    return token_version >= version
+
+
+def get_claimed_profile_id(claim: str, user_id) -> int:
+    """patient_id / doctor_id carried in the current token, None if absent"""
+    try:
+        claims = get_jwt()
+    except Exception:
+        return None
+    if str(claims.get('sub')) != str(user_id) or not claims.get(claim):
+        return None
+    return int(claims[claim])
 
-    additional_claims = {
+
+def _token_claims(user) -> dict:
+    """Claims that let requests skip the user and profile lookups"""
+    claims = {
         'role': user.role,
         'username': user.username,
-        'user_id': str(user.id)  
+        'user_id': str(user.id),
+        'account_version': user.token_version or 0
     }
+    if user.role == 'patient' and user.patient:
+        claims['patient_id'] = user.patient.id
+    elif user.role == 'doctor' and user.doctor:
+        claims['doctor_id'] = user.doctor.id
+    return claims
+
+
+def generate_tokens(user):
+    """Generate access and refresh tokens for a user"""
+
+    additional_claims = _token_claims(user)
 
     access_token = create_access_token(
         identity=str(user.id), 
@@ -35,25 +184,111 @@ def generate_tokens(user):
         'token_type': 'bearer'
     }
 
+def _write_last_logins(logins: dict) -> None:
+    """
+    One executemany UPDATE for a batch of {user_id: last_login}. A Core
+    statement rather than the ORM bulk update, which fails the whole batch
+    when a buffered user was deleted before the flush.
+    """
+    users = User.__table__
+    db.session.execute(
+        update(users).where(users.c.id == bindparam('uid')).values(last_login=bindparam('ts')),
+        [{'uid': user_id, 'ts': last_login} for user_id, last_login in logins.items()]
+    )
+    db.session.commit()
+
+
 def update_last_login(user_id):
-    """Update the last login timestamp for a user"""
-    user = User.query.get(user_id)
-    if user:
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+    """
+    Record the last login timestamp for a user. The users row is updated
+    later in bulk by flush_last_logins, so login does not write to it.
+    Without redis, logins are buffered per process and written once the
+    buffer is LAST_LOGIN_FLUSH_SECONDS old or LAST_LOGIN_LOCAL_MAX long.
+    """
+    global _pending_since
+    now = datetime.utcnow()
+    if not LAST_LOGIN_WRITE_BEHIND:
+        _write_last_logins({int(user_id): now})
+        return
+
+    if cache.redis_available():
+        try:
+            cache.redis_client.hset(LAST_LOGIN_KEY, str(user_id), now.isoformat())
+            return
+        except Exception as e:
+            logger.error(f"Last login buffering failed: {e}")
+
+    batch = None
+    with _pending_lock:
+        _pending_logins[int(user_id)] = now
+        if _pending_since is None:
+            _pending_since = _time.monotonic()
+        if len(_pending_logins) >= LAST_LOGIN_LOCAL_MAX or _time.monotonic() - _pending_since >= LAST_LOGIN_FLUSH_SECONDS:
+            batch = dict(_pending_logins)
+            _pending_logins.clear()
+            _pending_since = None
+    if batch:
+        _write_last_logins(batch)
+
+
+def flush_last_logins() -> dict:
+    """Write buffered last_login timestamps to the users table in one statement"""
+    global _pending_since
+    with _pending_lock:
+        batch = dict(_pending_logins)
+        _pending_logins.clear()
+        _pending_since = None
+
+    flushing = None
+    if cache.redis_available():
+        # rename takes the whole hash atomically; new logins start a fresh one
+        flushing = f"{LAST_LOGIN_KEY}:flushing:{uuid.uuid4().hex}"
+        try:
+            cache.redis_client.rename(LAST_LOGIN_KEY, flushing)
+            for user_id, last_login in cache.redis_client.hgetall(flushing).items():
+                user_id = int(user_id)
+                last_login = datetime.fromisoformat(last_login)
+                if user_id not in batch or batch[user_id] < last_login:
+                    batch[user_id] = last_login
+        except redis.exceptions.ResponseError:
+            flushing = None  # nothing buffered
+
+    if batch:
+        try:
+            _write_last_logins(batch)
+        except Exception:
+            db.session.rollback()
+            if flushing:
+                # hand the batch back without overwriting newer logins
+                pipe = cache.redis_client.pipeline()
+                for user_id, last_login in batch.items():
+                    pipe.hsetnx(LAST_LOGIN_KEY, str(user_id), last_login.isoformat())
+                pipe.execute()
+            raise
+
+    if flushing:
+        cache.redis_client.delete(flushing)
+
+    logger.info(f"Flushed last login for {len(batch)} users")
+    return {'flushed': len(batch)}
 
 
 def authenticate_user(username, password):
     """Authenticate user and return tokens"""
-    from flask_bcrypt import Bcrypt
-    bcrypt = Bcrypt()
-    
     user = User.query.filter_by(username=username).first()
-    if not user or not bcrypt.check_password_hash(user.password_hash, password):
+    if not user or not verify_password(user.password_hash, password):
         return None
         
     if not user.is_active:
         return None
+
+    # upgrade hashes made at an older cost while we have the plain password
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        except PasswordPoolBusy:
+            pass
         
     update_last_login(user.id)
     return generate_tokens(user)
@@ -67,11 +302,7 @@ def refresh_access_token():
     if not user or not user.is_active:
         return None
         
-    additional_claims = {
-        'role': user.role,
-        'username': user.username,
-        'email': user.email
-    }
+    additional_claims = _token_claims(user)
     
     return create_access_token(
         identity=identity,
@@ -134,7 +365,6 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
-            verify_jwt_in_request()
             current_user = get_current_user()
             
             if not current_user:
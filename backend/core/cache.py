@@ -1,5 +1,7 @@
 import json 
 import hashlib 
+import threading
+import time
 from functools import wraps 
 
 
@@ -7,33 +9,93 @@ import redis
 from flask import request, jsonify
 
 from .logger import logger 
+from .metrics import record_cache
 import os
 
-try: 
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    redis_client = redis.from_url(redis_url, decode_responses=True)
-    redis_client.ping()
-    REDIS_AVAILABLE=True
-    logger.info("Redis cache initialized successfully.")
-except:
-    redis_client = None 
-    REDIS_AVAILABLE=False
-    logger.error("Redis cache initialization failed.")
-
-def cached(prefix:str, ttl:int =30):
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.5))  # secs
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2))  # secs
+REDIS_HEALTH_INTERVAL = float(os.getenv('REDIS_HEALTH_INTERVAL', 5))  # secs
+
+# from_url does not connect; the first redis_available() call checks it
+redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+redis_client = redis.from_url(
+    redis_url,
+    decode_responses=True,
+    socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+    socket_timeout=REDIS_SOCKET_TIMEOUT
+)
+REDIS_AVAILABLE = None  # unknown until the first check
+
+_checked = False
+_checker_pid = None
+_health_lock = threading.Lock()
+
+
+def _ping() -> bool:
+    """Ping redis and record the result, logging only when it changes"""
+    global REDIS_AVAILABLE
+    try:
+        redis_client.ping()
+        available = True
+    except Exception:
+        available = False
+
+    if available != REDIS_AVAILABLE:
+        if available:
+            logger.info("Redis cache initialized successfully.")
+        else:
+            logger.error("Redis cache unavailable, caching disabled until it is reachable.")
+    REDIS_AVAILABLE = available
+    return available
+
+
+def _health_loop():
+    while True:
+        time.sleep(REDIS_HEALTH_INTERVAL)
+        _ping()
+
+
+def redis_available() -> bool:
+    """
+    Whether redis can be used right now. The first call in a process pings
+    once and starts a background checker that flips caching back on when
+    redis becomes reachable, so nothing blocks at import time.
+    """
+    global _checked, _checker_pid
+    if _checker_pid != os.getpid():
+        # first use, or a forked child whose parent's checker thread is gone
+        with _health_lock:
+            if _checker_pid != os.getpid():
+                if not _checked:
+                    _ping()
+                    _checked = True
+                threading.Thread(target=_health_loop, name='redis-health', daemon=True).start()
+                _checker_pid = os.getpid()
+    return REDIS_AVAILABLE
+
+
+def cached(prefix:str, ttl:int =30, key=None):
+    """
+    Cache a view's 200 responses under chikitsa:<prefix>:. Keys hash the path
+    and query string unless `key` builds them from the view's arguments, which
+    lets invalidate_keys drop single entries.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            if not REDIS_AVAILABLE: 
+            if not redis_available(): 
                 return func(*args, **kwargs)
             
-            raw_key = f"{request.path}:{str(request.args)}"
-            key = hashlib.md5(raw_key.encode()).hexdigest()
-            key = f"chikitsa:{prefix}:{key}"
+            if key:
+                cache_key = f"chikitsa:{prefix}:{key(*args, **kwargs)}"
+            else:
+                raw_key = f"{request.path}:{str(request.args)}"
+                cache_key = f"chikitsa:{prefix}:{hashlib.md5(raw_key.encode()).hexdigest()}"
             try: 
-                cached_data = redis_client.get(key)
+                cached_data = redis_client.get(cache_key)
+                record_cache(bool(cached_data))
                 if cached_data: 
-                    logger.info(f"Cache hit for key: {prefix}")
+                    logger.info(f"Cache hit for key: {prefix}", extra={'sample': 'cache_hit'})
                     return jsonify(json.loads(cached_data)), 200 
             except Exception as e:
                 logger.error(f"Cache set error: {e}")
@@ -44,11 +106,11 @@ def cached(prefix:str, ttl:int =30):
                 if isinstance(response, tuple):
                     data, code = response 
                     if code ==200 and hasattr(data, 'get_json'):
-                        redis_client.setex(key, ttl, json.dumps(data.get_json(), default=str))
-                        logger.info(f"Cache SET: {prefix}")
+                        redis_client.setex(cache_key, ttl, json.dumps(data.get_json(), default=str))
+                        logger.info(f"Cache SET: {prefix}", extra={'sample': 'cache_set'})
                 elif hasattr(response, 'get_json'):  
-                    redis_client.setex(key, ttl, json.dumps(response.get_json(), default=str))
-                    logger.info(f"Cache SET: {prefix}")
+                    redis_client.setex(cache_key, ttl, json.dumps(response.get_json(), default=str))
+                    logger.info(f"Cache SET: {prefix}", extra={'sample': 'cache_set'})
             except Exception as e:
                 logger.error(f"Cache set error: {e}")
                 
@@ -60,7 +122,7 @@ def cached(prefix:str, ttl:int =30):
 
 
 def invalidate(prefix:str):
-    if REDIS_AVAILABLE: 
+    if redis_available(): 
         try: 
             keys = redis_client.keys(f"chikitsa:{prefix}:*")
             if keys: 
@@ -68,5 +130,46 @@ def invalidate(prefix:str):
                 logger.info(f"Cache invalidated for prefix: {prefix}")
         except: 
             pass 
+
+
+def invalidate_keys(prefix: str, keys: list, batch: int = 1000):
+    """Drop the given entries of a cache keyed with cached(key=...), without scanning for them"""
+    if not keys or not redis_available():
+        return
+    try:
+        keys = [f"chikitsa:{prefix}:{key}" for key in keys]
+        pipe = redis_client.pipeline()
+        for i in range(0, len(keys), batch):
+            pipe.delete(*keys[i:i + batch])
+        pipe.execute()
+        logger.info(f"Cache invalidated {len(keys)} {prefix} entries")
+    except Exception as e:
+        logger.error(f"Cache invalidate error: {e}")
     
 
+
+def get_json_many(keys: list) -> list:
+    """Fetch several JSON values in one round trip; None for misses or when redis is down"""
+    if not keys or not redis_available():
+        return [None] * len(keys)
+    try:
+        values = [json.loads(value) if value else None for value in redis_client.mget(keys)]
+    except Exception as e:
+        logger.error(f"Cache get error: {e}")
+        return [None] * len(keys)
+    for value in values:
+        record_cache(value is not None)
+    return values
+
+
+def set_json_many(values: dict, ttl: int = 30):
+    """Store several JSON values with the same ttl in one pipeline"""
+    if not values or not redis_available():
+        return
+    try:
+        pipe = redis_client.pipeline()
+        for key, value in values.items():
+            pipe.setex(key, ttl, json.dumps(value, default=str))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Cache set error: {e}")
@@ -9,6 +9,12 @@ MONTHLY_REPORT_DAY = int(os.getenv('MONTHLY_REPORT_DAY', 1))
 MONTHLY_REPORT_HOUR = int(os.getenv('MONTHLY_REPORT_HOUR', 9))
 MONTHLY_REPORT_MINUTE = int(os.getenv('MONTHLY_REPORT_MINUTE', 0))
 
+REVOKED_TOKEN_CLEANUP_MINUTES = int(os.getenv('REVOKED_TOKEN_CLEANUP_MINUTES', 5))
+LAST_LOGIN_FLUSH_SECONDS = int(os.getenv('LAST_LOGIN_FLUSH_SECONDS', 60))
+
+APPOINTMENT_ARCHIVE_DAY = int(os.getenv('APPOINTMENT_ARCHIVE_DAY', 2))
+APPOINTMENT_ARCHIVE_HOUR = int(os.getenv('APPOINTMENT_ARCHIVE_HOUR', 3))
+
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
 def make_celery(app=None):
@@ -48,6 +54,18 @@ def make_celery(app=None):
                 'task': 'backend.utils.tasks.send_monthly_reports_task',
                 'schedule': crontab(day_of_month=MONTHLY_REPORT_DAY, hour=MONTHLY_REPORT_HOUR, minute=MONTHLY_REPORT_MINUTE), 
             },
+            'revoked-token-cleanup': {
+                'task': 'backend.utils.tasks.migrate_revoked_tokens_task',
+                'schedule': REVOKED_TOKEN_CLEANUP_MINUTES * 60,
+            },
+            'last-login-flush': {
+                'task': 'backend.utils.tasks.flush_last_logins_task',
+                'schedule': LAST_LOGIN_FLUSH_SECONDS,
+            },
+            'appointment-archive': {
+                'task': 'backend.utils.tasks.archive_appointments_task',
+                'schedule': crontab(day_of_month=APPOINTMENT_ARCHIVE_DAY, hour=APPOINTMENT_ARCHIVE_HOUR, minute=0),
+            },
         }
     )
 
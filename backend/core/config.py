@@ -1,12 +1,17 @@
 import os 
-from dotenv import load_dotenv
 from datetime import timedelta
 
-load_dotenv()
+# .env is loaded by the core package, before engine and logger read their settings
+from .engine import engine_options, replica_binds
 
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
-    SQLALCHEMY_TRACK_MODIFICATIONS = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS', True)
+    # nothing listens for the modification signals, tracking them only costs time per object
+    SQLALCHEMY_TRACK_MODIFICATIONS = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS', 'false').lower() in ('1', 'true', 'yes')
+    # pool sizes, recycle, pre-ping and timeouts per process type, see core/engine.py
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # read replicas, see core/replicas.py for what is routed to them
+    SQLALCHEMY_BINDS = replica_binds()
     DEBUG = os.getenv('DEBUG', True)
     TESTING = os.getenv('TESTING', False)
     SECRET_KEY = os.getenv('SECRET_KEY')
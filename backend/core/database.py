@@ -1,4 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
 
-db = SQLAlchemy() 
\ No newline at end of file
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs to the replica named in info['replica'], set
+    by core.replicas.read_only. Flushes, writes and everything else stay on
+    the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if replica and bind is None and not self._flushing and getattr(clause, 'is_select', False):
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
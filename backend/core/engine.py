@@ -0,0 +1,119 @@
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from .logger import logger
+
+# web or worker, celery_worker.py sets worker before the app is imported
+PROCESS_TYPE = os.getenv('PROCESS_TYPE', 'web').lower()
+
+# per process defaults: web serves many short requests on threads, a worker
+# runs worker_concurrency long jobs (monthly reports) one query at a time
+POOL_DEFAULTS = {
+    'web': {
+        'POOL_SIZE': 10,
+        'MAX_OVERFLOW': 20,
+        'POOL_TIMEOUT': 10,
+        'POOL_RECYCLE': 1800,
+        'STATEMENT_TIMEOUT_MS': 5000,
+    },
+    'worker': {
+        'POOL_SIZE': 2,
+        'MAX_OVERFLOW': 2,
+        'POOL_TIMEOUT': 30,
+        'POOL_RECYCLE': 1800,
+        'STATEMENT_TIMEOUT_MS': 120000,
+    },
+}
+
+# read replicas, comma separated; empty sends every query to the primary
+REPLICA_URIS = [u.strip() for u in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if u.strip()]
+
+# sqlite only, WAL lets readers run while a write is in progress
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+
+def _setting(name: str, process_type: str):
+    """WORKER_DB_POOL_SIZE over DB_POOL_SIZE over the process default"""
+    value = os.getenv(f"{process_type.upper()}_DB_{name}", os.getenv(f"DB_{name}"))
+    if value is None:
+        return POOL_DEFAULTS[process_type][name]
+    return int(value)
+
+
+def _pre_ping(process_type: str) -> bool:
+    value = os.getenv(f"{process_type.upper()}_DB_POOL_PRE_PING", os.getenv('DB_POOL_PRE_PING', 'true'))
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def engine_options(database_uri: str, process_type: str = PROCESS_TYPE) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for this database and process type"""
+    if process_type not in POOL_DEFAULTS:
+        raise ValueError(f"PROCESS_TYPE must be one of {', '.join(POOL_DEFAULTS)}")
+    if not database_uri:
+        return {}
+
+    url = make_url(database_uri)
+    if url.get_backend_name() == 'sqlite':
+        options = {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+        if url.database in (None, '', ':memory:'):
+            # flask-sqlalchemy gives in-memory databases a single static connection
+            return options
+    else:
+        options = {}
+
+    options.update({
+        'pool_size': _setting('POOL_SIZE', process_type),
+        'max_overflow': _setting('MAX_OVERFLOW', process_type),
+        'pool_timeout': _setting('POOL_TIMEOUT', process_type),
+        'pool_recycle': _setting('POOL_RECYCLE', process_type),
+        'pool_pre_ping': _pre_ping(process_type),
+    })
+
+    timeout_ms = _setting('STATEMENT_TIMEOUT_MS', process_type)
+    if url.get_backend_name() == 'postgresql' and timeout_ms:
+        # libpq startup option, understood by psycopg2 and psycopg
+        options['connect_args'] = {'options': f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+def replica_binds(process_type: str = PROCESS_TYPE) -> dict:
+    """SQLALCHEMY_BINDS entries for the replicas, keys replica_0, replica_1, ..."""
+    return {
+        f"replica_{index}": {'url': uri, **engine_options(uri, process_type)}
+        for index, uri in enumerate(REPLICA_URIS)
+    }
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        if SQLITE_JOURNAL_MODE:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        if SQLITE_SYNCHRONOUS:
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine) -> None:
+    """Apply per-connection settings the engine options can't express"""
+    if engine.dialect.name == 'sqlite' and not event.contains(engine, 'connect', _sqlite_pragmas):
+        event.listen(engine, 'connect', _sqlite_pragmas)
+
+
+def init_engine(app) -> None:
+    from .database import db
+
+    with app.app_context():
+        engines = db.engines
+        engine = db.engine
+    for bind in engines.values():
+        configure_engine(bind)
+    logger.info(f"Database engine for {PROCESS_TYPE}: {engine.pool.status()}")
@@ -1,18 +1,181 @@
-import logging 
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
 from datetime import datetime
+from functools import lru_cache
 
-logger = logging.getLogger('chikitsa')
-logger.setLevel(logging.DEBUG)
+# records are queued by the request thread and written by a background
+# listener, so a slow stdout never holds up a request
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()  # json | text
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# per-module levels, longest prefix wins: "core.cache=WARNING,services.appointments=INFO"
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+# keep a fraction of high-frequency messages tagged with extra={'sample': name}
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', 'cache_hit=0.01,cache_set=0.1')
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# attributes every LogRecord has, anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'sample'}
+
+
+def _parse_pairs(value: str) -> dict:
+    pairs = {}
+    for item in value.split(','):
+        if '=' in item:
+            key, _, val = item.partition('=')
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+MODULE_LEVELS = {
+    module: logging.getLevelName(level.upper())
+    for module, level in _parse_pairs(LOG_LEVELS).items()
+}
+SAMPLE_RATES = {name: float(rate) for name, rate in _parse_pairs(LOG_SAMPLING).items()}
+
+
+@lru_cache(maxsize=512)
+def _module_for(pathname: str) -> str:
+    """Dotted module path inside the package, e.g. services.doctors.service"""
+    path = os.path.abspath(pathname)
+    if not path.startswith(_PACKAGE_DIR + os.sep):
+        return os.path.splitext(os.path.basename(path))[0]
+    relative = os.path.splitext(os.path.relpath(path, _PACKAGE_DIR))[0]
+    return relative.replace(os.sep, '.')
+
+
+@lru_cache(maxsize=512)
+def _level_for(module: str) -> int:
+    best, level = -1, logging.getLevelName(LOG_LEVEL)
+    for prefix, prefix_level in MODULE_LEVELS.items():
+        if (module == prefix or module.startswith(prefix + '.')) and len(prefix) > best:
+            best, level = len(prefix), prefix_level
+    return level
+
+
+class ModuleLevelFilter(logging.Filter):
+    """Apply LOG_LEVELS by the module that made the call"""
+
+    def filter(self, record):
+        record.module_path = _module_for(record.pathname)
+        return record.levelno >= _level_for(record.module_path)
+
+
+class SamplingFilter(logging.Filter):
+    """Drop all but a fraction of records tagged with a sample name"""
+
+    def filter(self, record):
+        rate = SAMPLE_RATES.get(getattr(record, 'sample', None))
+        if rate is None:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'module': getattr(record, 'module_path', record.module),
+            'function': record.funcName,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != 'module_path':
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the writer falls behind"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # render the message and traceback here, leave the layout to the writer
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # wait for room so a full queue is still flushed on shutdown
+        self.queue.put(self._sentinel)
+
+
+if LOG_FORMAT == 'text':
+    formatter = logging.Formatter(
+        '[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)d] %(message)s',
+        datefmt = '%Y-%m-%d %H:%M:%S'
+            )
+else:
+    formatter = JsonFormatter()
 
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(logging.DEBUG)
+console_handler.setFormatter(formatter)
 
-formatter = logging.Formatter(
-    '[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)d] %(message)s',
-    datefmt = '%Y-%m-%d %H:%M:%S'
-        )
+queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+queue_handler.addFilter(ModuleLevelFilter())
+queue_handler.addFilter(SamplingFilter())
 
-console_handler.setFormatter(formatter)
+listener = None
+
+
+def start_listener():
+    """Start the background writer; also run in forked children, which lose the thread"""
+    global listener
+    queue_handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    listener = _Listener(queue_handler.queue, console_handler, respect_handler_level=True)
+    listener.start()
+
+
+def stop_listener():
+    """Flush queued records and stop the writer"""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+logger = logging.getLogger('chikitsa')
+# the logger level is the cheapest gate, set it to the most verbose configured level
+logger.setLevel(min([logging.getLevelName(LOG_LEVEL), *MODULE_LEVELS.values()]))
+logger.addHandler(queue_handler)
 
-logger.addHandler(console_handler)
+start_listener()
+atexit.register(stop_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=start_listener)
@@ -0,0 +1,205 @@
+import hmac
+import os
+import threading
+import time
+from collections import defaultdict
+from ipaddress import ip_address
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .logger import logger
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# when set, /metrics wants "Authorization: Bearer <token>" from every client;
+# without it only loopback clients are answered, which behind a reverse proxy is everyone
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class _EndpointStats:
+    __slots__ = ('requests', 'duration', 'queries', 'sql_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.requests = defaultdict(int)  # status code -> count
+        self.duration = _Histogram(DURATION_BUCKETS)
+        self.queries = _Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+# (endpoint, method) -> stats, per process
+_stats = defaultdict(_EndpointStats)
+_stats_lock = threading.Lock()
+_engine_hooked = False
+
+
+def record_cache(hit: bool) -> None:
+    """Count a cache lookup against the current request, if any"""
+    if has_request_context() and 'metrics_started' in g:
+        if hit:
+            g.cache_hits += 1
+        else:
+            g.cache_misses += 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if has_request_context() and 'metrics_started' in g:
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute, drop its start
+    # so the list does not grow for the life of the pooled connection
+    starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def _hook_engine() -> None:
+    """Time every statement on every engine, including ones created later"""
+    global _engine_hooked
+    if not _engine_hooked:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _engine_hooked = True
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+    g.cache_hits = 0
+    g.cache_misses = 0
+
+
+def _finish_request(response):
+    if 'metrics_started' not in g:
+        return response
+
+    duration = time.perf_counter() - g.metrics_started
+    endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+    if endpoint == 'metrics':
+        return response
+
+    with _stats_lock:
+        stats = _stats[(endpoint, request.method)]
+        stats.requests[response.status_code] += 1
+        stats.duration.observe(duration)
+        stats.queries.observe(g.sql_count)
+        stats.sql_seconds += g.sql_seconds
+        stats.cache_hits += g.cache_hits
+        stats.cache_misses += g.cache_misses
+
+    response.headers['Server-Timing'] = ', '.join([
+        f'app;dur={duration * 1000:.2f}',
+        f'db;dur={g.sql_seconds * 1000:.2f};desc="{g.sql_count} queries"',
+        f'cache;desc="{g.cache_hits} hits {g.cache_misses} misses"'
+    ])
+    return response
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{k}="{str(v)}"' for k, v in labels.items()) + '}'
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of the per-endpoint stats in this process"""
+    with _stats_lock:
+        snapshot = list(_stats.items())
+
+    lines = [
+        '# HELP chikitsa_requests_total Requests by endpoint, method and status.',
+        '# TYPE chikitsa_requests_total counter',
+    ]
+    for (endpoint, method), stats in snapshot:
+        for status, count in sorted(stats.requests.items()):
+            lines.append(f'chikitsa_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+    for name, attr, help_text in (
+        ('chikitsa_request_duration_seconds', 'duration', 'Request wall time.'),
+        ('chikitsa_request_sql_queries', 'queries', 'SQL statements per request.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (endpoint, method), stats in snapshot:
+            hist = getattr(stats, attr)
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f'{name}_bucket{_labels(endpoint=endpoint, method=method, le=bound)} {count}')
+            lines.append(f'{name}_bucket{_labels(endpoint=endpoint, method=method, le="+Inf")} {hist.count}')
+            lines.append(f'{name}_sum{_labels(endpoint=endpoint, method=method)} {hist.total}')
+            lines.append(f'{name}_count{_labels(endpoint=endpoint, method=method)} {hist.count}')
+
+    for name, attr, help_text in (
+        ('chikitsa_sql_seconds_total', 'sql_seconds', 'Time spent in SQL statements.'),
+        ('chikitsa_cache_hits_total', 'cache_hits', 'Redis cache hits.'),
+        ('chikitsa_cache_misses_total', 'cache_misses', 'Redis cache misses.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (endpoint, method), stats in snapshot:
+            lines.append(f'{name}{_labels(endpoint=endpoint, method=method)} {getattr(stats, attr)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _is_local(addr: str) -> bool:
+    try:
+        return ip_address(addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def _is_allowed() -> bool:
+    if not METRICS_TOKEN:
+        return _is_local(request.remote_addr)
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())
+
+
+def metrics():
+    if not _is_allowed():
+        return {'status': 'error', 'message': 'Not found'}, 404
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app) -> None:
+    """Register request instrumentation and the /metrics endpoint"""
+    if not METRICS_ENABLED:
+        return
+    _hook_engine()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics, methods=['GET'])
+    logger.debug("Request metrics enabled")
@@ -15,6 +15,8 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    # embedded in issued tokens, bumped to reject every token issued before
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # relationships 
     doctor = db.relationship('Doctor', backref='user', uselist=False)
@@ -111,6 +113,11 @@ class DoctorUnavailability(db.Model):
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    # ids carry over into the archive, so sqlite must never reuse one
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_date', 'doctor_id', 'appointment_date'),
+        {'sqlite_autoincrement': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'))
@@ -129,6 +136,7 @@ class Appointment(db.Model):
 
 class MedicalRecord(db.Model):
     __tablename__ = 'medical_records'
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = db.Column(db.Integer, primary_key=True)
     appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), unique=True)
@@ -151,9 +159,72 @@ class MedicalRecord(db.Model):
 
 class PrescriptionItem(db.Model):
     __tablename__ = 'prescription_items'
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = db.Column(db.Integer, primary_key=True)
-    medical_record_id = db.Column(db.Integer, db.ForeignKey('medical_records.id'))
+    medical_record_id = db.Column(db.Integer, db.ForeignKey('medical_records.id'), index=True)
+    medicine_name = db.Column(db.String(100), nullable=False)
+    dosage = db.Column(db.String(50))
+    frequency = db.Column(db.String(50))
+    duration = db.Column(db.String(50))
+    instructions = db.Column(db.Text)
+
+
+# Appointments older than the archive horizon are moved here together with
+# their records and prescription items, see services/appointments/archive.py.
+# Same columns and ids as the live tables, read-only once archived.
+
+class ArchivedAppointment(db.Model):
+    __tablename__ = 'appointments_archive'
+    __table_args__ = (
+        db.Index('ix_appointments_archive_doctor_date', 'doctor_id', 'appointment_date'),
+        db.Index('ix_appointments_archive_patient_date', 'patient_id', 'appointment_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'))
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'))
+    appointment_date = db.Column(db.Date, nullable=False)
+    appointment_time = db.Column(db.Time, nullable=False)
+    status = db.Column(db.String(20))
+    booking_notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime)
+
+    # Relationships
+    patient = db.relationship('Patient')
+    doctor = db.relationship('Doctor')
+    medical_record = db.relationship('ArchivedMedicalRecord', backref='appointment', uselist=False)
+
+
+class ArchivedMedicalRecord(db.Model):
+    __tablename__ = 'medical_records_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments_archive.id'), unique=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), index=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), index=True)
+    symptoms = db.Column(db.Text, nullable=False)
+    diagnosis = db.Column(db.Text, nullable=False)
+    prescription = db.Column(db.Text)
+    treatment_notes = db.Column(db.Text)
+    followup_date = db.Column(db.Date)
+    doctor_notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+
+    # Relationships
+    prescription_items = db.relationship('ArchivedPrescriptionItem', backref='medical_record')
+    patient = db.relationship('Patient')
+    doctor = db.relationship('Doctor')
+
+
+class ArchivedPrescriptionItem(db.Model):
+    __tablename__ = 'prescription_items_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    medical_record_id = db.Column(db.Integer, db.ForeignKey('medical_records_archive.id'), index=True)
     medicine_name = db.Column(db.String(100), nullable=False)
     dosage = db.Column(db.String(50))
     frequency = db.Column(db.String(50))
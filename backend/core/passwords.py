@@ -0,0 +1,98 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
+
+from flask_bcrypt import Bcrypt
+
+from .logger import logger
+
+# password hashing cost, hashes at other costs are upgraded on login
+BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+# bcrypt releases the GIL, so a thread pool spreads hashing across cores
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', os.cpu_count() or 2))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv('PASSWORD_POOL_MAX_QUEUE', PASSWORD_POOL_WORKERS * 8))
+PASSWORD_POOL_TIMEOUT = float(os.getenv('PASSWORD_POOL_TIMEOUT', 10))  # secs
+
+_HASH_COST = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+_bcrypt = Bcrypt()
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing pool is full, callers should answer 503"""
+
+
+class PasswordPool:
+    """
+    Bounded thread pool for bcrypt work. At most workers + max_queue jobs
+    are admitted; beyond that callers are rejected straight away instead of
+    piling up behind the CPU-bound work and starving cheap requests.
+    """
+
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_queue: int = PASSWORD_POOL_MAX_QUEUE,
+                 timeout: float = PASSWORD_POOL_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # created on first use so forked workers start their own threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix='bcrypt'
+                    )
+        return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Password pool full, rejecting request")
+            raise PasswordPoolBusy("Too many concurrent password operations")
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordPoolBusy("Password operation timed out")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+pool = PasswordPool()
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    """Hash a password on the pool at the configured cost"""
+    return pool.run(_hash, password, rounds or BCRYPT_LOG_ROUNDS)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    """Check a password against its hash on the pool"""
+    return pool.run(_bcrypt.check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if the hash was made with a different cost than the configured one"""
+    match = _HASH_COST.match(password_hash or '')
+    return bool(match) and int(match.group(1)) != BCRYPT_LOG_ROUNDS
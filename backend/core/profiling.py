@@ -0,0 +1,159 @@
+import cProfile
+import hmac
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from flask import g, request
+
+from .logger import logger
+
+PROFILER_MAX_SECONDS = int(os.getenv('PROFILER_MAX_SECONDS', 60))
+PROFILER_DEFAULT_HZ = int(os.getenv('PROFILER_DEFAULT_HZ', 100))
+PROFILER_MAX_HZ = 1000
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'chikitsa-profiles'))
+
+# per-request cProfile, only wired up when both are set: endpoints as
+# "doctors.get_my_calendar" or paths as "/doctor/calendar", comma separated
+PROFILE_ENDPOINTS = [e.strip() for e in os.getenv('PROFILE_ENDPOINTS', '').split(',') if e.strip()]
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_HEADER = 'X-Profile'
+
+_sampling_lock = threading.Lock()
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(frame) -> str:
+    """Stack as root;...;leaf, the flamegraph collapsed format"""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def _check_args(seconds: float, hz: int) -> None:
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise ValueError(f"seconds must be between 0 and {PROFILER_MAX_SECONDS}")
+    if not 0 < hz <= PROFILER_MAX_HZ:
+        raise ValueError(f"hz must be between 1 and {PROFILER_MAX_HZ}")
+
+
+def sample_stacks(seconds: float, hz: int = PROFILER_DEFAULT_HZ, ignore_threads: tuple = ()) -> dict:
+    """
+    Sample the stacks of every thread in this process for `seconds` at `hz`
+    and return them in collapsed form, one "stack count" line per stack.
+    Only one sampler runs per process at a time.
+    """
+    _check_args(seconds, hz)
+    if not _sampling_lock.acquire(blocking=False):
+        raise ValueError("A profile is already running in this process")
+
+    try:
+        ignored = {threading.get_ident(), *ignore_threads}
+        interval = 1.0 / hz
+        stacks = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in ignored:
+                    stacks[_collapse(frame)] += 1
+            samples += 1
+            time.sleep(max(interval - (time.perf_counter() - now), 0))
+        elapsed = time.perf_counter() - started
+    finally:
+        _sampling_lock.release()
+
+    logger.info(f"Sampled {samples} times over {elapsed:.1f}s, {len(stacks)} distinct stacks")
+    return {
+        'samples': samples,
+        'seconds': round(elapsed, 3),
+        'hz': hz,
+        'pid': os.getpid(),
+        'collapsed': ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    }
+
+
+def _profile_path(name: str, suffix: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    return os.path.join(PROFILE_DIR, f"{name}-{stamp}-{os.getpid()}.{suffix}")
+
+
+def start_background_sampling(seconds: float, hz: int = PROFILER_DEFAULT_HZ) -> str:
+    """Sample on a background thread and write the collapsed stacks to a file, returns its path"""
+    _check_args(seconds, hz)
+    path = _profile_path('sample', 'collapsed')
+    caller = threading.get_ident()
+
+    def run():
+        try:
+            # the thread that asked is idle or serving control messages, skip it
+            result = sample_stacks(seconds, hz, ignore_threads=(caller,))
+            with open(path, 'w') as f:
+                f.write(result['collapsed'])
+            logger.info(f"Profile written to {path}")
+        except Exception as e:
+            logger.error(f"Background profile failed: {e}")
+
+    threading.Thread(target=run, name='profiler', daemon=True).start()
+    return path
+
+
+def _wants_profile() -> bool:
+    if not hmac.compare_digest(request.headers.get(PROFILE_HEADER, '').encode(), PROFILE_TOKEN.encode()):
+        return False
+    endpoint = request.url_rule.endpoint if request.url_rule else None
+    return endpoint in PROFILE_ENDPOINTS or request.path in PROFILE_ENDPOINTS
+
+
+def _start_request_profile():
+    if not _wants_profile():
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # another profiler is active on this interpreter
+        return
+    g.request_profile = profile
+
+
+def _finish_request_profile(response):
+    profile: Optional[cProfile.Profile] = g.pop('request_profile', None)
+    if profile is None:
+        return response
+    profile.disable()
+    try:
+        path = _profile_path(request.endpoint or 'request', 'prof')
+        profile.dump_stats(path)
+        response.headers[PROFILE_HEADER + '-File'] = path
+        logger.info(f"Request profile for {request.path} written to {path}")
+    except Exception as e:
+        logger.error(f"Failed to write request profile: {e}")
+    return response
+
+
+def init_profiling(app) -> None:
+    """Register the per-request cProfile hooks, only if configured"""
+    if not PROFILE_ENDPOINTS or not PROFILE_TOKEN:
+        return
+    app.before_request(_start_request_profile)
+    app.after_request(_finish_request_profile)
+    logger.info(f"Request profiling enabled for {', '.join(PROFILE_ENDPOINTS)}")
@@ -0,0 +1,183 @@
+import os
+import random
+import threading
+import time as _time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional
+
+from flask import has_app_context, has_request_context
+from flask_jwt_extended import get_jwt
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+
+from . import cache
+from .database import RoutingSession, db
+from .logger import logger
+
+# after a user commits a write, their reads stay on the primary this long,
+# long enough to cover replication lag so they always see their own changes
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
+# a replica that failed to connect is skipped for this long
+REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
+
+STICKY_KEY = "chikitsa:replica_sticky:{}"
+
+_replicas = []  # bind keys, filled by init_replicas
+_down_until = {}  # bind key -> monotonic time it may be tried again
+_local_sticky = {}  # identity -> monotonic expiry, used while redis is down
+_lock = threading.Lock()
+
+
+def _identity() -> Optional[str]:
+    """User of the current request, None outside requests or before the jwt is verified"""
+    if not has_request_context():
+        return None
+    try:
+        return get_jwt().get('sub')
+    except RuntimeError:
+        return None
+
+
+def _mark_sticky(identity: str) -> None:
+    with _lock:
+        _local_sticky[identity] = _time.monotonic() + REPLICA_STICKY_SECONDS
+    if cache.redis_available():
+        try:
+            cache.redis_client.set(STICKY_KEY.format(identity), 1, px=int(REPLICA_STICKY_SECONDS * 1000))
+        except Exception as e:
+            logger.error(f"Replica stickiness write failed: {e}")
+
+
+def _is_sticky(identity: str) -> bool:
+    with _lock:
+        expires = _local_sticky.get(identity)
+        if expires is not None and expires <= _time.monotonic():
+            del _local_sticky[identity]
+            expires = None
+    if expires is not None:
+        return True
+    if cache.redis_available():
+        try:
+            # another worker process may have served the write
+            return cache.redis_client.exists(STICKY_KEY.format(identity)) > 0
+        except Exception as e:
+            logger.error(f"Replica stickiness read failed: {e}")
+    return False
+
+
+def _choose_replica(session) -> Optional[str]:
+    """Replica for a read-only call, None when it has to run on the primary"""
+    if not _replicas or session.info.get('wrote'):
+        return None
+
+    if 'sticky' not in session.info:
+        # once per request, the session lives as long as the app context
+        identity = _identity()
+        session.info['sticky'] = bool(identity) and _is_sticky(identity)
+    if session.info['sticky']:
+        return None
+
+    now = _time.monotonic()
+    healthy = [key for key in _replicas if _down_until.get(key, 0) <= now]
+    return random.choice(healthy) if healthy else None
+
+
+def read_only(func):
+    """
+    Run a service call that only reads against a replica. Calls fall back to
+    the primary when no replica is configured or healthy, when this session
+    has written, or when the user wrote within REPLICA_STICKY_SECONDS.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _replicas or not has_app_context():
+            return func(*args, **kwargs)
+
+        session = db.session()
+        if session.info.get('replica'):
+            return func(*args, **kwargs)
+
+        replica = _choose_replica(session)
+        if replica is None:
+            return func(*args, **kwargs)
+
+        session.info['replica'] = replica
+        try:
+            return func(*args, **kwargs)
+        except DBAPIError:
+            if _down_until.get(replica, 0) <= _time.monotonic() or session.new or session.dirty or session.deleted:
+                raise
+            # the replica went away mid-call, nothing was written so retry on the primary
+            logger.warning(f"Replica {replica} failed, retrying on the primary")
+            session.info.pop('replica', None)
+            session.rollback()
+            return func(*args, **kwargs)
+        finally:
+            session.info.pop('replica', None)
+
+    return wrapper
+
+
+@contextmanager
+def on_primary():
+    """Force reads in the block to the primary, even inside a read_only call"""
+    if not _replicas:
+        yield
+        return
+    session = db.session()
+    replica = session.info.pop('replica', None)
+    try:
+        yield
+    finally:
+        if replica:
+            session.info['replica'] = replica
+
+
+def _after_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+def _do_orm_execute(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info['wrote'] = True
+
+
+def _after_commit(session):
+    if session.info.pop('wrote', False):
+        session.info['sticky'] = True
+        identity = _identity()
+        if identity:
+            _mark_sticky(identity)
+
+
+def _after_rollback(session):
+    session.info.pop('wrote', None)
+
+
+def _replica_error(key):
+    def handle_error(context):
+        # connect failures come without a connection
+        if context.is_disconnect or context.connection is None:
+            _down_until[key] = _time.monotonic() + REPLICA_RETRY_SECONDS
+            logger.error(f"Replica {key} unavailable, reads go to the primary for {REPLICA_RETRY_SECONDS:.0f}s")
+    return handle_error
+
+
+def init_replicas(app) -> None:
+    """Find the configured replica binds and track writes for read-your-writes"""
+    with app.app_context():
+        engines = db.engines
+    _replicas[:] = sorted(key for key in engines if key and key.startswith('replica_'))
+    if not _replicas:
+        return
+
+    for key in _replicas:
+        event.listen(engines[key], 'handle_error', _replica_error(key))
+
+    if not event.contains(RoutingSession, 'after_commit', _after_commit):
+        event.listen(RoutingSession, 'after_flush', _after_flush)
+        event.listen(RoutingSession, 'do_orm_execute', _do_orm_execute)
+        event.listen(RoutingSession, 'after_commit', _after_commit)
+        event.listen(RoutingSession, 'after_rollback', _after_rollback)
+    logger.info(f"Routing read-only calls to {len(_replicas)} replica(s)")
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+import time as _time
+from datetime import datetime
+from typing import Optional
+
+from . import cache
+from .config import Config
+from .database import db
+from .logger import logger
+from .models import TokenBlacklist
+
+REVOKED_KEY = "chikitsa:revoked:{}"
+
+# no token outlives a refresh token, so older rows can never match
+MAX_TOKEN_LIFETIME = max(Config.JWT_ACCESS_TOKEN_EXPIRES, Config.JWT_REFRESH_TOKEN_EXPIRES)
+
+# optional in-process filter in front of redis; a revocation made by another
+# process can go unseen for up to REVOCATION_BLOOM_REFRESH seconds
+REVOCATION_BLOOM = os.getenv('REVOCATION_BLOOM', 'false').lower() in ('1', 'true', 'yes')
+REVOCATION_BLOOM_REFRESH = int(os.getenv('REVOCATION_BLOOM_REFRESH', 5))  # secs
+REVOCATION_BLOOM_BITS = int(os.getenv('REVOCATION_BLOOM_BITS', 1 << 20))
+REVOCATION_BLOOM_HASHES = 7
+
+
+class BloomFilter:
+    """Fixed size bloom filter over strings, no false negatives"""
+
+    def __init__(self, bits: int = REVOCATION_BLOOM_BITS, hashes: int = REVOCATION_BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=8 * self.hashes).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 8:(i + 1) * 8], 'little') % self.bits
+
+    def add(self, value: str) -> None:
+        for pos in self._positions(value):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+_bloom: Optional[BloomFilter] = None
+_bloom_built_at: Optional[float] = None
+_bloom_lock = threading.Lock()
+
+
+def _bloom_fresh() -> bool:
+    return _bloom_built_at is not None and _time.monotonic() - _bloom_built_at < REVOCATION_BLOOM_REFRESH
+
+
+def _refresh_bloom() -> Optional[BloomFilter]:
+    """Rebuild the filter from redis when it is older than the refresh interval"""
+    global _bloom, _bloom_built_at
+    if _bloom_fresh():
+        return _bloom
+
+    with _bloom_lock:
+        if _bloom_fresh():
+            return _bloom
+        try:
+            bloom = BloomFilter()
+            prefix_len = len(REVOKED_KEY.format(''))
+            for key in cache.redis_client.scan_iter(match=REVOKED_KEY.format('*'), count=1000):
+                bloom.add(key[prefix_len:])
+            _bloom = bloom
+        except Exception as e:
+            logger.error(f"Revocation filter refresh failed: {e}")
+            _bloom = None
+        _bloom_built_at = _time.monotonic()
+        return _bloom
+
+
+def _ttl(expires_at: Optional[float]) -> int:
+    """Seconds until a token expires, the longest token lifetime if unknown"""
+    if expires_at is None:
+        return int(MAX_TOKEN_LIFETIME.total_seconds())
+    return max(int(expires_at - _time.time()), 1)
+
+
+def revoke_token(jti: str, expires_at: Optional[float] = None) -> None:
+    """
+    Revoke a token until it expires. Stored in redis with a matching ttl,
+    falling back to the token_blacklist table when redis is down.
+    """
+    if cache.redis_available():
+        try:
+            cache.redis_client.setex(REVOKED_KEY.format(jti), _ttl(expires_at), 1)
+            if _bloom is not None:
+                _bloom.add(jti)
+            return
+        except Exception as e:
+            logger.error(f"Token revocation in redis failed: {e}")
+
+    db.session.add(TokenBlacklist(jti=jti))
+    db.session.commit()
+
+
+def is_token_revoked(jwt_payload: dict) -> bool:
+    """
+    Check a decoded token against the revocation store. Redis is
+    authoritative while it is up; rows written during an outage are moved
+    into it by migrate_revoked_tokens.
+    """
+    jti = jwt_payload['jti']
+
+    if cache.redis_available():
+        if REVOCATION_BLOOM:
+            bloom = _refresh_bloom()
+            if bloom is not None and jti not in bloom:
+                return False
+        try:
+            return bool(cache.redis_client.exists(REVOKED_KEY.format(jti)))
+        except Exception as e:
+            logger.error(f"Token revocation check failed: {e}")
+
+    return db.session.query(TokenBlacklist.id).filter_by(jti=jti).first() is not None
+
+
+def migrate_revoked_tokens() -> dict:
+    """
+    Move token_blacklist rows into redis and delete the ones that have
+    expired, so the table only holds revocations made while redis was down.
+    """
+    cutoff = datetime.utcnow() - MAX_TOKEN_LIFETIME
+    purged = TokenBlacklist.query.filter(
+        TokenBlacklist.created_at < cutoff
+    ).delete(synchronize_session=False)
+
+    migrated = 0
+    if cache.redis_available():
+        rows = db.session.query(TokenBlacklist.jti, TokenBlacklist.created_at).all()
+        if rows:
+            try:
+                pipe = cache.redis_client.pipeline()
+                for jti, created_at in rows:
+                    expires_at = created_at + MAX_TOKEN_LIFETIME
+                    ttl = max(int((expires_at - datetime.utcnow()).total_seconds()), 1)
+                    pipe.setex(REVOKED_KEY.format(jti), ttl, 1)
+                pipe.execute()
+                TokenBlacklist.query.filter(
+                    TokenBlacklist.jti.in_([jti for jti, _ in rows])
+                ).delete(synchronize_session=False)
+                migrated = len(rows)
+            except Exception as e:
+                logger.error(f"Revoked token migration failed: {e}")
+
+    db.session.commit()
+    logger.info(f"Revoked tokens: {migrated} moved to redis, {purged} expired rows purged")
+    return {'migrated': migrated, 'purged': purged}
@@ -0,0 +1,76 @@
+import re
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from .database import db
+from .logger import logger
+
+# trigram indexes can't look up anything shorter
+MIN_TERM_LENGTH = 3
+# words past this narrow the results very little and cost a lookup each
+MAX_TERMS = 8
+
+_ready: Dict[str, bool] = {}  # index name -> usable in this database
+
+
+def search_terms(search: str) -> List[str]:
+    """Distinct lowercased words of a search box entry, in the order typed"""
+    terms = []
+    for term in (search or '').lower().split():
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def search_words(search: str) -> List[str]:
+    """Distinct lowercased alphanumeric words, for indexes that tokenize on words"""
+    words = []
+    for word in re.findall(r'\w+', (search or '').lower()):
+        if word not in words:
+            words.append(word)
+    return words[:MAX_TERMS]
+
+
+def fts_phrase(term: str) -> str:
+    """FTS5 string matching `term` anywhere in a column under the trigram tokenizer"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_pattern(term: str) -> str:
+    """'%term%' with the LIKE wildcards in `term` escaped by a backslash"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def dialect() -> str:
+    return db.engine.dialect.name
+
+
+def index_ready(name: str, checks: Dict[str, str]) -> bool:
+    """
+    Whether the search index `name` exists, looked up once per process with
+    the query for this dialect in `checks`. Indexes are created by init-db,
+    a running process picks up a new one on restart.
+    """
+    if name not in _ready:
+        sql = checks.get(dialect())
+        _ready[name] = bool(sql) and db.session.execute(text(sql)).first() is not None
+    return _ready[name]
+
+
+def create_index(name: str, statements: List[str]) -> bool:
+    """Run the DDL for a search index, False when this database can't build it"""
+    try:
+        for statement in statements:
+            db.session.execute(text(statement))
+        db.session.commit()
+    except DBAPIError as e:
+        # missing fts5 or trigram tokenizer, or no rights to create pg_trgm
+        db.session.rollback()
+        logger.warning(f"Search index {name} not created, searches fall back to a table scan: {e}")
+        _ready[name] = False
+        return False
+    _ready[name] = True
+    return True
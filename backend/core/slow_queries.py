@@ -0,0 +1,201 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .logger import logger
+
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'true').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', 200))
+# EXPLAIN runs once per distinct statement, plans are kept for this many
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_PLAN_CACHE = 500
+
+# top level package, frames outside it are library code
+_PACKAGE = __name__.split('.core.')[0]
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"%\([^)]+\)s|%s|(?<!:):\w+|\$\d+")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_entries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_plans = OrderedDict()  # normalized statement -> plan lines
+_lock = threading.Lock()
+_engine_hooked = False
+
+
+def normalize_sql(statement: str) -> str:
+    """Strip literals and bind markers so the same query always looks the same"""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _BIND_PARAM.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PARAM_LIST.sub('(?, ...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _shape(params):
+    """Types of the bind values, never the values themselves"""
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(value).__name__ for value in params]
+    return type(params).__name__
+
+
+def param_shape(parameters, executemany: bool):
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'row': _shape(rows[0]) if rows else None}
+    return _shape(parameters)
+
+
+def _caller():
+    """Innermost application frame that led to the statement"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith(_PACKAGE + '.') and module != __name__:
+            code = frame.f_code
+            return {
+                'function': getattr(code, 'co_qualname', code.co_name),
+                'module': module,
+                'line': frame.f_lineno
+            }
+        frame = frame.f_back
+    return None
+
+
+def _explain(cursor, dialect: str, statement: str, parameters):
+    if dialect == 'sqlite':
+        sql = 'EXPLAIN QUERY PLAN ' + statement
+    elif dialect == 'postgresql':
+        sql = 'EXPLAIN ' + statement
+    else:
+        return None
+
+    # a separate cursor so the caller's pending result is left alone
+    dbapi_connection = cursor.connection
+    # a failed statement aborts a Postgres transaction, the savepoint keeps
+    # the caller's usable if the EXPLAIN fails
+    savepoint = dialect == 'postgresql' and not getattr(dbapi_connection, 'autocommit', False)
+    explain_cursor = dbapi_connection.cursor()
+    try:
+        if savepoint:
+            explain_cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            explain_cursor.execute(sql, parameters)
+            rows = explain_cursor.fetchall()
+        except Exception:
+            if savepoint:
+                explain_cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            raise
+        if savepoint:
+            explain_cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        explain_cursor.close()
+
+    if dialect == 'sqlite':
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def _plan_for(cursor, dialect: str, statement: str, normalized: str, parameters, executemany: bool):
+    if not SLOW_QUERY_EXPLAIN or executemany:
+        return None
+    if not normalized.lstrip('( ').upper().startswith(('SELECT', 'WITH')):
+        return None
+
+    with _lock:
+        if normalized in _plans:
+            _plans.move_to_end(normalized)
+            return _plans[normalized]
+
+    try:
+        plan = _explain(cursor, dialect, statement, parameters)
+    except Exception as e:
+        logger.debug(f"EXPLAIN failed for slow query: {e}")
+        plan = None
+
+    with _lock:
+        _plans[normalized] = plan
+        while len(_plans) > SLOW_QUERY_PLAN_CACHE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('slow_query_start')
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    try:
+        normalized = normalize_sql(statement)
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'duration_ms': round(elapsed_ms, 2),
+            'statement': normalized,
+            'parameters': param_shape(parameters, executemany),
+            'caller': _caller(),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'plan': _plan_for(cursor, conn.dialect.name, statement, normalized, parameters, executemany)
+        }
+    except Exception as e:
+        logger.error(f"Slow query capture failed: {e}")
+        return
+
+    caller = entry['caller']['function'] if entry['caller'] else 'unknown'
+    logger.warning(f"Slow query {entry['duration_ms']}ms in {caller}: {normalized[:200]}")
+    with _lock:
+        _entries.append(entry)
+
+
+def _handle_error(context):
+    # failed statements skip after_cursor_execute, their start would stay on the pooled connection
+    starts = context.connection.info.get('slow_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def get_slow_queries(limit: int = None) -> list:
+    """Most recent slow queries first"""
+    with _lock:
+        entries = list(_entries)
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def clear_slow_queries() -> int:
+    with _lock:
+        count = len(_entries)
+        _entries.clear()
+        _plans.clear()
+    return count
+
+
+def init_slow_query_log() -> None:
+    """Watch every engine, including ones created later, for slow statements"""
+    global _engine_hooked
+    if not SLOW_QUERY_LOG or _engine_hooked:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    _engine_hooked = True
+    logger.debug(f"Slow query log enabled at {SLOW_QUERY_THRESHOLD_MS}ms")
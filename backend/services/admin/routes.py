@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from flask_jwt_extended import jwt_required
 from pydantic import ValidationError
 
@@ -7,6 +7,10 @@ from ...core.cache import cached, invalidate
 from ...core.models import MedicalRecord
 from ...core.auth import admin_required
 from ...core.logger import logger
+from ...core.passwords import PasswordPoolBusy
+from ...core.profiling import PROFILER_DEFAULT_HZ, sample_stacks
+from ...core.replicas import read_only
+from ...core.slow_queries import clear_slow_queries, get_slow_queries, SLOW_QUERY_THRESHOLD_MS
 
 from ...auth.schema import RegisterPatient
 
@@ -32,10 +36,12 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 @admin_bp.route('/dashboard/stats', methods=['GET'])
 @jwt_required()
 @admin_required
+@read_only
 def get_dashboard_stats():
     """Get admin dashboard statistics"""
     try:
-        from ...core.models import User, Patient, Doctor, Department, Appointment
+        from ...core.database import db
+        from ...core.models import User, Patient, Doctor, Department, Appointment, ArchivedAppointment, ArchivedMedicalRecord
         from datetime import date, timedelta
         from sqlalchemy import func
 
@@ -43,6 +49,11 @@ def get_dashboard_stats():
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
 
+        # all-time totals include the archive, the recent windows never reach it
+        archived = dict(db.session.query(
+            ArchivedAppointment.status, func.count(ArchivedAppointment.id)
+        ).group_by(ArchivedAppointment.status).all())
+
         stats = {
             'users': {
                 'total_patients': Patient.query.count(),
@@ -54,15 +65,15 @@ def get_dashboard_stats():
                 'active': Department.query.filter_by(is_active=True).count()
             },
             'appointments': {
-                'total': Appointment.query.count(),
+                'total': Appointment.query.count() + sum(archived.values()),
                 'today': Appointment.query.filter(Appointment.appointment_date == today).count(),
                 'this_week': Appointment.query.filter(Appointment.appointment_date >= week_ago).count(),
-                'scheduled': Appointment.query.filter_by(status='scheduled').count(),
-                'completed': Appointment.query.filter_by(status='completed').count(),
-                'cancelled': Appointment.query.filter_by(status='cancelled').count()
+                'scheduled': Appointment.query.filter_by(status='scheduled').count() + archived.get('scheduled', 0),
+                'completed': Appointment.query.filter_by(status='completed').count() + archived.get('completed', 0),
+                'cancelled': Appointment.query.filter_by(status='cancelled').count() + archived.get('cancelled', 0)
             },
             'medical_records': {
-                'total': MedicalRecord.query.count(),
+                'total': MedicalRecord.query.count() + ArchivedMedicalRecord.query.count(),
                 'this_month': MedicalRecord.query.filter(MedicalRecord.created_at >= month_ago).count()
             }
         }
@@ -287,6 +298,8 @@ def create_doctor():
             'status': 'error',
             'message': str(e)
         }), 400
+    except PasswordPoolBusy:
+        return jsonify({'status': 'error', 'message': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         logger.error(f"Doctor creation failed: {str(e)}", exc_info=True)
         return jsonify({
@@ -431,9 +444,24 @@ def get_doctors():
 @admin_required
 # @cached('patients',ttl=900) # 15 mins
 def get_patients():
-    """Get all patients"""
+    """Get all patients, or a ranked page of them with ?search="""
     try:
         include_inactive = True
+        search = request.args.get('search', '').strip()
+        if search:
+            page = request.args.get('page', 1, type=int)
+            per_page = request.args.get('per_page', 20, type=int)
+            patients, total = PatientService.search_patients(search, include_inactive, page, per_page)
+            return jsonify({
+                'status': 'success',
+                'data': {
+                    'patients': patients,
+                    'total': total,
+                    'page': page,
+                    'per_page': per_page
+                }
+            })
+
         patients = PatientService.get_patients(include_inactive)
         return jsonify({
             'status': 'success',
@@ -482,6 +510,8 @@ def create_patient():
         return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.errors()}), 400
     except ValueError as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
+    except PasswordPoolBusy:
+        return jsonify({'status': 'error', 'message': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         logger.error(f"Patient creation failed: {str(e)}", exc_info=True)
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
@@ -584,6 +614,7 @@ def create_working_hours(doctor_id):
             doctor_id, 
             [day.model_dump() for day in data.schedule]
         )
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Working hours created successfully',
@@ -616,6 +647,7 @@ def bulk_update_working_hours(doctor_id):
             doctor_id,
             [day.model_dump() for day in data.schedule]
         )
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Working hours updated successfully',
@@ -642,6 +674,7 @@ def update_working_hours_day(doctor_id, day):
             day,
             data.model_dump(exclude_unset=True)
         )
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Working hours updated successfully',
@@ -663,6 +696,7 @@ def delete_working_hours(doctor_id):
     """Delete all working hours for a doctor"""
     try:
         DoctorService.delete_working_hours(doctor_id)
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Working hours deleted successfully'
@@ -694,20 +728,66 @@ def get_unavailability(doctor_id):
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 
+@admin_bp.route('/departments/<int:department_id>/calendar', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_department_calendar(department_id):
+    """Get calendars for all doctors in a department"""
+    try:
+        calendar_data = DoctorService.get_department_calendar(
+            department_id,
+            request.args.get('start_date'),
+            request.args.get('end_date')
+        )
+        return jsonify({
+            'status': 'success',
+            'data': {'calendar': calendar_data}
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to get department calendar: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
+@admin_bp.route('/departments/<int:department_id>/roster', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_department_roster(department_id):
+    """Get the slot roster for all doctors in a department"""
+    try:
+        roster = DoctorService.get_department_roster(
+            department_id,
+            request.args.get('start_date'),
+            request.args.get('end_date')
+        )
+        return jsonify({
+            'status': 'success',
+            'data': {'roster': roster}
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to get department roster: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
 @admin_bp.route('/hospital-holiday', methods=['POST'])
 @jwt_required()
 @admin_required
 def create_hospital_holiday():
-    """Mark all doctors unavailable for a date"""
+    """Mark all doctors unavailable for a date or date range"""
     try:
         data = request.get_json()
         date = data.get('date')
+        end_date = data.get('end_date')
         reason = data.get('reason', 'Hospital Holiday')
 
         if not date:
             return jsonify({'status': 'error', 'message': 'date is required'}), 400
 
-        result = AdminService.create_hospital_holiday(date, reason)
+        result = AdminService.create_hospital_holiday(date, reason, end_date)
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': f'Hospital holiday created for {result["doctors_affected"]} doctors',
@@ -724,14 +804,16 @@ def create_hospital_holiday():
 @jwt_required()
 @admin_required
 def delete_hospital_holiday():
-    """Remove hospital holiday for a date"""
+    """Remove hospital holiday for a date or date range"""
     try:
         date = request.args.get('date')
+        end_date = request.args.get('end_date')
 
         if not date:
             return jsonify({'status': 'error', 'message': 'date query param required'}), 400
 
-        result = AdminService.delete_hospital_holiday(date)
+        result = AdminService.delete_hospital_holiday(date, end_date)
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': f'Hospital holiday removed for {result["doctors_affected"]} doctors',
@@ -802,6 +884,7 @@ def update_appointment_status(appointment_id):
         reason = data.get('reason')
 
         appointment = AppointmentService.update_status(appointment_id, new_status, reason)
+        invalidate('roster')
 
         return jsonify({
             'status': 'success',
@@ -839,6 +922,42 @@ def get_all_records():
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 
+@admin_bp.route('/records/search', methods=['GET'])
+@jwt_required()
+@admin_required
+def search_records():
+    """Search medical records, best matches first"""
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+
+        records, total = MedicalRecordService.search(
+            search=request.args.get('q', ''),
+            patient_id=request.args.get('patient_id', type=int),
+            doctor_id=request.args.get('doctor_id', type=int),
+            department_id=request.args.get('department_id', type=int),
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date'),
+            page=page,
+            per_page=per_page
+        )
+
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'records': records,
+                'total': total,
+                'page': page,
+                'per_page': per_page
+            }
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to search records: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
 @admin_bp.route('/records/<int:record_id>', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -958,4 +1077,65 @@ def get_department_records(department_id):
         })
     except Exception as e:
         logger.error(f"Failed to get department records: {str(e)}", exc_info=True)
-        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
\ No newline at end of file
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
+###### DIAGNOSTICS ROUTES ######
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_slow_queries_log():
+    """Get recent slow SQL statements captured by this worker"""
+    try:
+        entries = get_slow_queries(limit=request.args.get('limit', type=int))
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'threshold_ms': SLOW_QUERY_THRESHOLD_MS,
+                'queries': entries,
+                'total': len(entries)
+            }
+        })
+    except Exception as e:
+        logger.error(f"Failed to get slow queries: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
+@admin_bp.route('/slow-queries', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def clear_slow_queries_log():
+    """Clear the slow query log of this worker"""
+    try:
+        cleared = clear_slow_queries()
+        return jsonify({'status': 'success', 'data': {'cleared': cleared}})
+    except Exception as e:
+        logger.error(f"Failed to clear slow queries: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
+@admin_bp.route('/profile', methods=['POST'])
+@jwt_required()
+@admin_required
+def profile_worker():
+    """Sample this worker's stacks and return them as a collapsed-stack file"""
+    try:
+        result = sample_stacks(
+            seconds=request.args.get('seconds', 10, type=float),
+            hz=request.args.get('hz', PROFILER_DEFAULT_HZ, type=int)
+        )
+        filename = f"profile-{result['pid']}.collapsed"
+        return Response(
+            result['collapsed'],
+            mimetype='text/plain',
+            headers={
+                'Content-Disposition': f'attachment; filename={filename}',
+                'X-Profile-Samples': str(result['samples'])
+            }
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to profile worker: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
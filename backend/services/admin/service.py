@@ -1,18 +1,22 @@
-from datetime import datetime , time
-from typing import Optional, List 
-from flask_bcrypt import Bcrypt 
+from datetime import datetime , time, timedelta, date as date_type
+from typing import Optional, List, Tuple
+from sqlalchemy import insert, tuple_
 from sqlalchemy.exc import IntegrityError
 
 from ...core.database import db
 from ...core.logger import logger
-from ...core.auth import admin_required
-from ...core.models import User, Doctor, Department, DoctorUnavailability
+from ...core.replicas import read_only
+from ...core.auth import admin_required, bump_account_version, forget_account_version
+from ...core.passwords import hash_password
+from ...core.models import User, Doctor, Department, DoctorUnavailability, Appointment, Patient
+from ..doctors.schedule import bump_schedule_versions, invalidate_slots
 from .schemas import DepartmentCreate, DepartmentUpdate, DoctorCreate, DoctorUpdate
 
-bcrypt = Bcrypt()
 
 class AdminService:
 
+    MAX_HOLIDAY_DAYS = 366
+
     ########### DEPARTMENTS #############
     @staticmethod 
     @admin_required
@@ -76,6 +80,7 @@ class AdminService:
         return department
     
     @staticmethod
+    @read_only
     def get_departments(include_inactive: bool = False) -> List[dict]:
         """Get all departments with doctor count"""
         query = Department.query
@@ -142,7 +147,7 @@ class AdminService:
             logger.info(f"Creating new doctor: {data.first_name} {data.last_name}, email: {data.email}")
 
             # create user account
-            hashed_password = bcrypt.generate_password_hash(data.password).decode('utf-8')
+            hashed_password = hash_password(data.password)
             user = User(
                 username = data.username,
                 email = data.email,
@@ -245,6 +250,7 @@ class AdminService:
         return doctor
     
     @staticmethod
+    @read_only
     def get_doctors(department_id: Optional[int] = None, only_available: bool = False) -> List[Doctor]:
         """ Get list of doctors, optionally filtered by department and availability """
         query = Doctor.query.join(Department).add_columns(Department.name.label('department_name'))
@@ -291,7 +297,9 @@ class AdminService:
 
             user.is_active = not user.is_active
             user.updated_at = datetime.utcnow()
+            bump_account_version(user)
             db.session.commit()
+            forget_account_version(user_id)
             logger.info(f"User id {user_id} status updated to is_active={user.is_active}")
             return {
                 'id': user.id,
@@ -318,6 +326,7 @@ class AdminService:
 
             db.session.delete(user)
             db.session.commit()
+            forget_account_version(user_id)
             logger.info(f"User id {user_id} deleted successfully")
 
         except Exception as e:
@@ -327,75 +336,157 @@ class AdminService:
         
     ########### HOSPITAL HOLIDAYS #############
     @staticmethod
-    def create_hospital_holiday(date: str, reason: str) -> dict:
+    def create_hospital_holiday(date: str, reason: str, end_date: Optional[str] = None) -> dict:
         """
         Create hospital-wide holiday by marking all doctors unavailable.
+        Covers every day from date to end_date (inclusive), one entry per
+        doctor per day, and reports the scheduled appointments that fall
+        inside the closure.
         """
-        # Parse date
-        holiday_date = datetime.strptime(date, '%Y-%m-%d').date()
-        
+        start_date, last_date = AdminService._holiday_range(date, end_date)
+        days = [start_date + timedelta(days=i) for i in range((last_date - start_date).days + 1)]
+
         # Get all active doctors
         doctors = Doctor.query.filter_by(is_available=True).all()
-        
+
         if not doctors:
             raise ValueError("No active doctors found")
 
-        logger.info(f"Creating hospital holiday on {date} for {len(doctors)} doctors")
-
-        # Start and end of the day
-        start_datetime = datetime.combine(holiday_date, time(0, 0, 0))
-        end_datetime = datetime.combine(holiday_date, time(23, 59, 59))
-
-        created_count = 0
-        for doctor in doctors:
-            # Check if unavailability already exists for this date
-            existing = DoctorUnavailability.query.filter(
-                DoctorUnavailability.doctor_id == doctor.id,
-                DoctorUnavailability.start_datetime <= end_datetime,
-                DoctorUnavailability.end_datetime >= start_datetime
-            ).first()
-
-            if not existing:
-                unavailability = DoctorUnavailability(
-                    doctor_id=doctor.id,
-                    start_datetime=start_datetime,
-                    end_datetime=end_datetime,
-                    reason=f"[Hospital Holiday] {reason}"
-                )
-                db.session.add(unavailability)
-                created_count += 1
-
+        logger.info(f"Creating hospital holiday from {start_date} to {last_date} for {len(doctors)} doctors")
+
+        doctor_ids = [doctor.id for doctor in doctors]
+        range_start = datetime.combine(start_date, time(0, 0, 0))
+        range_end = datetime.combine(last_date, time(23, 59, 59))
+
+        # (doctor, day) pairs that already have some unavailability, from one query
+        covered = set()
+        existing = db.session.query(
+            DoctorUnavailability.doctor_id,
+            DoctorUnavailability.start_datetime,
+            DoctorUnavailability.end_datetime
+        ).filter(
+            DoctorUnavailability.doctor_id.in_(doctor_ids),
+            DoctorUnavailability.start_datetime <= range_end,
+            DoctorUnavailability.end_datetime >= range_start
+        ).all()
+        for doctor_id, unavail_start, unavail_end in existing:
+            day = max(unavail_start.date(), start_date)
+            while day <= min(unavail_end.date(), last_date):
+                covered.add((doctor_id, day))
+                day += timedelta(days=1)
+
+        holiday_reason = f"[Hospital Holiday] {reason}"
+        rows = [
+            {
+                'doctor_id': doctor_id,
+                'start_datetime': datetime.combine(day, time(0, 0, 0)),
+                'end_datetime': datetime.combine(day, time(23, 59, 59)),
+                'reason': holiday_reason
+            }
+            for doctor_id in doctor_ids
+            for day in days
+            if (doctor_id, day) not in covered
+        ]
+
+        # one executemany instead of a flush per row
+        if rows:
+            db.session.execute(insert(DoctorUnavailability), rows)
         db.session.commit()
-        
-        logger.info(f"Hospital holiday created for {created_count} doctors")
+
+        closed_doctors = sorted({row['doctor_id'] for row in rows})
+        bump_schedule_versions(closed_doctors)
+        invalidate_slots(closed_doctors, days)
+
+        affected = AdminService._holiday_appointments(doctors, start_date, last_date)
+
+        logger.info(f"Hospital holiday created for {len(closed_doctors)} doctors ({len(rows)} entries), {len(affected)} appointments affected")
         return {
-            'date': date,
+            'date': start_date.isoformat(),
+            'end_date': last_date.isoformat(),
             'reason': reason,
-            'doctors_affected': created_count
+            'days': len(days),
+            'doctors_affected': len(closed_doctors),
+            'entries_created': len(rows),
+            'affected_appointments': affected
         }
 
     @staticmethod
-    def delete_hospital_holiday(date: str) -> dict:
+    def _holiday_range(date: str, end_date: Optional[str] = None) -> Tuple[date_type, date_type]:
+        """Parse and validate a hospital holiday date range"""
+        start_date = datetime.strptime(date, '%Y-%m-%d').date()
+        last_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else start_date
+
+        if last_date < start_date:
+            raise ValueError("end_date must be on or after date")
+        if (last_date - start_date).days + 1 > AdminService.MAX_HOLIDAY_DAYS:
+            raise ValueError(f"Hospital holiday cannot exceed {AdminService.MAX_HOLIDAY_DAYS} days")
+
+        return start_date, last_date
+
+    @staticmethod
+    def _holiday_appointments(doctors: List[Doctor], start_date: date_type, last_date: date_type) -> List[dict]:
+        """Scheduled appointments inside a closure, from one joined query"""
+        doctor_names = {doctor.id: f"Dr. {doctor.first_name} {doctor.last_name}" for doctor in doctors}
+
+        rows = db.session.query(
+            Appointment.id,
+            Appointment.doctor_id,
+            Appointment.patient_id,
+            Appointment.appointment_date,
+            Appointment.appointment_time,
+            Patient.first_name,
+            Patient.last_name
+        ).outerjoin(
+            Patient, Patient.id == Appointment.patient_id
+        ).filter(
+            Appointment.doctor_id.in_(list(doctor_names)),
+            Appointment.appointment_date >= start_date,
+            Appointment.appointment_date <= last_date,
+            Appointment.status == 'scheduled'
+        ).order_by(
+            Appointment.appointment_date,
+            Appointment.appointment_time
+        ).all()
+
+        return [{
+            'appointment_id': apt_id,
+            'doctor_id': doctor_id,
+            'doctor_name': doctor_names[doctor_id],
+            'patient_id': patient_id,
+            'patient_name': f"{first_name} {last_name}" if first_name else None,
+            'appointment_date': apt_date.isoformat(),
+            'appointment_time': apt_time.strftime('%H:%M')
+        } for apt_id, doctor_id, patient_id, apt_date, apt_time, first_name, last_name in rows]
+
+    @staticmethod
+    def delete_hospital_holiday(date: str, end_date: Optional[str] = None) -> dict:
         """
         Remove hospital-wide holiday by deleting unavailability entries.
         """
-        holiday_date = datetime.strptime(date, '%Y-%m-%d').date()
-        start_datetime = datetime.combine(holiday_date, time(0, 0, 0))
-        end_datetime = datetime.combine(holiday_date, time(23, 59, 59))
+        start_date, last_date = AdminService._holiday_range(date, end_date)
+        days = [start_date + timedelta(days=i) for i in range((last_date - start_date).days + 1)]
 
-        logger.info(f"Removing hospital holiday on {date}")
+        logger.info(f"Removing hospital holiday from {start_date} to {last_date}")
 
-        # Delete all hospital holiday entries for this date
-        deleted = DoctorUnavailability.query.filter(
-            DoctorUnavailability.start_datetime == start_datetime,
-            DoctorUnavailability.end_datetime == end_datetime,
+        # Delete the whole-day hospital holiday entries for these dates, matching
+        # start and end as a pair so multi-day entries are left alone
+        entries = DoctorUnavailability.query.filter(
+            tuple_(DoctorUnavailability.start_datetime, DoctorUnavailability.end_datetime).in_(
+                [(datetime.combine(d, time(0, 0, 0)), datetime.combine(d, time(23, 59, 59))) for d in days]
+            ),
             DoctorUnavailability.reason.like('[Hospital Holiday]%')
-        ).delete(synchronize_session=False)
+        )
+        reopened_doctors = sorted({doctor_id for doctor_id, in entries.with_entities(DoctorUnavailability.doctor_id)})
+        deleted = entries.delete(synchronize_session=False)
 
         db.session.commit()
+        bump_schedule_versions(reopened_doctors)
+        invalidate_slots(reopened_doctors, days)
 
-        logger.info(f"Removed hospital holiday for {deleted} doctors")
+        logger.info(f"Removed hospital holiday for {deleted} doctor days")
         return {
-            'date': date,
-            'doctors_affected': deleted
+            'date': start_date.isoformat(),
+            'end_date': last_date.isoformat(),
+            'doctors_affected': len(reopened_doctors),
+            'entries_deleted': deleted
         }
\ No newline at end of file
@@ -0,0 +1,205 @@
+import os
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import delete, exists, insert, literal, select, text
+from sqlalchemy.schema import CreateTable
+
+from ...core.database import db
+from ...core.logger import logger
+from ...core.models import (Appointment, MedicalRecord, PrescriptionItem,
+                            ArchivedAppointment, ArchivedMedicalRecord, ArchivedPrescriptionItem)
+
+# appointments dated before the first of the month this many days ago are archived
+ARCHIVE_AFTER_DAYS = int(os.getenv('APPOINTMENT_ARCHIVE_AFTER_DAYS', 730))
+ARCHIVE_BATCH_SIZE = int(os.getenv('APPOINTMENT_ARCHIVE_BATCH_SIZE', 1000))
+
+# calendars default to this month and the monthly reports cover the last one,
+# both have to stay in the live tables
+MIN_ARCHIVE_AFTER_DAYS = 62
+
+DateLike = Union[str, date, datetime, None]
+
+# live tables whose ids carry over into the archive table next to them
+ARCHIVED_TABLES = (
+    (Appointment, ArchivedAppointment),
+    (MedicalRecord, ArchivedMedicalRecord),
+    (PrescriptionItem, ArchivedPrescriptionItem),
+)
+
+
+def archive_cutoff(today: Optional[date] = None) -> date:
+    """Everything dated before this is archived, or will be on the next run"""
+    days = max(ARCHIVE_AFTER_DAYS, MIN_ARCHIVE_AFTER_DAYS)
+    return ((today or date.today()) - timedelta(days=days)).replace(day=1)
+
+
+def _as_date(value: DateLike) -> Optional[date]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+def _reaches_archive(start: DateLike) -> bool:
+    # the cutoff only moves forward, so nothing archived is dated after it
+    start = _as_date(start)
+    return start is None or start < archive_cutoff()
+
+
+def appointment_models(start: DateLike = None) -> Tuple[type, ...]:
+    """Appointment models to read for a range beginning at `start` (None for all time)"""
+    if _reaches_archive(start):
+        return (Appointment, ArchivedAppointment)
+    return (Appointment,)
+
+
+def record_models(start: DateLike = None) -> Tuple[type, ...]:
+    """Medical record models to read for records created on or after `start`"""
+    if _reaches_archive(start):
+        return (MedicalRecord, ArchivedMedicalRecord)
+    return (MedicalRecord,)
+
+
+def find_appointment(appointment_id: int):
+    """Live appointment, else the archived one with that id"""
+    return Appointment.query.get(appointment_id) or ArchivedAppointment.query.get(appointment_id)
+
+
+def find_record(record_id: int):
+    """Live medical record, else the archived one with that id"""
+    return MedicalRecord.query.get(record_id) or ArchivedMedicalRecord.query.get(record_id)
+
+
+def _reusing_ids() -> List[tuple]:
+    """
+    (live, archive) model pairs whose live table can hand out an archived id
+    again: sqlite tables created before they had AUTOINCREMENT
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return []
+    schema = dict(db.session.execute(text(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ('appointments', 'medical_records', 'prescription_items')"
+    )).all())
+    return [
+        (live, archive) for live, archive in ARCHIVED_TABLES
+        if live.__tablename__ in schema and 'AUTOINCREMENT' not in schema[live.__tablename__].upper()
+    ]
+
+
+def init_archive() -> None:
+    """
+    Rebuild the live tables of sqlite databases created before they had
+    AUTOINCREMENT, run by init-db. Rows, indexes and triggers are kept, and
+    the id sequence starts above every live and archived id.
+    """
+    pending = _reusing_ids()
+    if not pending:
+        return
+
+    names = [live.__tablename__ for live, _ in pending]
+    # triggers naming a rebuilt table would break the rename, they are put back after
+    triggers = [
+        (name, sql) for name, sql in db.session.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+        )).all()
+        if any(table in sql for table in names)
+    ]
+    try:
+        for name, _ in triggers:
+            db.session.execute(text(f"DROP TRIGGER {name}"))
+        for live, archive in pending:
+            table = live.__table__
+            rebuilt = f"{table.name}_rebuild"
+            columns = ', '.join(column.name for column in table.columns)
+            ddl = str(CreateTable(table).compile(dialect=db.engine.dialect))
+            db.session.execute(text(ddl.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {rebuilt} ", 1)))
+            db.session.execute(text(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table.name}"))
+            db.session.execute(text(f"DROP TABLE {table.name}"))
+            db.session.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {table.name}"))
+            for index in table.indexes:
+                index.create(db.session.connection(), checkfirst=True)
+            db.session.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {'name': table.name})
+            db.session.execute(text(
+                f"INSERT INTO sqlite_sequence (name, seq) SELECT :name, max("
+                f"(SELECT coalesce(max(id), 0) FROM {table.name}), "
+                f"(SELECT coalesce(max(id), 0) FROM {archive.__tablename__}))"
+            ), {'name': table.name})
+        for _, sql in triggers:
+            db.session.execute(text(sql))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Rebuilt {', '.join(names)} with AUTOINCREMENT")
+
+
+def _copy(source, target, where, **extra) -> None:
+    """INSERT ... SELECT the matching live rows into their archive table"""
+    columns = list(source.__table__.columns)
+    values = {name: literal(value, target.__table__.c[name].type) for name, value in extra.items()}
+    db.session.execute(insert(target).from_select(
+        [column.name for column in columns] + list(values),
+        select(*columns, *values.values()).where(where)
+    ))
+
+
+def archive_appointments(cutoff: Optional[date] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> dict:
+    """
+    Move appointments dated before `cutoff` into the archive tables together
+    with their medical records and prescription items, one batch per
+    transaction. Appointments whose record was written on or after the
+    cutoff stay live for now, so archived records are also older than it.
+    """
+    cutoff = cutoff or archive_cutoff()
+    if cutoff > archive_cutoff():
+        raise ValueError(f"Cutoff must be on or before {archive_cutoff().isoformat()}")
+    reusing = _reusing_ids()
+    if reusing:
+        # a reused id would collide with, or be linked to, an archived row
+        raise ValueError(f"{', '.join(live.__tablename__ for live, _ in reusing)} can reuse archived ids, "
+                         f"run init-db to rebuild them before archiving")
+
+    cutoff_at = datetime.combine(cutoff, time.min)
+    moved = {'appointments': 0, 'medical_records': 0, 'prescription_items': 0}
+
+    while True:
+        ids = [apt_id for (apt_id,) in db.session.query(Appointment.id).filter(
+            Appointment.appointment_date < cutoff,
+            ~exists().where(
+                MedicalRecord.appointment_id == Appointment.id,
+                MedicalRecord.created_at >= cutoff_at
+            )
+        ).order_by(Appointment.id).limit(batch_size)]
+        if not ids:
+            break
+
+        record_ids = [record_id for (record_id,) in db.session.query(MedicalRecord.id).filter(
+            MedicalRecord.appointment_id.in_(ids)
+        )]
+
+        archived_at = datetime.utcnow()
+        try:
+            # parents go in first and come out last, for the foreign keys
+            appointments = Appointment.id.in_(ids)
+            records = MedicalRecord.id.in_(record_ids)
+            items = PrescriptionItem.medical_record_id.in_(record_ids)
+            _copy(Appointment, ArchivedAppointment, appointments, archived_at=archived_at)
+            if record_ids:
+                _copy(MedicalRecord, ArchivedMedicalRecord, records)
+                _copy(PrescriptionItem, ArchivedPrescriptionItem, items)
+                moved['prescription_items'] += db.session.execute(delete(PrescriptionItem).where(items)).rowcount
+                moved['medical_records'] += db.session.execute(delete(MedicalRecord).where(records)).rowcount
+            moved['appointments'] += db.session.execute(delete(Appointment).where(appointments)).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    db.session.expire_all()
+    logger.info(f"Archived {moved['appointments']} appointments, {moved['medical_records']} records "
+                f"and {moved['prescription_items']} prescription items dated before {cutoff.isoformat()}")
+    return {'cutoff': cutoff.isoformat(), **moved}
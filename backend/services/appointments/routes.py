@@ -4,14 +4,24 @@ from datetime import datetime
 
 from ...core.cache import cached
 from ...core.logger import logger
+from ..doctors.schedule import slot_cache_key
 from .service import AppointmentService
 
 appointment_bp = Blueprint('appointments', __name__, url_prefix='/appointments')
 
 
+def _slots_key(doctor_id):
+    # doctor and day, so a closure can drop just the days it covers
+    date_str = request.args.get('date')
+    try:
+        return slot_cache_key(doctor_id, datetime.strptime(date_str or '', '%Y-%m-%d').date())
+    except ValueError:
+        return f"{doctor_id}:{date_str}"
+
+
 @appointment_bp.route('/slots/<int:doctor_id>', methods=['GET'])
 @jwt_required()
-@cached('slots', ttl=60) 
+@cached('slots', ttl=60, key=_slots_key) 
 def get_available_slots(doctor_id):
     """Get available slots for a doctor on a specific date"""
     try:
@@ -3,7 +3,10 @@ from typing import List, Optional
 
 from ...core.database import db
 from ...core.logger import logger
+from ...core.replicas import read_only
 from ...core.models import Doctor, DoctorWorkingHours, DoctorUnavailability, Appointment, Patient, MedicalRecord
+from ..doctors.schedule import get_doctor_schedule
+from .archive import appointment_models, find_appointment
 
 class AppointmentService: 
 
@@ -25,8 +28,18 @@ class AppointmentService:
     
     ######## APPOINTMENT SCHEDULING ###########
     @staticmethod
+    @read_only
     def get_available_slots(doctor_id: int, appointment_date: date) -> List[dict]: 
         """Get available slots for a doctor on a specific date"""
+        return AppointmentService._compute_slots(doctor_id, appointment_date)
+
+    @staticmethod
+    def _compute_slots(doctor_id: int, appointment_date: date) -> List[dict]:
+        """
+        Slots of a doctor on a date, read from the session's current database.
+        Booking and rescheduling check against this on the primary, a lagging
+        replica could still show a slot as taken after it was cancelled.
+        """
         doctor = Doctor.query.get(doctor_id)
         if not doctor:
             raise ValueError("Doctor not found")
@@ -40,11 +53,8 @@ class AppointmentService:
         if appointment_date > date.today() + timedelta(days=AppointmentService.MAX_ADVANCE_DAYS):
             return []
         
-        day_of_week = appointment_date.weekday()
-
-        working_hours = DoctorWorkingHours.query.filter_by(
-            doctor_id=doctor_id, day_of_week=day_of_week
-        ).first()
+        schedule = get_doctor_schedule(doctor_id)
+        working_hours = schedule.hours_for(appointment_date)
 
         if not working_hours:
             return []
@@ -53,11 +63,7 @@ class AppointmentService:
         start_of_day = datetime.combine(appointment_date, time.min)
         end_of_day = datetime.combine(appointment_date, time.max)
 
-        unavailabilities = DoctorUnavailability.query.filter(
-            DoctorUnavailability.doctor_id == doctor_id,
-            DoctorUnavailability.start_datetime <= end_of_day,
-            DoctorUnavailability.end_datetime >= start_of_day
-        ).all()
+        unavailabilities = schedule.overlapping(start_of_day, end_of_day)
 
         # Get existing appointments
         existing_appointments = Appointment.query.filter(
@@ -89,7 +95,7 @@ class AppointmentService:
             # Check if slot falls within any unavailability period
             is_unavailable = False
             for unavail in unavailabilities:
-                if unavail.start_datetime <= slot_datetime < unavail.end_datetime:
+                if unavail.start <= slot_datetime < unavail.end:
                     is_unavailable = True
                     break
             
@@ -125,7 +131,7 @@ class AppointmentService:
     
         apt_time = AppointmentService._parse_time(appointment_time)
 
-        slots = AppointmentService.get_available_slots(doctor_id, appointment_date)
+        slots = AppointmentService._compute_slots(doctor_id, appointment_date)
         slot = next((s for s in slots if s['time'] == appointment_time), None)
 
         if not slot or not slot['is_available']:
@@ -174,8 +180,8 @@ class AppointmentService:
     ###### GETTERS #########
     @staticmethod 
     def get_by_id(appointment_id: int) -> Optional[dict]:
-        """Get appointment by ID"""
-        appointment = Appointment.query.get(appointment_id)
+        """Get appointment by ID, archived ones included"""
+        appointment = find_appointment(appointment_id)
         if not appointment:
             return None
         return AppointmentService._to_dict(appointment)
@@ -184,75 +190,79 @@ class AppointmentService:
     @staticmethod
     def get_by_patient(patient_id: int, status: Optional[str] = None, upcoming_only: bool = False) -> List[dict]:
         """Get appointments for a patient"""
-        query = Appointment.query.filter(Appointment.patient_id == patient_id)
+        appointments = []
+        for model in appointment_models(date.today() if upcoming_only else None):
+            query = model.query.filter(model.patient_id == patient_id)
 
-        if status:
-            query = query.filter(Appointment.status == status)
+            if status:
+                query = query.filter(model.status == status)
 
-        if upcoming_only:
-            query = query.filter(Appointment.appointment_date >= date.today())
+            if upcoming_only:
+                query = query.filter(model.appointment_date >= date.today())
 
-        appointments = query.order_by(
-            Appointment.appointment_date,
-            Appointment.appointment_time
-        ).all()
+            appointments += query.all()
 
+        appointments.sort(key=lambda apt: (apt.appointment_date, apt.appointment_time))
         return [AppointmentService._to_dict(apt) for apt in appointments]
     
     @staticmethod
     def get_by_doctor(doctor_id: int, status: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, upcoming_only: bool = False) -> List[dict]:
         """Get appointments for a doctor"""
-        query = Appointment.query.filter(Appointment.doctor_id == doctor_id)
+        appointments = []
+        for model in appointment_models(date.today() if upcoming_only else start_date):
+            query = model.query.filter(model.doctor_id == doctor_id)
 
-        if status:
-            query = query.filter(Appointment.status == status)
+            if status:
+                query = query.filter(model.status == status)
 
-        if start_date:
-            query = query.filter(Appointment.appointment_date >= start_date)
+            if start_date:
+                query = query.filter(model.appointment_date >= start_date)
 
-        if end_date:
-            query = query.filter(Appointment.appointment_date <= end_date)
+            if end_date:
+                query = query.filter(model.appointment_date <= end_date)
 
-        if upcoming_only:
-            query = query.filter(Appointment.appointment_date >= date.today())
+            if upcoming_only:
+                query = query.filter(model.appointment_date >= date.today())
 
-        appointments = query.order_by(
-            Appointment.appointment_date,
-            Appointment.appointment_time
-        ).all()
+            appointments += query.all()
 
+        appointments.sort(key=lambda apt: (apt.appointment_date, apt.appointment_time))
         return [AppointmentService._to_dict(apt) for apt in appointments]
 
 
     @staticmethod
+    @read_only
     def get_all(doctor_id: Optional[int] = None, patient_id: Optional[int] = None, status: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[dict]:
         """Get all appointments with filters (admin)"""
-        query = Appointment.query
+        appointments = []
+        for model in appointment_models(start_date):
+            query = model.query
 
-        if doctor_id:
-            query = query.filter(Appointment.doctor_id == doctor_id)
+            if doctor_id:
+                query = query.filter(model.doctor_id == doctor_id)
 
-        if patient_id:
-            query = query.filter(Appointment.patient_id == patient_id)
+            if patient_id:
+                query = query.filter(model.patient_id == patient_id)
 
-        if status:
-            query = query.filter(Appointment.status == status)
+            if status:
+                query = query.filter(model.status == status)
 
-        if start_date:
-            query = query.filter(Appointment.appointment_date >= start_date)
+            if start_date:
+                query = query.filter(model.appointment_date >= start_date)
 
-        if end_date:
-            query = query.filter(Appointment.appointment_date <= end_date)
+            if end_date:
+                query = query.filter(model.appointment_date <= end_date)
 
-        appointments = query.order_by(
-            Appointment.appointment_date.desc(),
-            Appointment.appointment_time
-        ).all()
+            appointments += query.all()
 
+        # newest day first, earliest slot first within a day
+        appointments.sort(key=lambda apt: apt.appointment_time)
+        appointments.sort(key=lambda apt: apt.appointment_date, reverse=True)
         return [AppointmentService._to_dict(apt) for apt in appointments]
 
 
     @staticmethod
+    @read_only
     def get_all_appointments(
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
@@ -262,28 +272,29 @@ class AppointmentService:
     ) -> List[dict]:
         """Get all appointments with filters"""
         
-        query = Appointment.query
-
-        if start_date:
-            query = query.filter(Appointment.appointment_date >= start_date)
-        if end_date:
-            query = query.filter(Appointment.appointment_date <= end_date)
-        if status:
-            query = query.filter(Appointment.status == status)
-        if doctor_id:
-            query = query.filter(Appointment.doctor_id == doctor_id)
-        if patient_id:
-            query = query.filter(Appointment.patient_id == patient_id)
-
-        appointments = query.order_by(
-            Appointment.appointment_date.desc(),
-            Appointment.appointment_time.desc()
-        ).all()
+        appointments = []
+        for model in appointment_models(start_date):
+            query = model.query
+
+            if start_date:
+                query = query.filter(model.appointment_date >= start_date)
+            if end_date:
+                query = query.filter(model.appointment_date <= end_date)
+            if status:
+                query = query.filter(model.status == status)
+            if doctor_id:
+                query = query.filter(model.doctor_id == doctor_id)
+            if patient_id:
+                query = query.filter(model.patient_id == patient_id)
+
+            appointments += query.all()
+
+        appointments.sort(key=lambda apt: (apt.appointment_date, apt.appointment_time), reverse=True)
 
         result = []
         for apt in appointments:
-            # Check if medical record exists
-            has_record = MedicalRecord.query.filter_by(appointment_id=apt.id).first() is not None
+            # Check if medical record exists, the relationship follows archived ones too
+            has_record = apt.medical_record is not None
 
             result.append({
                 'id': apt.id,
@@ -317,7 +328,7 @@ class AppointmentService:
         if appointment.status != "scheduled":
             raise ValueError("Only scheduled appointments can be rescheduled")
 
-        slots = AppointmentService.get_available_slots(appointment.doctor_id, new_date)
+        slots = AppointmentService._compute_slots(appointment.doctor_id, new_date)
         slot = next((s for s in slots if s['time'] == new_time), None)
 
         if not slot or not slot['is_available']:
@@ -385,6 +396,7 @@ class AppointmentService:
     def complete_with_record(appointment_id: int, doctor_id: int, record_data: dict) -> dict:
         """Complete appointment by creating medical record and updating status"""
         from ..medical_records.service import MedicalRecordService
+        from ..medical_records.medicines import record_prescription
 
         appointment = Appointment.query.get(appointment_id)
         if not appointment:
@@ -409,6 +421,9 @@ class AppointmentService:
             appointment.updated_at = datetime.utcnow()
             db.session.commit()
 
+            for item in record['prescription_items']:
+                record_prescription(item['id'], item['medicine_name'], doctor_id)
+
             logger.info(f"Appointment {appointment_id} completed with record")
 
             return {
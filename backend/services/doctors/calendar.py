@@ -0,0 +1,183 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+
+from ...core.database import db
+from ...core.models import Appointment
+from .schedule import DoctorSchedule
+
+MAX_CALENDAR_DAYS = 366
+
+
+def resolve_range(start_date: str = None, end_date: str = None) -> Tuple[date, date]:
+    """Parse a calendar range, defaulting to the current month"""
+    today = date.today()
+    if start_date:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    else:
+        start = today.replace(day=1)  # First day of current month
+
+    if end_date:
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    else:
+        # Last day of current month
+        next_month = start.replace(day=28) + timedelta(days=4)
+        end = next_month - timedelta(days=next_month.day)
+
+    if end < start:
+        raise ValueError("end_date must be on or after start_date")
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        raise ValueError(f"Calendar range cannot exceed {MAX_CALENDAR_DAYS} days")
+
+    return start, end
+
+
+def appointment_counts(doctor_ids: List[int], start: date, end: date) -> Dict[int, Dict[date, Dict[str, int]]]:
+    """Appointment counts per doctor, day and status from a single grouped query"""
+    rows = db.session.query(
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.status,
+        func.count(Appointment.id)
+    ).filter(
+        Appointment.doctor_id.in_(doctor_ids),
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date <= end
+    ).group_by(
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.status
+    ).all()
+
+    counts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for doctor_id, apt_date, status, count in rows:
+        counts[doctor_id][apt_date][status] += count
+    return counts
+
+
+def _calendar_dates(start: date, end: date) -> List[tuple]:
+    """Per-day values shared by every doctor's calendar"""
+    days = []
+    current_date = start
+    while current_date <= end:
+        days.append((
+            current_date,
+            current_date.isoformat(),
+            current_date.weekday(),
+            current_date.strftime('%A'),
+            datetime.combine(current_date, time.min),
+            datetime.combine(current_date, time.max)
+        ))
+        current_date += timedelta(days=1)
+    return days
+
+
+def _build_days(schedule: DoctorSchedule, dates: List[tuple], counts: Dict[date, Dict[str, int]], today: date) -> List[dict]:
+    """
+    Build one doctor's calendar days with a single sweep over the sorted
+    unavailability intervals, keeping only those that are active on the
+    current day.
+    """
+    hours = [
+        {'start': wh.start_time.strftime('%H:%M'), 'end': wh.end_time.strftime('%H:%M')} if wh else None
+        for wh in schedule.weekly_hours
+    ]
+    intervals = schedule.overlapping(dates[0][4], dates[-1][5]) if dates else []
+    next_interval = 0
+    active = []
+
+    calendar_days = []
+    for current_date, date_str, day_of_week, day_name, day_start, day_end in dates:
+        # admit intervals starting today, drop those that ended before today
+        while next_interval < len(intervals) and intervals[next_interval].start <= day_end:
+            active.append(intervals[next_interval])
+            next_interval += 1
+        if active:
+            active = [u for u in active if u.end >= day_start]
+
+        day_unavailability = []
+        is_fully_unavailable = False
+        for unavail in active:
+            if unavail.start <= day_start and unavail.end >= day_end:
+                is_fully_unavailable = True
+                day_unavailability.append({
+                    'id': unavail.id,
+                    'reason': unavail.reason,
+                    'is_full_day': True
+                })
+            else:
+                day_unavailability.append({
+                    'id': unavail.id,
+                    'start_time': unavail.start.strftime('%H:%M') if unavail.start.date() == current_date else '00:00',
+                    'end_time': unavail.end.strftime('%H:%M') if unavail.end.date() == current_date else '23:59',
+                    'reason': unavail.reason,
+                    'is_full_day': False
+                })
+
+        working_hours = hours[day_of_week]
+        is_working_day = working_hours is not None
+
+        if not is_working_day:
+            status = 'off_day'
+        elif is_fully_unavailable:
+            status = 'unavailable'
+        elif current_date < today:
+            status = 'past'
+        else:
+            status = 'available'
+
+        day_counts = counts.get(current_date, {})
+
+        calendar_days.append({
+            'date': date_str,
+            'day_of_week': day_of_week,
+            'day_name': day_name,
+            'status': status,
+            'is_working_day': is_working_day,
+            'working_hours': dict(working_hours) if is_working_day else None,
+            'unavailability': day_unavailability,
+            'appointments': {
+                'total': sum(day_counts.values()),
+                'scheduled': day_counts.get('scheduled', 0),
+                'completed': day_counts.get('completed', 0)
+            },
+            'is_today': current_date == today
+        })
+
+    return calendar_days
+
+
+def _summary(calendar_days: List[dict]) -> dict:
+    working_days = unavailable_days = total_appointments = 0
+    for day in calendar_days:
+        working_days += day['is_working_day']
+        unavailable_days += day['status'] == 'unavailable'
+        total_appointments += day['appointments']['total']
+
+    return {
+        'total_days': len(calendar_days),
+        'working_days': working_days,
+        'unavailable_days': unavailable_days,
+        'total_appointments': total_appointments
+    }
+
+
+def build_calendars(schedules: Dict[int, DoctorSchedule], start: date, end: date) -> Dict[int, dict]:
+    """
+    Build calendar days and summaries for several doctors at once.
+    Costs one appointment query regardless of doctor count or range length.
+    """
+    today = date.today()
+    dates = _calendar_dates(start, end)
+    counts = appointment_counts(list(schedules), start, end) if schedules else {}
+
+    calendars = {}
+    for doctor_id, schedule in schedules.items():
+        days = _build_days(schedule, dates, counts.get(doctor_id, {}), today)
+        calendars[doctor_id] = {
+            'days': days,
+            'summary': _summary(days)
+        }
+    return calendars
@@ -0,0 +1,212 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Set
+
+from ...core.cache import get_json_many, set_json_many
+from ...core.database import db
+from ...core.logger import logger
+from ...core.models import Appointment, Department, Doctor
+from .calendar import resolve_range
+from .schedule import DoctorSchedule, get_doctor_schedules
+
+ROSTER_TTL = int(os.getenv('ROSTER_TTL', 300))  # secs
+ROSTER_KEY = "chikitsa:roster:{}:{}"  # department id, monday of the week
+
+SLOT_DURATION = 30  # minutes
+BOOKED_STATUSES = ("scheduled", "completed")
+
+
+def _week_starts(start: date, end: date) -> List[date]:
+    """Mondays of every week touching the range"""
+    monday = start - timedelta(days=start.weekday())
+    weeks = []
+    while monday <= end:
+        weeks.append(monday)
+        monday += timedelta(days=7)
+    return weeks
+
+
+def booked_slots(doctor_ids: List[int], start: date, end: date) -> Dict[int, Dict[date, Set[time]]]:
+    """Booked appointment times per doctor and day from a single query"""
+    rows = db.session.query(
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time
+    ).filter(
+        Appointment.doctor_id.in_(doctor_ids),
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date <= end,
+        Appointment.status.in_(BOOKED_STATUSES)
+    ).all()
+
+    booked = defaultdict(lambda: defaultdict(set))
+    for doctor_id, apt_date, apt_time in rows:
+        booked[doctor_id][apt_date].add(apt_time)
+    return booked
+
+
+def _slot_times(schedule: DoctorSchedule) -> List[Optional[List[time]]]:
+    """Slot start times per weekday, generated once per doctor"""
+    weekly = []
+    for window in schedule.weekly_hours:
+        if window is None:
+            weekly.append(None)
+            continue
+        times = []
+        current = datetime.combine(date.min, window.start_time)
+        end = datetime.combine(date.min, window.end_time)
+        while current < end:
+            times.append(current.time())
+            current += timedelta(minutes=SLOT_DURATION)
+        weekly.append(times)
+    return weekly
+
+
+def _roster_days(schedule: DoctorSchedule, start: date, end: date, booked: Dict[date, Set[time]]) -> List[dict]:
+    """
+    One doctor's roster days. Slot counts ignore the current time, so a
+    cached week stays valid as the day goes on.
+    """
+    slot_times = _slot_times(schedule)
+    days = []
+    current_date = start
+    while current_date <= end:
+        day_start = datetime.combine(current_date, time.min)
+        day_end = datetime.combine(current_date, time.max)
+        intervals = schedule.overlapping(day_start, day_end)
+
+        unavailability = [{
+            'id': u.id,
+            'start_time': u.start.strftime('%H:%M') if u.start >= day_start else '00:00',
+            'end_time': u.end.strftime('%H:%M') if u.end <= day_end else '23:59',
+            'reason': u.reason,
+            'is_full_day': u.start <= day_start and u.end >= day_end
+        } for u in intervals]
+
+        window = schedule.hours_for(current_date)
+        slots = {'total': 0, 'booked': 0, 'unavailable': 0, 'free': 0}
+        if window:
+            day_booked = booked.get(current_date, ())
+            for slot_time in slot_times[current_date.weekday()]:
+                slots['total'] += 1
+                if slot_time in day_booked:
+                    slots['booked'] += 1
+                    continue
+                slot_datetime = datetime.combine(current_date, slot_time)
+                if any(u.start <= slot_datetime < u.end for u in intervals):
+                    slots['unavailable'] += 1
+                else:
+                    slots['free'] += 1
+
+        days.append({
+            'date': current_date.isoformat(),
+            'day_name': current_date.strftime('%A'),
+            'is_working_day': window is not None,
+            'working_hours': {
+                'start': window.start_time.strftime('%H:%M'),
+                'end': window.end_time.strftime('%H:%M')
+            } if window else None,
+            'unavailability': unavailability,
+            'slots': slots
+        })
+        current_date += timedelta(days=1)
+    return days
+
+
+def _build_weeks(doctor_ids: List[int], weeks: List[date]) -> Dict[date, Dict[str, List[dict]]]:
+    """
+    Build roster weeks for every doctor together.
+    Costs the schedule queries plus one appointment query, however many
+    doctors or weeks are requested.
+    """
+    start, end = weeks[0], weeks[-1] + timedelta(days=6)
+    schedules = get_doctor_schedules(doctor_ids)
+    booked = booked_slots(doctor_ids, start, end) if doctor_ids else {}
+
+    built = {week: {} for week in weeks}
+    for doctor_id in doctor_ids:
+        days = _roster_days(schedules[doctor_id], start, end, booked.get(doctor_id, {}))
+        by_date = {day['date']: day for day in days}
+        for week in weeks:
+            built[week][str(doctor_id)] = [
+                by_date[(week + timedelta(days=i)).isoformat()] for i in range(7)
+            ]
+    return built
+
+
+def _summary(days: List[dict]) -> dict:
+    summary = {'working_days': 0, 'total_slots': 0, 'booked_slots': 0, 'unavailable_slots': 0, 'free_slots': 0}
+    for day in days:
+        summary['working_days'] += day['is_working_day']
+        summary['total_slots'] += day['slots']['total']
+        summary['booked_slots'] += day['slots']['booked']
+        summary['unavailable_slots'] += day['slots']['unavailable']
+        summary['free_slots'] += day['slots']['free']
+    return summary
+
+
+def department_roster(department_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None) -> dict:
+    """
+    Roster of every doctor in a department, defaulting to the current week.
+    Weeks are cached per department in redis; only missing weeks are rebuilt.
+    """
+    department = Department.query.get(department_id)
+    if not department:
+        raise ValueError("Department not found")
+
+    if not start_date:
+        today = date.today()
+        start_date = (today - timedelta(days=today.weekday())).isoformat()
+    if not end_date:
+        end_date = (datetime.strptime(start_date, '%Y-%m-%d').date() + timedelta(days=6)).isoformat()
+    start, end = resolve_range(start_date, end_date)
+
+    doctors = Doctor.query.filter_by(department_id=department_id).order_by(Doctor.id).all()
+    doctor_ids = [d.id for d in doctors]
+
+    weeks = _week_starts(start, end)
+    keys = [ROSTER_KEY.format(department_id, week.isoformat()) for week in weeks]
+    roster_weeks = {}
+    missing = []
+    for week, cached_week in zip(weeks, get_json_many(keys)):
+        # a doctor joining the department makes older cached weeks incomplete
+        if cached_week is not None and all(str(d) in cached_week for d in doctor_ids):
+            roster_weeks[week] = cached_week
+        else:
+            missing.append(week)
+
+    if missing:
+        built = _build_weeks(doctor_ids, missing)
+        roster_weeks.update(built)
+        set_json_many({
+            ROSTER_KEY.format(department_id, week.isoformat()): built[week] for week in missing
+        }, ttl=ROSTER_TTL)
+        logger.debug(f"Built {len(missing)} roster weeks for department {department_id}")
+
+    first, last = start.isoformat(), end.isoformat()
+    roster = []
+    for doctor in doctors:
+        days = [
+            day
+            for week in weeks
+            for day in roster_weeks[week][str(doctor.id)]
+            if first <= day['date'] <= last
+        ]
+        roster.append({
+            'doctor_id': doctor.id,
+            'doctor_name': f"Dr. {doctor.first_name} {doctor.last_name}",
+            'is_available': doctor.is_available,
+            'days': days,
+            'summary': _summary(days)
+        })
+
+    return {
+        'department_id': department_id,
+        'department_name': department.name,
+        'start_date': first,
+        'end_date': last,
+        'slot_duration': SLOT_DURATION,
+        'doctors': roster,
+        'summary': _summary([day for doctor in roster for day in doctor['days']])
+    }
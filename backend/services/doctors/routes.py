@@ -3,7 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from pydantic import ValidationError
 
 from ...core.logger import logger
-from ...core.auth import doctor_required
+from ...core.auth import doctor_required, get_claimed_profile_id
 from ...core.database import db
 from ...core.cache import cached, invalidate
 
@@ -20,6 +20,9 @@ doctor_bp = Blueprint('doctors', __name__, url_prefix='/doctor')
 
 def get_doctor_id_from_user(user_id: int) -> int:
     """Get doctor ID from user ID"""
+    doctor_id = get_claimed_profile_id('doctor_id', user_id)
+    if doctor_id:
+        return doctor_id
     doctor = Doctor.query.filter_by(user_id=user_id).first()
     if not doctor:
         return None
@@ -120,7 +123,7 @@ def get_my_patients():
             return jsonify({'status': 'error', 'message': 'Doctor not found'}), 404
         
         search = request.args.get('search')
-        sort_by = request.args.get('sort_by', 'recent')
+        sort_by = request.args.get('sort_by', 'relevance' if search else 'recent')
         filter_type = request.args.get('filter', 'all')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 12, type=int)
@@ -290,6 +293,7 @@ def create_my_unavailability():
         data = UnavailabilityCreate(**request.get_json())
         unavailability = DoctorService.create_unavailability(doctor_id, data.model_dump())
         invalidate('slots')
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Unavailability created successfully',
@@ -338,6 +342,7 @@ def update_my_unavailability(unavail_id):
         unavailability = DoctorService.update_unavailability(unavail_id, data.model_dump(exclude_unset=True))
         
         invalidate('slots')
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Unavailability updated successfully',
@@ -383,6 +388,7 @@ def delete_my_unavailability(unavail_id):
             }), 403
         
         DoctorService.delete_unavailability(unavail_id)
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Unavailability deleted successfully'
@@ -534,6 +540,7 @@ def update_appointment_status(appointment_id):
             }), 400
 
         appointment = AppointmentService.update_status(appointment_id, new_status)
+        invalidate('roster')
 
         return jsonify({
             'status': 'success',
@@ -744,6 +751,47 @@ def get_my_records():
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 
+@doctor_bp.route('/records/search', methods=['GET'])
+@jwt_required()
+@doctor_required
+def search_records():
+    """Search the records this doctor can access (own or same department)"""
+    try:
+        user_id = get_jwt_identity()
+        doctor_id = get_doctor_id_from_user(user_id)
+
+        if not doctor_id:
+            return jsonify({'status': 'error', 'message': 'Doctor not found'}), 404
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+
+        records, total = MedicalRecordService.search(
+            search=request.args.get('q', ''),
+            accessible_to=doctor_id,
+            patient_id=request.args.get('patient_id', type=int),
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date'),
+            page=page,
+            per_page=per_page
+        )
+
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'records': records,
+                'total': total,
+                'page': page,
+                'per_page': per_page
+            }
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to search records: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
 @doctor_bp.route('/patients/<int:patient_id>/history', methods=['GET'])
 @jwt_required()
 @doctor_required
@@ -818,6 +866,33 @@ def add_prescription_item(record_id):
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 
+@doctor_bp.route('/medicines/suggest', methods=['GET'])
+@jwt_required()
+@doctor_required
+def suggest_medicines():
+    """Autocomplete for prescription medicine names"""
+    try:
+        user_id = get_jwt_identity()
+        doctor_id = get_doctor_id_from_user(user_id)
+
+        if not doctor_id:
+            return jsonify({'status': 'error', 'message': 'Doctor not found'}), 404
+
+        medicines = MedicalRecordService.suggest_medicines(
+            prefix=request.args.get('q', ''),
+            doctor_id=doctor_id,
+            limit=request.args.get('limit', 10, type=int)
+        )
+
+        return jsonify({
+            'status': 'success',
+            'data': {'medicines': medicines}
+        })
+    except Exception as e:
+        logger.error(f"Failed to suggest medicines: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+
 @doctor_bp.route('/prescription/<int:item_id>', methods=['PUT'])
 @jwt_required()
 @doctor_required
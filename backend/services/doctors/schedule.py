@@ -0,0 +1,195 @@
+import os
+import time as _time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from ...core import cache
+from ...core.logger import logger
+from ...core.models import DoctorWorkingHours, DoctorUnavailability
+from ...core.replicas import on_primary
+
+# Without redis, versions are per-process only, so local copies also expire
+SCHEDULE_LOCAL_TTL = int(os.getenv('SCHEDULE_LOCAL_TTL', 60))  # secs
+
+VERSION_KEY = "chikitsa:schedule_version:{}"
+GLOBAL_VERSION_KEY = VERSION_KEY.format('all')
+
+Interval = namedtuple('Interval', ['start', 'end', 'id', 'reason'])
+WorkingWindow = namedtuple('WorkingWindow', ['start_time', 'end_time'])
+
+
+class DoctorSchedule:
+    """
+    Read-only snapshot of a doctor's weekly working hours and unavailability.
+
+    Working hours are held as a 7-slot array indexed by weekday (0=Monday).
+    Unavailability intervals are sorted by start, with a running maximum of
+    end times, so overlap queries bisect to the candidate range instead of
+    scanning every row.
+    """
+
+    def __init__(self, doctor_id: int, working_hours: List[DoctorWorkingHours], unavailability: List[DoctorUnavailability]):
+        self.doctor_id = doctor_id
+
+        self.weekly_hours: List[Optional[WorkingWindow]] = [None] * 7
+        for wh in working_hours:
+            if wh.day_of_week is not None and self.weekly_hours[wh.day_of_week] is None:
+                self.weekly_hours[wh.day_of_week] = WorkingWindow(wh.start_time, wh.end_time)
+
+        self.intervals: List[Interval] = sorted(
+            (Interval(u.start_datetime, u.end_datetime, u.id, u.reason) for u in unavailability),
+            key=lambda i: (i.start, i.end)
+        )
+        self._starts = [i.start for i in self.intervals]
+        self._max_ends = []
+        running = None
+        for interval in self.intervals:
+            running = interval.end if running is None or interval.end > running else running
+            self._max_ends.append(running)
+
+    def hours_for(self, day: date) -> Optional[WorkingWindow]:
+        """Working window for a date, None if it is an off day"""
+        return self.weekly_hours[day.weekday()]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Intervals with interval.start <= end and interval.end >= start"""
+        hi = bisect_right(self._starts, end)
+        # max_ends is non-decreasing, so everything before lo ends before `start`
+        lo = bisect_left(self._max_ends, start, 0, hi)
+        return [i for i in self.intervals[lo:hi] if i.end >= start]
+
+    def covering(self, moment: datetime) -> Optional[Interval]:
+        """First interval with interval.start <= moment < interval.end"""
+        for interval in self.overlapping(moment, moment):
+            if moment < interval.end:
+                return interval
+        return None
+
+
+# doctor_id -> (version, built_at, schedule)
+_schedules: Dict[int, Tuple[tuple, float, DoctorSchedule]] = {}
+_local_versions: Dict[object, int] = {}
+
+
+def _current_versions(doctor_ids: List[int]) -> Dict[int, tuple]:
+    """(source, global, doctor) version per doctor; shared through redis when it is up"""
+    if cache.redis_available():
+        try:
+            keys = [GLOBAL_VERSION_KEY] + [VERSION_KEY.format(d) for d in doctor_ids]
+            values = cache.redis_client.mget(keys)
+            global_version = int(values[0] or 0)
+            return {
+                d: ('redis', global_version, int(v or 0))
+                for d, v in zip(doctor_ids, values[1:])
+            }
+        except Exception as e:
+            logger.error(f"Schedule version read failed: {e}")
+    global_version = _local_versions.get('all', 0)
+    return {d: ('local', global_version, _local_versions.get(d, 0)) for d in doctor_ids}
+
+
+def bump_schedule_version(doctor_id: Optional[int] = None) -> None:
+    """
+    Mark a doctor's schedule (or every doctor's, if doctor_id is None) stale.
+    Call after committing working hours or unavailability changes.
+    """
+    key = 'all' if doctor_id is None else doctor_id
+    _local_versions[key] = _local_versions.get(key, 0) + 1
+
+    if doctor_id is None:
+        _schedules.clear()
+    else:
+        _schedules.pop(doctor_id, None)
+
+    if cache.redis_available():
+        try:
+            cache.redis_client.incr(VERSION_KEY.format(key))
+        except Exception as e:
+            logger.error(f"Schedule version bump failed: {e}")
+
+
+def bump_schedule_versions(doctor_ids: List[int]) -> None:
+    """Mark several doctors' schedules stale with a single redis round trip"""
+    doctor_ids = list(doctor_ids)
+    for doctor_id in doctor_ids:
+        _local_versions[doctor_id] = _local_versions.get(doctor_id, 0) + 1
+        _schedules.pop(doctor_id, None)
+
+    if cache.redis_available() and doctor_ids:
+        try:
+            pipe = cache.redis_client.pipeline()
+            for doctor_id in doctor_ids:
+                pipe.incr(VERSION_KEY.format(doctor_id))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Schedule version bump failed: {e}")
+
+
+def slot_cache_key(doctor_id: int, day: date) -> str:
+    """Key of one doctor's day in the slots cache of GET /appointments/slots"""
+    return f"{doctor_id}:{day.isoformat()}"
+
+
+def invalidate_slots(doctor_ids: List[int], days: List[date]) -> None:
+    """Drop the cached slots of these doctors on these days only"""
+    cache.invalidate_keys('slots', [slot_cache_key(doctor_id, day) for doctor_id in doctor_ids for day in days])
+
+def _cached_schedule(doctor_id: int, version: tuple) -> Optional[DoctorSchedule]:
+    entry = _schedules.get(doctor_id)
+    if not entry:
+        return None
+
+    cached_version, built_at, schedule = entry
+    fresh = version[0] == 'redis' or _time.monotonic() - built_at < SCHEDULE_LOCAL_TTL
+    if cached_version == version and fresh:
+        return schedule
+    return None
+
+
+def get_doctor_schedules(doctor_ids: List[int]) -> Dict[int, DoctorSchedule]:
+    """
+    Get schedule snapshots for several doctors.
+    Stale or missing ones are rebuilt together with one query per table.
+    """
+    doctor_ids = list(dict.fromkeys(doctor_ids))
+    versions = _current_versions(doctor_ids)
+
+    schedules = {}
+    stale = []
+    for doctor_id in doctor_ids:
+        schedule = _cached_schedule(doctor_id, versions[doctor_id])
+        if schedule:
+            schedules[doctor_id] = schedule
+        else:
+            stale.append(doctor_id)
+
+    if not stale:
+        return schedules
+
+    # cached under the new version, so it must not come from a lagging replica
+    with on_primary():
+        working_hours = {d: [] for d in stale}
+        for wh in DoctorWorkingHours.query.filter(
+            DoctorWorkingHours.doctor_id.in_(stale)
+        ).order_by(DoctorWorkingHours.id).all():
+            working_hours[wh.doctor_id].append(wh)
+
+        unavailability = {d: [] for d in stale}
+        for u in DoctorUnavailability.query.filter(DoctorUnavailability.doctor_id.in_(stale)).all():
+            unavailability[u.doctor_id].append(u)
+
+    built_at = _time.monotonic()
+    for doctor_id in stale:
+        schedule = DoctorSchedule(doctor_id, working_hours[doctor_id], unavailability[doctor_id])
+        _schedules[doctor_id] = (versions[doctor_id], built_at, schedule)
+        schedules[doctor_id] = schedule
+
+    logger.debug(f"Rebuilt schedules for {len(stale)} doctors")
+    return schedules
+
+
+def get_doctor_schedule(doctor_id: int) -> DoctorSchedule:
+    """Get the doctor's schedule snapshot, rebuilding it if its version moved"""
+    return get_doctor_schedules([doctor_id])[doctor_id]
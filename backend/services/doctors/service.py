@@ -1,11 +1,17 @@
 from datetime import datetime, time, timedelta, date
 from typing import Optional, List, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import func, select, union, union_all
 
 from ...core.database import db
 from ...core.logger import logger
+from ...core.replicas import read_only
 from ...core.models import Appointment, Doctor, DoctorWorkingHours, DoctorUnavailability, User, Department, MedicalRecord, PrescriptionItem
+from .schedule import get_doctor_schedule, get_doctor_schedules, bump_schedule_version
+from .calendar import resolve_range, build_calendars
+from .roster import department_roster
+from ..appointments.archive import appointment_models
+from ..patients.search import patient_hits, patient_like_filter
 
 DAY_NAMES = {
     0: "Monday",
@@ -98,6 +104,7 @@ class DoctorService:
 
     
     @staticmethod 
+    @read_only
     def get_doctor_stats(doctor_id: int) -> dict:
         """Get comprehensive dashboard statistics for a doctor"""
         doctor = Doctor.query.get(doctor_id)
@@ -166,13 +173,15 @@ class DoctorService:
             Appointment.status == 'scheduled'
         ).count()
         
-        # Total unique patients
-        total_patients = db.session.query(
-            func.count(func.distinct(Appointment.patient_id))
-        ).filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.status.in_(['completed', 'scheduled'])
-        ).scalar() or 0
+        # Total unique patients, archived appointments included
+        patients = union(*[
+            select(model.patient_id).where(
+                model.doctor_id == doctor_id,
+                model.status.in_(['completed', 'scheduled'])
+            ).distinct()
+            for model in appointment_models()
+        ]).subquery()
+        total_patients = db.session.query(func.count()).select_from(patients).scalar() or 0
         
         # New patients this month (first appointment with this doctor)
         new_patients_this_month = db.session.query(
@@ -183,23 +192,27 @@ class DoctorService:
             Appointment.status == 'completed'
         ).filter(
             ~Appointment.patient_id.in_(
-                db.session.query(Appointment.patient_id).filter(
-                    Appointment.doctor_id == doctor_id,
-                    Appointment.appointment_date < first_day_of_month,
-                    Appointment.status == 'completed'
-                )
+                union(*[
+                    select(model.patient_id).where(
+                        model.doctor_id == doctor_id,
+                        model.appointment_date < first_day_of_month,
+                        model.status == 'completed'
+                    )
+                    for model in appointment_models()
+                ])
             )
         ).scalar() or 0
         
         # Total appointments (all time)
-        total_appointments = Appointment.query.filter(
-            Appointment.doctor_id == doctor_id
-        ).count()
+        total_appointments = sum(
+            model.query.filter(model.doctor_id == doctor_id).count()
+            for model in appointment_models()
+        )
         
-        total_completed = Appointment.query.filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.status == 'completed'
-        ).count()
+        total_completed = sum(
+            model.query.filter(model.doctor_id == doctor_id, model.status == 'completed').count()
+            for model in appointment_models()
+        )
         
         # Calculate completion rate
         completion_rate = round((total_completed / total_appointments * 100), 1) if total_appointments > 0 else 0
@@ -246,15 +259,19 @@ class DoctorService:
         """Get patients that this doctor has consulted"""
         from ...core.models import Appointment, Patient, User
         
-        # Get unique patient IDs from appointments
+        # Get unique patient IDs from appointments, archived ones included
+        visits = union_all(*[
+            select(model.patient_id, model.appointment_date, model.id).where(
+                model.doctor_id == doctor_id,
+                model.status.in_(['completed', 'scheduled'])
+            )
+            for model in appointment_models()
+        ]).subquery()
         patient_subquery = db.session.query(
-            Appointment.patient_id,
-            func.max(Appointment.appointment_date).label('last_visit'),
-            func.count(Appointment.id).label('total_visits')
-        ).filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.status.in_(['completed', 'scheduled'])
-        ).group_by(Appointment.patient_id).subquery()
+            visits.c.patient_id,
+            func.max(visits.c.appointment_date).label('last_visit'),
+            func.count(visits.c.id).label('total_visits')
+        ).group_by(visits.c.patient_id).subquery()
         
         # Build query
         query = db.session.query(
@@ -268,17 +285,12 @@ class DoctorService:
             patient_subquery, Patient.id == patient_subquery.c.patient_id
         )
         
-        # Search filter
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    Patient.first_name.ilike(search_term),
-                    Patient.last_name.ilike(search_term),
-                    User.email.ilike(search_term),
-                    Patient.phone.ilike(search_term)
-                )
-            )
+        # Search filter, through the search index when it can serve the term
+        hits = patient_hits(search) if search else None
+        if hits is not None:
+            query = query.join(hits, Patient.id == hits.c.patient_id)
+        elif search:
+            query = query.filter(patient_like_filter(search))
         
         # Date filter
         if filter_type == 'recent':
@@ -297,7 +309,9 @@ class DoctorService:
             )
         
         # Sorting
-        if sort_by == 'name':
+        if sort_by == 'relevance' and hits is not None:
+            query = query.order_by(hits.c.rank, patient_subquery.c.last_visit.desc())
+        elif sort_by == 'name':
             query = query.order_by(Patient.first_name, Patient.last_name)
         elif sort_by == 'visits':
             query = query.order_by(patient_subquery.c.total_visits.desc())
@@ -329,17 +343,20 @@ class DoctorService:
         return patients, total
 
     @staticmethod
+    @read_only
     def get_patients_stats(doctor_id: int) -> dict:
         """Get statistics about doctor's patients"""
         from ...core.models import Appointment
         
-        # Total unique patients
-        total_patients = db.session.query(
-            func.count(func.distinct(Appointment.patient_id))
-        ).filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.status.in_(['completed', 'scheduled'])
-        ).scalar() or 0
+        # Total unique patients, archived appointments included
+        patients = union(*[
+            select(model.patient_id).where(
+                model.doctor_id == doctor_id,
+                model.status.in_(['completed', 'scheduled'])
+            ).distinct()
+            for model in appointment_models()
+        ]).subquery()
+        total_patients = db.session.query(func.count()).select_from(patients).scalar() or 0
         
         # This month
         first_day_of_month = date.today().replace(day=1)
@@ -372,19 +389,22 @@ class DoctorService:
         from ...core.models import Appointment
         
         # Verify doctor has seen this patient
-        has_relation = Appointment.query.filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.patient_id == patient_id
-        ).first()
+        has_relation = any(
+            model.query.filter(model.doctor_id == doctor_id, model.patient_id == patient_id).first()
+            for model in appointment_models()
+        )
         
         if not has_relation:
             raise ValueError("Patient not found in your records")
         
-        completed = Appointment.query.filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.patient_id == patient_id,
-            Appointment.status == 'completed'
-        ).count()
+        completed = sum(
+            model.query.filter(
+                model.doctor_id == doctor_id,
+                model.patient_id == patient_id,
+                model.status == 'completed'
+            ).count()
+            for model in appointment_models()
+        )
         
         upcoming = Appointment.query.filter(
             Appointment.doctor_id == doctor_id,
@@ -393,11 +413,14 @@ class DoctorService:
             Appointment.appointment_date >= date.today()
         ).count()
         
-        cancelled = Appointment.query.filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.patient_id == patient_id,
-            Appointment.status.in_(['cancelled', 'no_show'])
-        ).count()
+        cancelled = sum(
+            model.query.filter(
+                model.doctor_id == doctor_id,
+                model.patient_id == patient_id,
+                model.status.in_(['cancelled', 'no_show'])
+            ).count()
+            for model in appointment_models()
+        )
         
         return {
             'completed': completed,
@@ -463,6 +486,7 @@ class DoctorService:
             created.append(hours)
 
         db.session.commit()
+        bump_schedule_version(doctor_id)
         logger.info(f"Created {len(created)} working hour entries for doctor {doctor_id}")
 
         return [DoctorService._working_hours_to_dict(h) for h in created]
@@ -486,6 +510,7 @@ class DoctorService:
             hours.end_time = DoctorService._parse_time(data['end_time'])
 
         db.session.commit()
+        bump_schedule_version(doctor_id)
         return DoctorService._working_hours_to_dict(hours)
 
     @staticmethod
@@ -513,6 +538,7 @@ class DoctorService:
             created.append(hours)
 
         db.session.commit()
+        bump_schedule_version(doctor_id)
         logger.info(f"Bulk updated {len(created)} working hour entries for doctor {doctor_id}")
 
         return [DoctorService._working_hours_to_dict(h) for h in created]
@@ -526,6 +552,7 @@ class DoctorService:
 
         deleted = DoctorWorkingHours.query.filter_by(doctor_id=doctor_id).delete()
         db.session.commit()
+        bump_schedule_version(doctor_id)
 
         logger.info(f"Deleted {deleted} working hour entries for doctor {doctor_id}")
         return True
@@ -569,6 +596,7 @@ class DoctorService:
 
         db.session.add(unavailability)
         db.session.commit()
+        bump_schedule_version(doctor_id)
 
         logger.info(f"Created unavailability {unavailability.id} for doctor {doctor_id}")
         return DoctorService._unavailability_to_dict(unavailability)
@@ -590,6 +618,7 @@ class DoctorService:
             unavailability.reason = data['reason']
 
         db.session.commit()
+        bump_schedule_version(unavailability.doctor_id)
         return DoctorService._unavailability_to_dict(unavailability)
 
     @staticmethod
@@ -601,13 +630,16 @@ class DoctorService:
 
         logger.info(f"Deleting unavailability {unavail_id}")
 
+        doctor_id = unavailability.doctor_id
         db.session.delete(unavailability)
         db.session.commit()
+        bump_schedule_version(doctor_id)
         return True
 
 
     ########## CALENDER INTEGRATION ##########
     @staticmethod 
+    @read_only
     def get_calendar(doctor_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None) -> dict:
         """
         Get doctor's calendar view with working hours, unavailability, and appointments.
@@ -617,141 +649,60 @@ class DoctorService:
         if not doctor:
             raise ValueError("Doctor not found")
 
-        # Default to current month if no dates provided
-        today = date.today()
-        if start_date:
-            start = datetime.strptime(start_date, '%Y-%m-%d').date()
-        else:
-            start = today.replace(day=1)  # First day of current month
-
-        if end_date:
-            end = datetime.strptime(end_date, '%Y-%m-%d').date()
-        else:
-            # Last day of current month
-            next_month = start.replace(day=28) + timedelta(days=4)
-            end = next_month - timedelta(days=next_month.day)
-
-        # Get working hours (indexed by day_of_week)
-        working_hours = DoctorWorkingHours.query.filter_by(doctor_id=doctor_id).all()
-        working_hours_map = {wh.day_of_week: wh for wh in working_hours}
-
-        # Get unavailability periods in date range
-        unavailability = DoctorUnavailability.query.filter(
-            DoctorUnavailability.doctor_id == doctor_id,
-            DoctorUnavailability.start_datetime <= datetime.combine(end, time.max),
-            DoctorUnavailability.end_datetime >= datetime.combine(start, time.min)
-        ).all()
-
-        # Get appointments in date range
-        appointments = Appointment.query.filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.appointment_date >= start,
-            Appointment.appointment_date <= end
-        ).all()
-
-        # Group appointments by date
-        appointments_by_date = {}
-        for apt in appointments:
-            date_key = apt.appointment_date.isoformat()
-            if date_key not in appointments_by_date:
-                appointments_by_date[date_key] = []
-            appointments_by_date[date_key].append({
-                'id': apt.id,
-                'time': apt.appointment_time.strftime('%H:%M'),
-                'patient_id': apt.patient_id,
-                'patient_name': f"{apt.patient.first_name} {apt.patient.last_name}" if apt.patient else None,
-                'status': apt.status
-            })
-
-        # Build calendar days
-        calendar_days = []
-        current_date = start
-
-        while current_date <= end:
-            day_of_week = current_date.weekday()
-            date_str = current_date.isoformat()
+        start, end = resolve_range(start_date, end_date)
+        calendar = build_calendars({doctor_id: get_doctor_schedule(doctor_id)}, start, end)[doctor_id]
 
-            # Check working hours for this day
-            wh = working_hours_map.get(day_of_week)
-            is_working_day = wh is not None
-
-            # Check if fully unavailable
-            day_start = datetime.combine(current_date, time.min)
-            day_end = datetime.combine(current_date, time.max)
+        return {
+            'doctor_id': doctor_id,
+            'doctor_name': f"Dr. {doctor.first_name} {doctor.last_name}",
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'days': calendar['days'],
+            'summary': calendar['summary']
+        }
 
-            day_unavailability = []
-            is_fully_unavailable = False
+    @staticmethod
+    @read_only
+    def get_department_calendar(department_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None) -> dict:
+        """
+        Get calendars for every doctor in a department in one call.
+        Uses a fixed number of queries regardless of doctor count.
+        """
+        department = Department.query.get(department_id)
+        if not department:
+            raise ValueError("Department not found")
 
-            for unavail in unavailability:
-                if unavail.start_datetime <= day_start and unavail.end_datetime >= day_end:
-                    is_fully_unavailable = True
-                    day_unavailability.append({
-                        'id': unavail.id,
-                        'reason': unavail.reason,
-                        'is_full_day': True
-                    })
-                elif unavail.start_datetime.date() <= current_date <= unavail.end_datetime.date():
-                    day_unavailability.append({
-                        'id': unavail.id,
-                        'start_time': unavail.start_datetime.strftime('%H:%M') if unavail.start_datetime.date() == current_date else '00:00',
-                        'end_time': unavail.end_datetime.strftime('%H:%M') if unavail.end_datetime.date() == current_date else '23:59',
-                        'reason': unavail.reason,
-                        'is_full_day': False
-                    })
-
-            # Get day's appointments
-            day_appointments = appointments_by_date.get(date_str, [])
-
-            # Calculate availability status
-            if not is_working_day:
-                status = 'off_day'
-            elif is_fully_unavailable:
-                status = 'unavailable'
-            elif current_date < today:
-                status = 'past'
-            else:
-                status = 'available'
-
-            # Count appointments by status
-            scheduled_count = len([a for a in day_appointments if a['status'] == 'scheduled'])
-            completed_count = len([a for a in day_appointments if a['status'] == 'completed'])
-
-            calendar_days.append({
-                'date': date_str,
-                'day_of_week': day_of_week,
-                'day_name': current_date.strftime('%A'),
-                'status': status,
-                'is_working_day': is_working_day,
-                'working_hours': {
-                    'start': wh.start_time.strftime('%H:%M') if wh else None,
-                    'end': wh.end_time.strftime('%H:%M') if wh else None
-                } if is_working_day else None,
-                'unavailability': day_unavailability,
-                'appointments': {
-                    'total': len(day_appointments),
-                    'scheduled': scheduled_count,
-                    'completed': completed_count
-                },
-                'is_today': current_date == today
-            })
+        start, end = resolve_range(start_date, end_date)
+        doctors = Doctor.query.filter_by(department_id=department_id).order_by(Doctor.id).all()
 
-            current_date += timedelta(days=1)
+        schedules = get_doctor_schedules([d.id for d in doctors])
+        calendars = build_calendars(schedules, start, end)
 
         return {
-            'doctor_id': doctor_id,
-            'doctor_name': f"Dr. {doctor.first_name} {doctor.last_name}",
+            'department_id': department_id,
+            'department_name': department.name,
             'start_date': start.isoformat(),
             'end_date': end.isoformat(),
-            'days': calendar_days,
-            'summary': {
-                'total_days': len(calendar_days),
-                'working_days': len([d for d in calendar_days if d['is_working_day']]),
-                'unavailable_days': len([d for d in calendar_days if d['status'] == 'unavailable']),
-                'total_appointments': sum(d['appointments']['total'] for d in calendar_days)
-            }
+            'doctors': [{
+                'doctor_id': doctor.id,
+                'doctor_name': f"Dr. {doctor.first_name} {doctor.last_name}",
+                'is_available': doctor.is_available,
+                'days': calendars[doctor.id]['days'],
+                'summary': calendars[doctor.id]['summary']
+            } for doctor in doctors]
         }
 
     @staticmethod
+    @read_only
+    def get_department_roster(department_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None) -> dict:
+        """
+        Get working windows, unavailability and booked/free slot counts for
+        every doctor in a department. Defaults to the current week.
+        """
+        return department_roster(department_id, start_date, end_date)
+
+    @staticmethod
+    @read_only
     def get_daily_schedule(doctor_id: int, schedule_date: str) -> dict:
         """
         Get detailed schedule for a specific day with time slots.
@@ -771,10 +722,8 @@ class DoctorService:
         now = datetime.now()
 
         # Get working hours for this day
-        working_hours = DoctorWorkingHours.query.filter_by(
-            doctor_id=doctor_id,
-            day_of_week=day_of_week
-        ).first()
+        schedule = get_doctor_schedule(doctor_id)
+        working_hours = schedule.hours_for(target_date)
 
         if not working_hours:
             return {
@@ -791,16 +740,12 @@ class DoctorService:
         day_start = datetime.combine(target_date, time.min)
         day_end = datetime.combine(target_date, time.max)
 
-        unavailability = DoctorUnavailability.query.filter(
-            DoctorUnavailability.doctor_id == doctor_id,
-            DoctorUnavailability.start_datetime <= day_end,
-            DoctorUnavailability.end_datetime >= day_start
-        ).all()
+        unavailability = schedule.overlapping(day_start, day_end)
 
         # Check for full day unavailability
         full_day_unavail = None
         for unavail in unavailability:
-            if unavail.start_datetime <= day_start and unavail.end_datetime >= day_end:
+            if unavail.start <= day_start and unavail.end >= day_end:
                 full_day_unavail = unavail
                 break
 
@@ -858,7 +803,7 @@ class DoctorService:
 
             # Check if unavailable (partial day)
             for unavail in unavailability:
-                if unavail.start_datetime <= current_time < unavail.end_datetime:
+                if unavail.start <= current_time < unavail.end:
                     slot_status = 'unavailable'
                     slot_data['unavailability'] = {
                         'id': unavail.id,
@@ -0,0 +1,268 @@
+import bisect
+import heapq
+import math
+import os
+import threading
+import time as _time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from ...core.database import db
+from ...core.logger import logger
+from ...core.models import MedicalRecord, PrescriptionItem, ArchivedMedicalRecord, ArchivedPrescriptionItem
+
+# prescriptions written by other processes are picked up at most this often
+CATALOG_SYNC_SECONDS = float(os.getenv('MEDICINE_CATALOG_SYNC_SECONDS', 30))
+# full reload, drops edited and deleted items and anything the sync missed
+CATALOG_REBUILD_SECONDS = float(os.getenv('MEDICINE_CATALOG_REBUILD_SECONDS', 3600))
+# a doctor's own use of a medicine counts half as much after this many days
+RECENCY_HALF_LIFE_DAYS = float(os.getenv('MEDICINE_RECENCY_HALF_LIFE_DAYS', 30))
+# boost for a medicine the doctor prescribed just now, on the log scale of the usage counts
+RECENCY_WEIGHT = 3.0
+
+# prefixes matching more names than this keep their most used names cached
+TOP_CACHE_THRESHOLD = 128
+MAX_SUGGESTIONS = 50
+
+
+def normalize(name: str) -> str:
+    """Catalog key of a medicine name, whitespace collapsed and case folded"""
+    return ' '.join((name or '').split()).casefold()
+
+
+def _epoch(value: datetime) -> float:
+    # created_at columns hold naive utc
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class MedicineCatalog:
+    """
+    Prescribed medicine names kept in a sorted array for prefix lookups by
+    bisect, with usage counts and each doctor's last use for ranking.
+    Counts only grow, edits and deletes wait for the next rebuild.
+    """
+
+    def __init__(self, watermark: int = 0):
+        self.watermark = watermark  # highest live prescription item id counted
+        self._keys: List[str] = []
+        self._uses: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}  # most used spelling, shown to the doctor
+        self._spellings: Dict[str, Dict[str, int]] = {}  # only names written more than one way
+        self._doctor_keys: Dict[int, List[str]] = {}  # sorted, like _keys
+        self._last_used: Dict[int, Dict[str, float]] = {}  # doctor -> key -> epoch seconds
+        self._top: Dict[str, List[str]] = {}  # prefix -> its most used keys
+        self._counted = set()  # item ids above the watermark already added
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Bulk add (name, doctor_id, uses, last_used) rows, before the catalog is served"""
+        with self._lock:
+            for name, doctor_id, uses, last_used in rows:
+                self._add(name, doctor_id, uses, last_used, insort=False)
+            self._keys = sorted(self._uses)
+            for keys in self._doctor_keys.values():
+                keys.sort()
+            self._top.clear()
+
+    def add(self, name: str, doctor_id: Optional[int] = None, used_at: Optional[datetime] = None,
+            uses: int = 1, item_id: Optional[int] = None) -> None:
+        """Count one prescription, items already counted by id are skipped"""
+        with self._lock:
+            if item_id is not None:
+                if item_id <= self.watermark or item_id in self._counted:
+                    return
+                self._counted.add(item_id)
+            key = self._add(name, doctor_id, uses, used_at, insort=True)
+            if key:
+                self._bump_top(key)
+
+    def advance(self, watermark: int) -> None:
+        """Every live item up to `watermark` has been counted"""
+        with self._lock:
+            self.watermark = max(self.watermark, watermark)
+            self._counted = {item_id for item_id in self._counted if item_id > self.watermark}
+
+    def _add(self, name, doctor_id, uses, used_at, insort: bool) -> Optional[str]:
+        spelling = ' '.join((name or '').split())
+        key = spelling.casefold()
+        if not key:
+            return None
+
+        if key not in self._uses:
+            self._uses[key] = 0
+            self._names[key] = spelling
+            if insort:
+                bisect.insort(self._keys, key)
+        elif spelling != self._names[key] or key in self._spellings:
+            counts = self._spellings.setdefault(key, {self._names[key]: self._uses[key]})
+            counts[spelling] = counts.get(spelling, 0) + uses
+            if counts[spelling] > counts[self._names[key]]:
+                self._names[key] = spelling
+        self._uses[key] += uses
+
+        if doctor_id is not None and used_at is not None:
+            recent = self._last_used.setdefault(doctor_id, {})
+            last_used = recent.get(key)
+            if last_used is None:
+                keys = self._doctor_keys.setdefault(doctor_id, [])
+                if insort:
+                    bisect.insort(keys, key)
+                else:
+                    keys.append(key)
+            used_at = _epoch(used_at)
+            if last_used is None or used_at > last_used:
+                recent[key] = used_at
+        return key
+
+    def _bump_top(self, key: str) -> None:
+        # counts only grow, so a key can only enter the cached lists of its own prefixes
+        uses = self._uses
+        for length in range(1, len(key) + 1):
+            top = self._top.get(key[:length])
+            if top is None:
+                continue
+            if key not in top:
+                if len(top) >= MAX_SUGGESTIONS and uses[top[-1]] >= uses[key]:
+                    continue
+                top.append(key)
+            top.sort(key=uses.__getitem__, reverse=True)
+            del top[MAX_SUGGESTIONS:]
+
+    @staticmethod
+    def _range(keys: List[str], prefix: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(keys, prefix)
+        return lo, bisect.bisect_left(keys, prefix + '\uffff', lo)
+
+    def _most_used(self, prefix: str, limit: int) -> List[str]:
+        lo, hi = self._range(self._keys, prefix)
+        if hi - lo <= TOP_CACHE_THRESHOLD:
+            return heapq.nlargest(limit, self._keys[lo:hi], key=self._uses.__getitem__)
+        top = self._top.get(prefix)
+        if top is None:
+            top = self._top[prefix] = heapq.nlargest(MAX_SUGGESTIONS, self._keys[lo:hi],
+                                                     key=self._uses.__getitem__)
+        return top[:limit]
+
+    def warm(self, max_length: int = 2) -> None:
+        """Fill the cached lists of the short prefixes, the widest ranges to scan"""
+        with self._lock:
+            prefixes = {key[:length] for key in self._keys for length in range(1, max_length + 1)}
+            for prefix in prefixes:
+                self._most_used(prefix, MAX_SUGGESTIONS)
+
+    def suggest(self, prefix: str, doctor_id: Optional[int] = None, limit: int = 10,
+                now: Optional[datetime] = None) -> List[dict]:
+        """
+        Names starting with `prefix`, ranked by how often they are prescribed
+        plus a boost for the ones this doctor prescribed recently
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        now = _epoch(now or datetime.utcnow())
+        half_life = RECENCY_HALF_LIFE_DAYS * 86400
+
+        with self._lock:
+            # anything outside the most used `limit` can only rank through recency
+            candidates = dict.fromkeys(self._most_used(prefix, limit))
+            if doctor_id is not None:
+                keys = self._doctor_keys.get(doctor_id, [])
+                recent = self._last_used.get(doctor_id, {})
+                lo, hi = self._range(keys, prefix)
+                for key in keys[lo:hi]:
+                    candidates[key] = recent[key]
+
+            ranked = []
+            for key, last_used in candidates.items():
+                score = math.log1p(self._uses[key])
+                if last_used is not None:
+                    score += RECENCY_WEIGHT * 0.5 ** (max(now - last_used, 0) / half_life)
+                ranked.append((-score, key, self._names[key], self._uses[key], last_used))
+
+        ranked.sort(key=lambda entry: entry[:2])
+        return [
+            {
+                'name': name,
+                'uses': uses,
+                'last_used': datetime.fromtimestamp(last_used, timezone.utc).replace(tzinfo=None).isoformat()
+                if last_used is not None else None
+            }
+            for _, _, name, uses, last_used in ranked[:limit]
+        ]
+
+
+_catalog: Optional[MedicineCatalog] = None
+_built_at = 0.0
+_synced_at = 0.0
+_sync_lock = threading.Lock()
+
+
+def build_catalog() -> MedicineCatalog:
+    """Catalog of every live and archived prescription item"""
+    started = _time.perf_counter()
+    watermark = db.session.query(func.max(PrescriptionItem.id)).scalar() or 0
+    catalog = MedicineCatalog(watermark)
+    for item, record in ((PrescriptionItem, MedicalRecord), (ArchivedPrescriptionItem, ArchivedMedicalRecord)):
+        query = db.session.query(
+            item.medicine_name, record.doctor_id, func.count(item.id), func.max(record.created_at)
+        ).join(record, item.medical_record_id == record.id)
+        if item is PrescriptionItem:
+            query = query.filter(item.id <= watermark)
+        catalog.load(query.group_by(item.medicine_name, record.doctor_id))
+    catalog.warm()
+
+    logger.info(f"Medicine catalog built with {len(catalog)} names in "
+                f"{(_time.perf_counter() - started) * 1000:.0f}ms")
+    return catalog
+
+
+def _catch_up(catalog: MedicineCatalog) -> None:
+    # ids only grow; one committed out of order behind the watermark waits for the rebuild
+    rows = db.session.query(
+        PrescriptionItem.id, PrescriptionItem.medicine_name, MedicalRecord.doctor_id, MedicalRecord.created_at
+    ).join(MedicalRecord, PrescriptionItem.medical_record_id == MedicalRecord.id).filter(
+        PrescriptionItem.id > catalog.watermark
+    ).order_by(PrescriptionItem.id).all()
+
+    for item_id, name, doctor_id, created_at in rows:
+        catalog.add(name, doctor_id, created_at, item_id=item_id)
+    if rows:
+        catalog.advance(rows[-1][0])
+
+
+def current_catalog() -> MedicineCatalog:
+    """The process catalog, built on first use and kept in step with the database"""
+    global _catalog, _built_at, _synced_at
+
+    catalog = _catalog
+    if catalog is not None and _time.monotonic() - _synced_at < CATALOG_SYNC_SECONDS:
+        return catalog
+
+    # while one thread syncs the others keep serving the current catalog
+    if not _sync_lock.acquire(blocking=catalog is None):
+        return catalog
+    try:
+        now = _time.monotonic()
+        if _catalog is not None and now - _synced_at < CATALOG_SYNC_SECONDS:
+            return _catalog
+        if _catalog is None or now - _built_at >= CATALOG_REBUILD_SECONDS:
+            _catalog = build_catalog()
+            _built_at = now
+        else:
+            _catch_up(_catalog)
+        _synced_at = now
+        return _catalog
+    finally:
+        _sync_lock.release()
+
+
+def record_prescription(item_id: int, medicine_name: str, doctor_id: int) -> None:
+    """Count a committed prescription item now instead of on the next sync"""
+    if _catalog is not None:
+        _catalog.add(medicine_name, doctor_id, datetime.utcnow(), item_id=item_id)
@@ -0,0 +1,192 @@
+from typing import List
+
+from sqlalchemy import exists, text
+
+from ...core.database import db
+from ...core.search import create_index, dialect, fts_phrase, index_ready, search_words
+
+# record search over diagnosis, symptoms, treatment notes and medicine names.
+# sqlite keeps a word FTS5 table (porter stemmed, prefix matched) with one row
+# per record id; triggers on the live and archive tables rebuild a record's
+# row whenever it or its prescription items change, so archiving keeps it
+# searchable. Postgres gets tsvector GIN indexes. init-db creates both, other
+# databases fall back to an ILIKE scan
+INDEX = 'record_search'
+
+READY_CHECKS = {
+    'sqlite': "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'record_search'",
+    'postgresql': "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_medical_records_search'",
+}
+
+# the item triggers look records up by it, older databases were created without it
+ITEM_RECORD_INDEX = ("CREATE INDEX IF NOT EXISTS ix_prescription_items_medical_record_id "
+                     "ON prescription_items (medical_record_id)")
+
+
+def _refresh(record_id: str) -> str:
+    """Trigger statements rebuilding one record's row from whichever table holds it"""
+    return f"""
+        DELETE FROM record_search WHERE rowid = {record_id};
+        INSERT INTO record_search (rowid, diagnosis, symptoms, treatment_notes, medicines)
+        SELECT id, diagnosis, symptoms, treatment_notes, (
+            SELECT group_concat(medicine_name, ' ') FROM (
+                SELECT medicine_name FROM prescription_items WHERE medical_record_id = {record_id}
+                UNION
+                SELECT medicine_name FROM prescription_items_archive WHERE medical_record_id = {record_id}
+            )
+        ) FROM (
+            SELECT id, diagnosis, symptoms, treatment_notes FROM medical_records WHERE id = {record_id}
+            UNION ALL
+            SELECT id, diagnosis, symptoms, treatment_notes FROM medical_records_archive WHERE id = {record_id}
+        ) LIMIT 1;"""
+
+
+# trigger name -> (event, record id expression)
+SQLITE_TRIGGERS = {
+    'record_search_insert': ('AFTER INSERT ON medical_records', 'new.id'),
+    'record_search_update': ('AFTER UPDATE OF diagnosis, symptoms, treatment_notes ON medical_records', 'new.id'),
+    'record_search_delete': ('AFTER DELETE ON medical_records', 'old.id'),
+    'record_search_archive_insert': ('AFTER INSERT ON medical_records_archive', 'new.id'),
+    'record_search_archive_delete': ('AFTER DELETE ON medical_records_archive', 'old.id'),
+    'record_search_item_insert': ('AFTER INSERT ON prescription_items', 'new.medical_record_id'),
+    'record_search_item_update': ('AFTER UPDATE OF medicine_name ON prescription_items', 'new.medical_record_id'),
+    'record_search_item_delete': ('AFTER DELETE ON prescription_items', 'old.medical_record_id'),
+    'record_search_item_archive_insert': ('AFTER INSERT ON prescription_items_archive', 'new.medical_record_id'),
+    'record_search_item_archive_delete': ('AFTER DELETE ON prescription_items_archive', 'old.medical_record_id'),
+}
+
+SQLITE_SCHEMA = [
+    ITEM_RECORD_INDEX,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS record_search USING fts5("
+    "diagnosis, symptoms, treatment_notes, medicines, tokenize = 'porter unicode61', prefix = '2 3')",
+] + [
+    f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {_refresh(record_id)} END"
+    for name, (event, record_id) in SQLITE_TRIGGERS.items()
+]
+
+# when the triggers were missing the tables may have been recreated under them
+SQLITE_REBUILD = [
+    "DELETE FROM record_search",
+] + [
+    f"""INSERT INTO record_search (rowid, diagnosis, symptoms, treatment_notes, medicines)
+    SELECT id, diagnosis, symptoms, treatment_notes, (
+        SELECT group_concat(medicine_name, ' ') FROM {items} WHERE medical_record_id = {records}.id
+    ) FROM {records}"""
+    for records, items in (('medical_records', 'prescription_items'),
+                           ('medical_records_archive', 'prescription_items_archive'))
+]
+
+# weighted so a diagnosis match ranks above one in the symptoms or notes
+RECORD_DOCUMENT = ("setweight(to_tsvector('english', coalesce(diagnosis, '')), 'A') || "
+                   "setweight(to_tsvector('english', coalesce(symptoms, '')), 'B') || "
+                   "setweight(to_tsvector('english', coalesce(treatment_notes, '')), 'C')")
+MEDICINE_DOCUMENT = "to_tsvector('simple', medicine_name)"
+
+POSTGRES_SCHEMA = [
+    ITEM_RECORD_INDEX,
+    f"CREATE INDEX IF NOT EXISTS ix_medical_records_search ON medical_records USING gin (({RECORD_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_medical_records_archive_search ON medical_records_archive "
+    f"USING gin (({RECORD_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_prescription_items_search ON prescription_items "
+    f"USING gin (({MEDICINE_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_prescription_items_archive_search ON prescription_items_archive "
+    f"USING gin (({MEDICINE_DOCUMENT}))",
+]
+
+# bm25 weights for diagnosis, symptoms, treatment notes and medicines
+SQLITE_HITS = """
+    SELECT rowid AS record_id, bm25(record_search, 10.0, 5.0, 2.0, 5.0) AS rank
+    FROM record_search WHERE record_search MATCH :match
+"""
+
+# ids of the records matching one word in their notes or in any medicine name,
+# each lookup served by one of the GIN indexes
+POSTGRES_WORD_MATCHES = f"""
+    SELECT id FROM medical_records WHERE {RECORD_DOCUMENT} @@ to_tsquery('english', :word)
+    UNION
+    SELECT id FROM medical_records_archive WHERE {RECORD_DOCUMENT} @@ to_tsquery('english', :word)
+    UNION
+    SELECT medical_record_id FROM prescription_items WHERE {MEDICINE_DOCUMENT} @@ to_tsquery('simple', :word)
+    UNION
+    SELECT medical_record_id FROM prescription_items_archive WHERE {MEDICINE_DOCUMENT} @@ to_tsquery('simple', :word)
+"""
+
+# records matching every word, intersected per word so that like the sqlite
+# table the words may be spread over the notes and the medicines. Only the
+# matches are ranked, the medicine names weighted like the symptoms
+POSTGRES_HITS = f"""
+    SELECT records.id AS record_id, -(
+        ts_rank({RECORD_DOCUMENT}, to_tsquery('english', :ranked)) +
+        ts_rank(setweight(to_tsvector('simple', coalesce((
+            SELECT string_agg(medicine_name, ' ') FROM (
+                SELECT medicine_name FROM prescription_items WHERE medical_record_id = records.id
+                UNION ALL
+                SELECT medicine_name FROM prescription_items_archive WHERE medical_record_id = records.id
+            ) AS items
+        ), '')), 'B'), to_tsquery('simple', :ranked))
+    ) AS rank
+    FROM (
+        SELECT id, diagnosis, symptoms, treatment_notes FROM medical_records
+        UNION ALL
+        SELECT id, diagnosis, symptoms, treatment_notes FROM medical_records_archive
+    ) AS records
+    WHERE records.id IN ({{matches}})
+"""
+
+
+def _postgres_hits(words: List[str]):
+    matches = ' INTERSECT '.join(
+        f"({POSTGRES_WORD_MATCHES.replace(':word', f':word_{n}')})" for n in range(len(words))
+    )
+    params = {f"word_{n}": f"{word}:*" for n, word in enumerate(words)}
+    return text(POSTGRES_HITS.format(matches=matches)).bindparams(
+        ranked=' | '.join(params.values()), **params
+    )
+
+
+def init_record_search() -> None:
+    """Create the search index for this database, run by init-db"""
+    name = dialect()
+    if name == 'sqlite':
+        existing = db.session.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'record_search_%'"
+        )).scalar()
+        rebuild = SQLITE_REBUILD if existing < len(SQLITE_TRIGGERS) else []
+        create_index(INDEX, SQLITE_SCHEMA + rebuild)
+    elif name == 'postgresql':
+        create_index(INDEX, POSTGRES_SCHEMA)
+
+
+def record_hits(search: str):
+    """
+    Subquery of (record_id, rank) for the live and archived records matching
+    every word of `search`, each word also matching as a prefix, lower ranks
+    first. None when there is no index, callers then filter with
+    record_like_filter.
+    """
+    words = search_words(search)
+    if not words or not index_ready(INDEX, READY_CHECKS):
+        return None
+    if dialect() == 'sqlite':
+        hits = text(SQLITE_HITS).bindparams(match=' '.join(fts_phrase(word) + '*' for word in words))
+    else:
+        hits = _postgres_hits(words)
+    return hits.columns(record_id=db.Integer, rank=db.Float).subquery('record_hits')
+
+
+def record_like_filter(model, search: str):
+    """
+    Unindexed match of every word on a live or archived record model, callers
+    make sure `search` has at least one word
+    """
+    item = model.prescription_items.property.mapper.class_
+    conditions = []
+    for word in search_words(search):
+        pattern = f"%{word}%"
+        conditions.append(db.or_(
+            model.diagnosis.ilike(pattern),
+            model.symptoms.ilike(pattern),
+            model.treatment_notes.ilike(pattern),
+            exists().where(item.medical_record_id == model.id, item.medicine_name.ilike(pattern))
+        ))
+    return db.and_(*conditions)
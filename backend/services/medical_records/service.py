@@ -1,13 +1,24 @@
 from datetime import datetime 
-from typing import Dict, Optional, List 
+from typing import Dict, Optional, List, Tuple
+
+from sqlalchemy.orm import selectinload
 
 from ...core.database import db 
 from ...core.logger import logger
+from ...core.replicas import read_only
+from ...core.search import search_words
 from ...core.models import MedicalRecord, PrescriptionItem, Doctor, Patient, Appointment
+from ..appointments.archive import appointment_models, record_models, find_record
+from .search import record_hits, record_like_filter
+from .medicines import current_catalog, record_prescription
 
 
 class MedicalRecordService: 
 
+    # every search page reads page * per_page candidates from each table
+    MAX_SEARCH_PAGE = 50
+    MAX_SEARCH_PER_PAGE = 100
+
     ########## MEDICAL RECORD ##########
     @staticmethod
     def create_for_appointment(appointment_id: int, doctor_id: int, data: dict) -> dict:
@@ -68,8 +79,8 @@ class MedicalRecordService:
     ########## GETTERS ##########
     @staticmethod
     def get_by_id(record_id: int, include_doctor_notes: bool = False) -> Optional[dict]:
-        """Get record by ID"""
-        record = MedicalRecord.query.get(record_id)
+        """Get record by ID, archived ones included"""
+        record = find_record(record_id)
         if not record:
             raise ValueError("Medical record not found")
         
@@ -78,7 +89,11 @@ class MedicalRecordService:
     @staticmethod
     def get_by_appointment(appointment_id: int, include_doctor_notes: bool = False) -> Optional[dict]:
         """Get record for a specific appointment"""
-        record = MedicalRecord.query.filter_by(appointment_id=appointment_id).first()
+        record = None
+        for model in record_models():
+            record = model.query.filter_by(appointment_id=appointment_id).first()
+            if record:
+                break
         if not record:
             raise ValueError("Medical record not found for this appointment")
         
@@ -110,6 +125,7 @@ class MedicalRecordService:
 
     ########## PATIENT HISTORY QUERIES ##########
     @staticmethod
+    @read_only
     def get_patient_history(
         patient_id: int, 
         doctor_id: int = None,
@@ -117,17 +133,21 @@ class MedicalRecordService:
         limit: int = None
     ) -> List[dict]:
         """Get patient's medical history"""
-        query = MedicalRecord.query.filter_by(patient_id=patient_id)
-        
-        if doctor_id:
-            query = query.filter_by(doctor_id=doctor_id)
-        
-        query = query.order_by(MedicalRecord.created_at.desc())
-        
-        if limit:
-            query = query.limit(limit)
+        records = []
+        for model in record_models():
+            query = model.query.filter_by(patient_id=patient_id)
+            
+            if doctor_id:
+                query = query.filter_by(doctor_id=doctor_id)
+            
+            query = query.order_by(model.created_at.desc())
+            
+            if limit:
+                query = query.limit(limit)
+            
+            records += query.all()
         
-        records = query.all()
+        records = MedicalRecordService._newest_first(records)[:limit]
         
         return [
             MedicalRecordService._record_to_dict(record, include_doctor_notes=include_doctor_notes)
@@ -135,6 +155,7 @@ class MedicalRecordService:
         ]
 
     @staticmethod
+    @read_only
     def get_by_doctor(
         doctor_id: int,
         patient_id: Optional[int] = None,
@@ -142,22 +163,26 @@ class MedicalRecordService:
         end_date: Optional[str] = None
     ) -> List[dict]:
         """Get all records created by a doctor"""
-        query = MedicalRecord.query.filter(MedicalRecord.doctor_id == doctor_id)
+        records = []
+        for model in record_models(start_date):
+            query = model.query.filter(model.doctor_id == doctor_id)
 
-        if patient_id:
-            query = query.filter(MedicalRecord.patient_id == patient_id)
+            if patient_id:
+                query = query.filter(model.patient_id == patient_id)
 
-        if start_date:
-            query = query.filter(MedicalRecord.created_at >= start_date)
+            if start_date:
+                query = query.filter(model.created_at >= start_date)
 
-        if end_date:
-            query = query.filter(MedicalRecord.created_at <= end_date)
+            if end_date:
+                query = query.filter(model.created_at <= end_date)
 
-        records = query.order_by(MedicalRecord.created_at.desc()).all()
+            records += query.order_by(model.created_at.desc()).all()
 
+        records = MedicalRecordService._newest_first(records)
         return [MedicalRecordService._record_to_dict(r, include_doctor_notes=True) for r in records]
 
     @staticmethod
+    @read_only
     def get_by_department(
         department_id: int,
         patient_id: Optional[int] = None,
@@ -165,22 +190,26 @@ class MedicalRecordService:
         end_date: Optional[str] = None
     ) -> List[dict]:
         """Get all records from doctors in a department"""
-        query = MedicalRecord.query.join(Doctor).filter(Doctor.department_id == department_id)
+        records = []
+        for model in record_models(start_date):
+            query = model.query.join(Doctor, model.doctor_id == Doctor.id).filter(Doctor.department_id == department_id)
 
-        if patient_id:
-            query = query.filter(MedicalRecord.patient_id == patient_id)
+            if patient_id:
+                query = query.filter(model.patient_id == patient_id)
 
-        if start_date:
-            query = query.filter(MedicalRecord.created_at >= start_date)
+            if start_date:
+                query = query.filter(model.created_at >= start_date)
 
-        if end_date:
-            query = query.filter(MedicalRecord.created_at <= end_date)
+            if end_date:
+                query = query.filter(model.created_at <= end_date)
 
-        records = query.order_by(MedicalRecord.created_at.desc()).all()
+            records += query.order_by(model.created_at.desc()).all()
 
+        records = MedicalRecordService._newest_first(records)
         return [MedicalRecordService._record_to_dict(r, include_doctor_notes=True) for r in records]
 
     @staticmethod
+    @read_only
     def get_all(
         patient_id: Optional[int] = None,
         doctor_id: Optional[int] = None,
@@ -189,43 +218,145 @@ class MedicalRecordService:
         end_date: Optional[str] = None
     ) -> List[dict]:
         """Get all records with filters (admin)"""
-        query = MedicalRecord.query
+        records = []
+        for model in record_models(start_date):
+            query = model.query
 
-        if patient_id:
-            query = query.filter(MedicalRecord.patient_id == patient_id)
+            if patient_id:
+                query = query.filter(model.patient_id == patient_id)
 
-        if doctor_id:
-            query = query.filter(MedicalRecord.doctor_id == doctor_id)
+            if doctor_id:
+                query = query.filter(model.doctor_id == doctor_id)
 
-        if department_id:
-            query = query.join(Doctor).filter(Doctor.department_id == department_id)
+            if department_id:
+                query = query.join(Doctor, model.doctor_id == Doctor.id).filter(Doctor.department_id == department_id)
 
-        if start_date:
-            query = query.filter(MedicalRecord.created_at >= start_date)
+            if start_date:
+                query = query.filter(model.created_at >= start_date)
 
-        if end_date:
-            query = query.filter(MedicalRecord.created_at <= end_date)
+            if end_date:
+                query = query.filter(model.created_at <= end_date)
 
-        records = query.order_by(MedicalRecord.created_at.desc()).all()
+            records += query.order_by(model.created_at.desc()).all()
 
+        records = MedicalRecordService._newest_first(records)
         return [MedicalRecordService._record_to_dict(r, include_doctor_notes=True) for r in records]
 
 
+    ########## SEARCH ##########
+    @staticmethod
+    @read_only
+    def search(
+        search: str,
+        accessible_to: Optional[int] = None,
+        patient_id: Optional[int] = None,
+        doctor_id: Optional[int] = None,
+        department_id: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 20
+    ) -> Tuple[List[dict], int]:
+        """
+        Records matching `search` on diagnosis, symptoms, treatment notes or
+        medicine names, best matches first. With `accessible_to` only the
+        records that doctor may open, as in can_doctor_access_record.
+        """
+        # punctuation alone has no words to match and would return every record
+        if not search_words(search):
+            raise ValueError("Search term is required")
+
+        viewer = None
+        if accessible_to:
+            viewer = Doctor.query.get(accessible_to)
+            if not viewer:
+                raise ValueError("Doctor not found")
+
+        page = max(page, 1)
+        if page > MedicalRecordService.MAX_SEARCH_PAGE:
+            raise ValueError(f"page must be at most {MedicalRecordService.MAX_SEARCH_PAGE}, narrow the search instead")
+        if not 1 <= per_page <= MedicalRecordService.MAX_SEARCH_PER_PAGE:
+            raise ValueError(f"per_page must be between 1 and {MedicalRecordService.MAX_SEARCH_PER_PAGE}")
+
+        hits = record_hits(search)
+        matches, total = [], 0
+        for model in record_models(start_date):
+            if hits is not None:
+                query = db.session.query(model.id, model.created_at, hits.c.rank).join(hits, model.id == hits.c.record_id)
+            else:
+                query = db.session.query(model.id, model.created_at, db.literal(0.0)).filter(record_like_filter(model, search))
+
+            if viewer or department_id:
+                query = query.join(Doctor, model.doctor_id == Doctor.id)
+
+            if viewer:
+                query = query.filter(db.or_(
+                    model.doctor_id == viewer.id,
+                    Doctor.department_id == viewer.department_id
+                ))
+
+            if department_id:
+                query = query.filter(Doctor.department_id == department_id)
+
+            if patient_id:
+                query = query.filter(model.patient_id == patient_id)
+
+            if doctor_id:
+                query = query.filter(model.doctor_id == doctor_id)
+
+            if start_date:
+                query = query.filter(model.created_at >= start_date)
+
+            if end_date:
+                query = query.filter(model.created_at <= end_date)
+
+            total += query.count()
+            ranking = [hits.c.rank] if hits is not None else []
+            matches += [
+                (model, *match) for match in
+                query.order_by(*ranking, model.created_at.desc()).limit(page * per_page).all()
+            ]
+
+        # newest first among equal ranks, the sort is stable
+        matches.sort(key=lambda match: match[2] or datetime.min, reverse=True)
+        matches.sort(key=lambda match: match[3])
+        matches = matches[(page - 1) * per_page:page * per_page]
+
+        # only the page's records are loaded, with everything _record_to_dict reads
+        loaded = {}
+        for model in {match[0] for match in matches}:
+            ids = [record_id for match_model, record_id, _, _ in matches if match_model is model]
+            for record in model.query.options(
+                selectinload(model.patient),
+                selectinload(model.doctor).selectinload(Doctor.department),
+                selectinload(model.prescription_items)
+            ).filter(model.id.in_(ids)):
+                loaded[model, record.id] = record
+
+        logger.info(f"Record search matched {total} records")
+        return [
+            MedicalRecordService._record_to_dict(loaded[model, record_id], include_doctor_notes=True)
+            for model, record_id, _, _ in matches
+        ], total
+
+
     @staticmethod 
     def get_patient_export_data(patient_id: int) -> List[Dict]:
         """Get Patients complete medical records for csv """
 
         try: 
-            appointments = Appointment.query.filter(
-                Appointment.patient_id == patient_id,
-                Appointment.status == 'completed'
-            ).order_by(Appointment.appointment_date.desc(), Appointment.appointment_time.desc()).all()
+            appointments = []
+            for model in appointment_models():
+                appointments += model.query.filter(
+                    model.patient_id == patient_id,
+                    model.status == 'completed'
+                ).order_by(model.appointment_date.desc(), model.appointment_time.desc()).all()
 
             export_data = []
 
             for apt in appointments: 
                 doctor = apt.doctor
-                record = MedicalRecord.query.filter_by(appointment_id=apt.id).first()
+                record = apt.medical_record
 
                 medicines = []
                 if record and record.prescription_items:
@@ -280,10 +411,17 @@ class MedicalRecordService:
         )
         db.session.add(item)
         db.session.commit()
+        record_prescription(item.id, item.medicine_name, doctor_id)
 
         logger.info(f"Prescription item {item.id} added to record {record_id}")
         return MedicalRecordService._prescription_item_to_dict(item)
 
+    @staticmethod
+    @read_only
+    def suggest_medicines(prefix: str, doctor_id: Optional[int] = None, limit: int = 10) -> List[dict]:
+        """Medicine names for autocomplete, most prescribed and the doctor's recent ones first"""
+        return current_catalog().suggest(prefix, doctor_id=doctor_id, limit=limit)
+
     @staticmethod
     def update_prescription_item(item_id: int, doctor_id: int, data: dict) -> dict: 
         """Update a prescription item"""
@@ -323,7 +461,7 @@ class MedicalRecordService:
     @staticmethod 
     def can_doctor_access_record(doctor_id: int, record_id: int) -> bool:
         """Check if a doctor can access a medical record"""
-        record = MedicalRecord.query.get(record_id)
+        record = find_record(record_id)
         if not record:
             return False
         
@@ -353,12 +491,20 @@ class MedicalRecordService:
         if not doctor:
             return False
 
-        exists = MedicalRecord.query.join(Doctor).filter(
-            MedicalRecord.patient_id == patient_id,
-            Doctor.department_id == doctor.department_id
-        ).first()
+        for model in record_models():
+            exists = model.query.join(Doctor, model.doctor_id == Doctor.id).filter(
+                model.patient_id == patient_id,
+                Doctor.department_id == doctor.department_id
+            ).first()
+            if exists is not None:
+                return True
 
-        return exists is not None
+        return False
+
+    @staticmethod
+    def _newest_first(records: list) -> list:
+        """Merge live and archived records back into created_at order"""
+        return sorted(records, key=lambda record: record.created_at or datetime.min, reverse=True)
 
     ########## DICT CONVERSIONS ##########
     @staticmethod
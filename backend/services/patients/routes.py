@@ -3,7 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from pydantic import ValidationError
 
 from ...core.logger import logger
-from ...core.auth import patient_required
+from ...core.auth import patient_required, get_claimed_profile_id
 from ...core.models import Patient
 from ...core.cache import cached, invalidate
 from ..appointments.service import AppointmentService
@@ -18,6 +18,9 @@ patient_bp = Blueprint('patients', __name__, url_prefix='/patient')
 
 def get_patient_id_from_user(user_id: int) -> int:
     """Get patient ID from user ID"""
+    patient_id = get_claimed_profile_id('patient_id', user_id)
+    if patient_id:
+        return patient_id
     patient = Patient.query.filter_by(user_id=user_id).first()
     return patient.id if patient else None
 
@@ -129,6 +132,7 @@ def book_appointment():
             notes=data.booking_notes
         )
         invalidate('slots')
+        invalidate('roster')
         return jsonify({
             'status': 'success',
             'message': 'Appointment booked successfully',
@@ -200,6 +204,7 @@ def reschedule_appointment(appointment_id):
         new_date = datetime.strptime(new_date, '%Y-%m-%d').date()
 
         appointment = AppointmentService.reschedule(appointment_id, new_date, new_time)
+        invalidate('roster')
 
         return jsonify({
             'status': 'success',
@@ -272,6 +277,7 @@ def cancel_appointment(appointment_id):
         reason = data.get('reason')
 
         appointment = AppointmentService.update_status(appointment_id, 'cancelled', reason)
+        invalidate('roster')
 
         return jsonify({
             'status': 'success',
@@ -0,0 +1,141 @@
+from sqlalchemy import text
+
+from ...core.database import db
+from ...core.models import Patient, User
+from ...core.search import (MIN_TERM_LENGTH, create_index, dialect, fts_phrase, index_ready,
+                            like_pattern, search_terms)
+
+# patient search over name, email and phone. sqlite keeps a trigram FTS5 table
+# in step with patients and users through triggers, so every write path updates
+# it; Postgres gets pg_trgm GIN indexes that serve ILIKE directly. init-db
+# creates both, other databases fall back to an ILIKE scan
+INDEX = 'patient_search'
+
+READY_CHECKS = {
+    'sqlite': "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patient_search'",
+    'postgresql': "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_patients_name_trgm'",
+}
+
+SQLITE_TRIGGERS = ('patient_search_insert', 'patient_search_update', 'patient_search_delete',
+                   'patient_search_email')
+
+SQLITE_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patient_search USING fts5(name, email, phone, tokenize = 'trigram')",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patients BEGIN
+        INSERT INTO patient_search (rowid, name, email, phone)
+        VALUES (new.id, new.first_name || ' ' || new.last_name,
+                (SELECT email FROM users WHERE id = new.user_id), new.phone);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_update
+    AFTER UPDATE OF first_name, last_name, phone, user_id ON patients BEGIN
+        UPDATE patient_search SET name = new.first_name || ' ' || new.last_name,
+            email = (SELECT email FROM users WHERE id = new.user_id), phone = new.phone
+        WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patients BEGIN
+        DELETE FROM patient_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_email AFTER UPDATE OF email ON users BEGIN
+        UPDATE patient_search SET email = new.email
+        WHERE rowid IN (SELECT id FROM patients WHERE user_id = new.id);
+    END""",
+]
+
+# when the triggers were missing the table may have been recreated under them
+SQLITE_REBUILD = [
+    "DELETE FROM patient_search",
+    """INSERT INTO patient_search (rowid, name, email, phone)
+    SELECT patients.id, patients.first_name || ' ' || patients.last_name, users.email, patients.phone
+    FROM patients LEFT JOIN users ON users.id = patients.user_id""",
+]
+
+POSTGRES_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_patients_name_trgm ON patients "
+    "USING gin ((first_name || ' ' || last_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_patients_phone_trgm ON patients USING gin (phone gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+]
+
+# bm25 weights for name, email and phone
+SQLITE_HITS = """
+    SELECT rowid AS patient_id, bm25(patient_search, 10.0, 5.0, 5.0) AS rank
+    FROM patient_search WHERE {conditions}
+"""
+
+# one branch per index, a patient matching several keeps its best rank
+POSTGRES_HITS = """
+    SELECT patient_id, min(rank) AS rank FROM (
+        SELECT id AS patient_id, 1 - word_similarity(:term, first_name || ' ' || last_name) AS rank
+        FROM patients WHERE first_name || ' ' || last_name ILIKE :pattern
+        UNION ALL
+        SELECT patients.id, 1 - word_similarity(:term, users.email)
+        FROM users JOIN patients ON patients.user_id = users.id WHERE users.email ILIKE :pattern
+        UNION ALL
+        SELECT id, 1 - word_similarity(:term, phone) FROM patients WHERE phone ILIKE :pattern
+    ) AS matches GROUP BY patient_id
+"""
+
+
+def init_patient_search() -> None:
+    """Create the search index for this database, run by init-db"""
+    name = dialect()
+    if name == 'sqlite':
+        existing = db.session.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'patient_search_%'"
+        )).scalar()
+        rebuild = SQLITE_REBUILD if existing < len(SQLITE_TRIGGERS) else []
+        create_index(INDEX, SQLITE_SCHEMA + rebuild)
+    elif name == 'postgresql':
+        create_index(INDEX, POSTGRES_SCHEMA)
+
+
+def _sqlite_hits(terms: list):
+    # every word has to match, words too short for a trigram lookup filter the hits
+    indexed = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    if not indexed:
+        return None
+    params = {'match': ' '.join(fts_phrase(term) for term in indexed)}
+    conditions = ['patient_search MATCH :match']
+    for index, term in enumerate(term for term in terms if len(term) < MIN_TERM_LENGTH):
+        params[f"short_{index}"] = like_pattern(term)
+        likes = ' OR '.join(f"{column} LIKE :short_{index} ESCAPE '\\'" for column in ('name', 'email', 'phone'))
+        conditions.append(f"({likes})")
+    return text(SQLITE_HITS.format(conditions=' AND '.join(conditions))).bindparams(**params)
+
+
+def _postgres_hits(search: str):
+    # the whole entry is matched, as the ILIKE search always did
+    term = search.strip()
+    if len(term) < MIN_TERM_LENGTH:
+        return None
+    return text(POSTGRES_HITS).bindparams(term=term, pattern=like_pattern(term))
+
+
+def patient_hits(search: str):
+    """
+    Subquery of (patient_id, rank) for the patients matching `search`, lower
+    ranks first. None when the index can't serve the search, callers then
+    filter with patient_like_filter.
+    """
+    if not index_ready(INDEX, READY_CHECKS):
+        return None
+    name = dialect()
+    if name == 'sqlite':
+        hits = _sqlite_hits(search_terms(search))
+    else:
+        hits = _postgres_hits(search)
+    if hits is None:
+        return None
+    return hits.columns(patient_id=db.Integer, rank=db.Float).subquery('patient_hits')
+
+
+def patient_like_filter(search: str):
+    """Unindexed match on name, email and phone, needs users joined"""
+    search_term = f"%{search}%"
+    return db.or_(
+        Patient.first_name.ilike(search_term),
+        Patient.last_name.ilike(search_term),
+        User.email.ilike(search_term),
+        Patient.phone.ilike(search_term)
+    )
@@ -1,9 +1,11 @@
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 
 from ...core.database import db
 from ...core.logger import logger
+from ...core.replicas import read_only
 from ...core.models import User, Patient
+from .search import patient_hits, patient_like_filter
 from ...auth.service import AuthService
 from ...auth.schema import RegisterPatient
 from ..medical_records.service import MedicalRecordService
@@ -45,6 +47,7 @@ class PatientService:
         return PatientService._to_dict(patient, user)
 
     @staticmethod
+    @read_only
     def get_patients(include_inactive: bool = False) -> List[dict]:
         """Get all patients"""
         query = db.session.query(Patient, User).join(User, Patient.user_id == User.id)
@@ -58,6 +61,27 @@ class PatientService:
         logger.info(f"Fetched {len(patients)} patients")
         return patients
 
+    @staticmethod
+    @read_only
+    def search_patients(search: str, include_inactive: bool = False, page: int = 1,
+                        per_page: int = 20) -> Tuple[List[dict], int]:
+        """Patients matching `search` on name, email or phone, best matches first"""
+        query = db.session.query(Patient, User).join(User, Patient.user_id == User.id)
+
+        hits = patient_hits(search)
+        if hits is not None:
+            query = query.join(hits, Patient.id == hits.c.patient_id).order_by(hits.c.rank, Patient.id)
+        else:
+            query = query.filter(patient_like_filter(search)).order_by(Patient.first_name, Patient.last_name)
+
+        if not include_inactive:
+            query = query.filter(User.is_active == True)
+
+        total = query.count()
+        page = max(page, 1)
+        results = query.offset((page - 1) * per_page).limit(per_page).all()
+        return [PatientService._to_dict(p, u) for p, u in results], total
+
     @staticmethod
     def create_patient(data: RegisterPatient) -> dict:
         """Create patient - wraps AuthService.register_patient"""
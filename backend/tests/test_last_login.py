@@ -0,0 +1,49 @@
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+
+# must be set before the app and its config are imported
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test_last_login.db')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-with-enough-length')
+os.environ.setdefault('SLOW_QUERY_LOG', 'false')
+
+from backend.app import app  # noqa: E402
+from backend.core import auth, cache  # noqa: E402
+from backend.core.database import db  # noqa: E402
+from backend.core.models import User  # noqa: E402
+
+
+@pytest.fixture
+def users(monkeypatch):
+    # the per-process buffer is flushed, not redis
+    monkeypatch.setattr(cache, 'redis_available', lambda: False)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        created = [
+            User(username=f"user{n}", email=f"user{n}@example.com", password_hash='x', role='patient')
+            for n in range(3)
+        ]
+        db.session.add_all(created)
+        db.session.commit()
+        yield created
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+def test_flush_skips_users_deleted_since_login(users):
+    logged_in = datetime(2026, 1, 1, 9, 30)
+    auth._pending_logins.update({user.id: logged_in for user in users})
+    deleted = users[1].id
+    db.session.delete(users[1])
+    db.session.commit()
+
+    assert auth.flush_last_logins() == {'flushed': 3}
+    assert auth._pending_logins == {}
+
+    db.session.expire_all()
+    for user in users:
+        if user.id != deleted:
+            assert db.session.get(User, user.id).last_login == logged_in
+    assert db.session.get(User, deleted) is None
@@ -1,9 +1,14 @@
 from ..core.celery_config import celery_app 
 from ..core.logger import logger 
-from ..app import create_app
+from ..core.revocation import migrate_revoked_tokens
+from ..core.auth import flush_last_logins
+from ..core.profiling import PROFILER_DEFAULT_HZ, start_background_sampling
+from ..services.appointments.archive import archive_appointments
+from ..app import get_app
 from .driver import send_daily_reminders, send_monthly_report 
 
 from flask import current_app 
+from celery.worker.control import control_command
 
 @celery_app.task(bind=True, name='backend.utils.tasks.send_daily_reminders_task', max_retries=1)
 def send_daily_reminders_task(self):
@@ -15,7 +20,7 @@ def send_daily_reminders_task(self):
         try:
             app = current_app._get_current_object()
         except RuntimeError:
-            app = create_app()
+            app = get_app()
         
         with app.app_context():
             result = send_daily_reminders(hospital_phone=app.config.get('HOSPITAL_PHONE'))
@@ -37,7 +42,7 @@ def send_monthly_reports_task(self):
         try: 
             app = current_app._get_current_object()
         except RuntimeError:
-            app = create_app()
+            app = get_app()
 
         with app.app_context():
             result = send_monthly_report() 
@@ -47,4 +52,79 @@ def send_monthly_reports_task(self):
     except  Exception as e:
         logger.error(f"Error in monthly doctor reports task: {e}")
         raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries)) # retry with exponential backoff
-    
\ No newline at end of file
+
+
+@celery_app.task(bind=True, name='backend.utils.tasks.migrate_revoked_tokens_task', max_retries=1)
+def migrate_revoked_tokens_task(self):
+    """
+    move revoked tokens from the token_blacklist table into redis and purge expired rows.
+    """
+    try:
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = get_app()
+
+        with app.app_context():
+            return migrate_revoked_tokens()
+
+    except Exception as e:
+        logger.error(f"Error in revoked token cleanup task: {e}")
+        raise self.retry(exc=e, countdown=60)
+
+
+@celery_app.task(bind=True, name='backend.utils.tasks.flush_last_logins_task', max_retries=1)
+def flush_last_logins_task(self):
+    """
+    write buffered last_login timestamps to the users table in one bulk update.
+    """
+    try:
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = get_app()
+
+        with app.app_context():
+            return flush_last_logins()
+
+    except Exception as e:
+        logger.error(f"Error in last login flush task: {e}")
+        raise self.retry(exc=e, countdown=30)
+
+
+@celery_app.task(bind=True, name='backend.utils.tasks.archive_appointments_task', max_retries=1)
+def archive_appointments_task(self):
+    """
+    move appointments older than the archive horizon, with their medical records, into the archive tables.
+    """
+    try:
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = get_app()
+
+        with app.app_context():
+            return archive_appointments()
+
+    except Exception as e:
+        logger.error(f"Error in appointment archive task: {e}")
+        raise self.retry(exc=e, countdown=300)
+
+
+@control_command(
+    args=[('seconds', float), ('hz', int)],
+    signature='[seconds=10] [hz=100]'
+)
+def profile(state, seconds=10, hz=PROFILER_DEFAULT_HZ):
+    """
+    Sample this worker's stacks in the background and write a collapsed
+    stack file on the worker host.
+        celery -A backend.celery_worker control profile 10 100
+    Task code only shows up with the solo or threads pool; under prefork
+    the command runs in the parent, not the children.
+    """
+    try:
+        path = start_background_sampling(float(seconds), int(hz))
+        return {'ok': f"profiling for {seconds}s at {hz}Hz, writing {path}"}
+    except ValueError as e:
+        return {'error': str(e)}
@@ -0,0 +1,77 @@
+import os
+import re
+import tempfile
+from functools import lru_cache
+from typing import Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+from markupsafe import escape
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+TEMPLATE_CACHE_DIR = os.getenv(
+    'TEMPLATE_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'chikitsa_template_cache')
+)
+
+
+def _make_bytecode_cache():
+    """Bytecode cache shared across worker processes, skipped if the dir is not writable"""
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR, '%s.chikitsa.cache')
+    except OSError:
+        return None
+
+
+# templates never change at runtime, so skip the per-render mtime check
+template_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(['html']),
+    bytecode_cache=_make_bytecode_cache(),
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    """Load and compile a template once per process"""
+    return template_env.get_template(name)
+
+
+def render(name: str, **context) -> str:
+    """Render a compiled template with the given per-recipient context"""
+    return get_template(name).render(**context)
+
+
+_FIELD_MARKER = re.compile(r'\x00(\w+)\x00')
+
+
+class PrerenderedTemplate:
+    """
+    Template whose static markup is rendered once up front.
+    Rendering only escapes and splices the per-recipient fields between
+    the pre-rendered chunks, skipping the Jinja runtime entirely.
+    Only valid for templates that use the fields as plain substitutions.
+    """
+
+    def __init__(self, name: str, fields: Tuple[str, ...]):
+        markers = {field: f"\x00{field}\x00" for field in fields}
+        pieces = _FIELD_MARKER.split(get_template(name).render(**markers))
+        self.chunks = pieces[0::2]
+        self.fields = pieces[1::2]
+
+    def render(self, **context) -> str:
+        chunks = self.chunks
+        out = [chunks[0]]
+        for i, field in enumerate(self.fields, 1):
+            out.append(escape(context[field]))
+            out.append(chunks[i])
+        return ''.join(out)
+
+
+@lru_cache(maxsize=None)
+def get_prerendered(name: str, fields: Tuple[str, ...]) -> PrerenderedTemplate:
+    """Pre-render a template's static chrome once per process"""
+    return PrerenderedTemplate(name, fields)